@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Import text cleaning throughput: the old per-importer _clean_text vs. TextNormalizer.
+
+Usage:
+    python benchmarks/bench_normalize.py                 # 50 MB generated Persian/English corpus
+    python benchmarks/bench_normalize.py --size-mb 10
+    python benchmarks/bench_normalize.py --txt book.txt  # an existing UTF-8 text file
+
+Modes:
+    legacy      two regex passes and ten str.replace calls, punctuation stripped
+    normalize   TextNormalizer over the whole text
+    streamed    TextNormalizer.iter_normalize over 64 KB blocks
+    per-page    TextNormalizer.normalize page by page (3 KB pages, as for PDFs)
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ("کتاب دانش زندگی ايران كلاس روز شب ١٢ ٣٤٥ می‌رود "
+         "the book of life reading 2024 chapter").split()
+PUNCTUATION = ['', '', '', '.', '،', ',', '!', '؟', ':']
+
+
+def build_corpus(size_mb: int, seed: int = 7) -> str:
+    """Random words with punctuation, line wraps and paragraph breaks"""
+    rng = random.Random(seed)
+    lines = []
+    size = 0
+    while size < size_mb * 1024 * 1024:
+        line = ' '.join(rng.choice(WORDS) + rng.choice(PUNCTUATION) for _ in range(12))
+        line += rng.choice(['\n', '\n', '\n', '  \n\n', '\t\n', '\r\n'])
+        lines.append(line)
+        size += len(line.encode('utf-8'))
+    return ''.join(lines)
+
+
+def legacy_clean_text(text: str) -> str:
+    """The _clean_text the PDF and TXT importers each had"""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s؀-ۿﮊپچگ]', '', text)
+    for arabic, ascii_digit in zip('٠١٢٣٤٥٦٧٨٩', '0123456789'):
+        text = text.replace(arabic, ascii_digit)
+    return text.strip()
+
+
+def measure(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Text normalization benchmark')
+    parser.add_argument('--txt', help='existing UTF-8 text file')
+    parser.add_argument('--size-mb', type=int, default=50)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    from src.services.text_normalizer import TextNormalizer
+
+    if args.txt:
+        with open(args.txt, encoding='utf-8') as f:
+            text = f.read()
+    else:
+        text = build_corpus(args.size_mb)
+    size_mb = len(text.encode('utf-8')) / 1024 / 1024
+
+    normalizer = TextNormalizer()
+    blocks = [text[i:i + 64 * 1024] for i in range(0, len(text), 64 * 1024)]
+    pages = [text[i:i + 3000] for i in range(0, len(text), 3000)]
+    modes = {
+        'legacy': lambda: legacy_clean_text(text),
+        'normalize': lambda: normalizer.normalize(text),
+        'streamed': lambda: ''.join(normalizer.iter_normalize(blocks)),
+        'per-page': lambda: [normalizer.normalize(page) for page in pages],
+    }
+
+    print(f"corpus: {size_mb:.1f} MB, {len(text):,} characters")
+    for mode, fn in modes.items():
+        elapsed = measure(fn, args.runs)
+        print(f"{mode:10s} {elapsed:7.3f}s {size_mb / elapsed:8.1f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
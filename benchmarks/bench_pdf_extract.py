@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PDF text extraction time: single process vs. the process pool in PDFImporter.
+
+Usage:
+    python benchmarks/bench_pdf_extract.py                          # generated PDFs of 50..1500 pages
+    python benchmarks/bench_pdf_extract.py --pages 100 300 1000     # other sizes
+    python benchmarks/bench_pdf_extract.py --pdf scanned.pdf        # an existing PDF
+    python benchmarks/bench_pdf_extract.py --workers 4
+
+The smallest size where the pool wins is a good value for PDF_PARALLEL_MIN_PAGES.
+Generated pages hold plain text; OCR-layered scans cost more per page, so their
+break-even point is lower.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_TEXT = (
+    "کتاب‌ها دریچه‌ای به جهان‌های دیگر هستند. هر صفحه ما را به سفری تازه می‌برد.\n"
+    "Books are windows into other worlds, and every page takes us somewhere new.\n"
+) * 20
+
+
+def build_pdf(path: str, pages: int):
+    """Write a PDF with pages of dense text"""
+    import fitz
+
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 560, 800), f"Chapter {i + 1}\n" + SAMPLE_TEXT, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def measure(pdf_path: str, workers: int, runs: int) -> float:
+    import fitz
+    from src.services.pdf_importer import PDFImporter
+
+    # The cutoff is disabled so both modes run at every size
+    importer = PDFImporter(db=None, workers=workers, parallel_min_pages=0)
+    samples = []
+    for _ in range(runs):
+        doc = fitz.open(pdf_path)
+        start = time.perf_counter()
+        count = sum(1 for _ in importer.iter_page_texts(doc, pdf_path))
+        samples.append(time.perf_counter() - start)
+        assert count == doc.page_count
+        doc.close()
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF extraction benchmark')
+    parser.add_argument('--pdf', help='existing PDF to extract')
+    parser.add_argument('--pages', type=int, nargs='+', default=[50, 150, 300, 600, 1500],
+                        help='sizes of the generated PDFs')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.pdf:
+            paths = [args.pdf]
+        else:
+            paths = []
+            for pages in args.pages:
+                path = os.path.join(tmp, f'bench-{pages}.pdf')
+                build_pdf(path, pages)
+                paths.append(path)
+
+        import fitz
+
+        print(f"{'pages':>6s} {'single':>9s} {'pool':>9s} {'speedup':>8s}   (workers={args.workers})")
+        for path in paths:
+            with fitz.open(path) as doc:
+                pages = doc.page_count
+            single = measure(path, 1, args.runs)
+            pool = measure(path, args.workers, args.runs)
+            print(f"{pages:6d} {single:8.2f}s {pool:8.2f}s {single / pool:7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Per-request overhead of the /api/query path in src/main.py: building AppConfig,
+BookDatabase and LLMService for every request vs. the shared ServiceContainer.
+
+Usage:
+    python benchmarks/bench_service_container.py
+    python benchmarks/bench_service_container.py --requests 2000
+    python benchmarks/bench_service_container.py --skip-llm      # config and database only
+
+Both modes run the same book search; the difference is what it costs to get the
+services for it. No LLM call is made.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERY = "کتاب"
+
+
+def measure(fn, requests: int):
+    """Median and p95 latency of fn over requests calls, in milliseconds"""
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Service container benchmark')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--skip-llm', action='store_true', help='do not construct LLMService')
+    args = parser.parse_args()
+
+    from src.db.database import BookDatabase
+    from src.services.container import ServiceContainer
+    from src.utils.config import AppConfig
+
+    if args.skip_llm:
+        def make_llm(config):
+            return None
+    else:
+        from src.models.llm_service import LLMService
+
+        def make_llm(config):
+            return LLMService(model_type=config.model_type, api_key=config.api_key)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'books.db')
+
+        def load_config():
+            return AppConfig(db_path=db_path)
+
+        def build(config):
+            return {'db': BookDatabase(config.db_path), 'llm': make_llm(config)}
+
+        def per_request():
+            # What search_books() and generate_response() did before
+            config = load_config()
+            db = BookDatabase(config.db_path)
+            make_llm(load_config())
+            db.search_books(QUERY)
+
+        services = ServiceContainer(load_config, build, fingerprint=lambda config: config.model_dump())
+        services.get()
+
+        def shared():
+            services.get().db.search_books(QUERY)
+
+        print(f"{args.requests} requests, database at {db_path}")
+        results = {}
+        for mode, fn in (('per-request', per_request), ('container', shared)):
+            results[mode] = measure(fn, args.requests)
+            median, p95 = results[mode]
+            print(f"{mode:12s} median {median:7.3f} ms   p95 {p95:7.3f} ms")
+        saved = results['per-request'][0] - results['container'][0]
+        print(f"overhead removed: {saved:.3f} ms per request (median)")
+
+
+if __name__ == '__main__':
+    main()
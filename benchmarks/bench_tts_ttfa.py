@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Time-to-first-audio for page TTS: buffered synthesis vs. streamed chunks.
+
+Usage:
+    # Against the TTS provider directly (needs OPENAI_API_KEY)
+    python benchmarks/bench_tts_ttfa.py --runs 3
+
+    # Against a running server, comparing /tts/<n> with /tts/<n>?stream=1
+    python benchmarks/bench_tts_ttfa.py --url http://127.0.0.1:5000/api/books/1/tts/1
+
+Use a page that is not in the audio cache yet (or clear AUDIO_CACHE_DIR) when
+benchmarking the server, otherwise both modes are served from disk.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_TEXT = (
+    "کتاب‌ها دریچه‌ای به جهان‌های دیگر هستند. هر صفحه ما را به سفری تازه می‌برد. "
+    "Books are windows into other worlds, and every page takes us somewhere new. "
+) * 8
+
+
+def measure_service(runs: int):
+    from src.services.tts_service import TTSService
+
+    tts = TTSService()
+    results = {'buffered': [], 'streamed': []}
+    for _ in range(runs):
+        start = time.perf_counter()
+        tts.text_to_speech(SAMPLE_TEXT)
+        results['buffered'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        stream = tts.stream_speech(SAMPLE_TEXT)
+        next(stream)
+        results['streamed'].append(time.perf_counter() - start)
+        for _ in stream:
+            pass
+    return results
+
+
+def measure_server(url: str, runs: int):
+    import requests
+
+    results = {'buffered': [], 'streamed': []}
+    for i in range(runs):
+        # A distinct size per run moves the page boundaries, so every request is a cache miss
+        size = 1000 + i * 7
+        start = time.perf_counter()
+        requests.get(url, params={'size': size}).content
+        results['buffered'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with requests.get(url, params={'size': size + 3, 'stream': '1'}, stream=True) as response:
+            next(response.iter_content(4096))
+            results['streamed'].append(time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TTS time-to-first-audio benchmark')
+    parser.add_argument('--url', help='page TTS endpoint of a running server')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    results = measure_server(args.url, args.runs) if args.url else measure_service(args.runs)
+    for mode, samples in results.items():
+        print(f"{mode:9s} time-to-first-audio: median={statistics.median(samples):6.2f}s "
+              f"min={min(samples):6.2f}s max={max(samples):6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
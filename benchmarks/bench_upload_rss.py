@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Peak RSS of importing a large PDF upload: legacy temp-file round trip vs. spooled stream.
+
+Usage:
+    python benchmarks/bench_upload_rss.py                 # builds a ~200 MB PDF and compares both paths
+    python benchmarks/bench_upload_rss.py --pdf big.pdf   # use an existing PDF
+
+Each mode runs in its own child process so ru_maxrss reflects only that import.
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_pdf(path: str, target_mb: int):
+    """Write a text PDF padded with incompressible image streams up to target_mb"""
+    import fitz
+
+    doc = fitz.open()
+    blob_size = 2 * 1024 * 1024
+    pages = max(1, (target_mb * 1024 * 1024) // blob_size)
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Chapter {i + 1}\n" + "The quick brown fox jumps over the lazy dog. " * 40)
+        page.insert_image(fitz.Rect(72, 300, 300, 500), stream=_noise_png(blob_size))
+    doc.save(path, deflate=False)
+    doc.close()
+
+
+def _noise_png(size: int) -> bytes:
+    import fitz
+
+    side = int((size / 3) ** 0.5)
+    pix = fitz.Pixmap(fitz.csRGB, side, side, os.urandom(side * side * 3), False)
+    return pix.tobytes('png')
+
+
+def run_child(mode: str, pdf_path: str):
+    from src.database.book_db import BookDatabase
+    from src.services.pdf_importer import PDFImporter
+    from src.services.upload_stream import spool_stream
+
+    with tempfile.TemporaryDirectory() as tmp:
+        importer = PDFImporter(BookDatabase(os.path.join(tmp, 'bench.db')))
+        start = time.perf_counter()
+        if mode == 'legacy':
+            # What the endpoints used to do: hold the body in memory, then write and re-open a copy
+            with open(pdf_path, 'rb') as f:
+                body = f.read()
+            copy_path = os.path.join(tmp, 'upload.pdf')
+            with open(copy_path, 'wb') as f:
+                f.write(body)
+            result = importer.import_pdf(copy_path)
+        else:
+            # What the multipart parser now does: one chunked write into a SpooledUpload
+            with open(pdf_path, 'rb') as f, spool_stream(f, suffix='.pdf') as upload:
+                result = importer.import_pdf_stream(upload, os.path.basename(pdf_path))
+        elapsed = time.perf_counter() - start
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:8s} status={result['status']:8s} time={elapsed:6.2f}s peak_rss={peak_mb:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Upload import peak RSS benchmark')
+    parser.add_argument('--pdf', help='existing PDF to import')
+    parser.add_argument('--size-mb', type=int, default=200, help='size of the generated PDF')
+    parser.add_argument('--child', choices=['legacy', 'spooled'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.pdf)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = os.path.join(tmp, 'bench.pdf')
+            print(f"Building {args.size_mb} MB PDF...")
+            build_pdf(pdf_path, args.size_mb)
+        print(f"PDF size: {os.path.getsize(pdf_path) / 1024 / 1024:.1f} MB")
+        for mode in ('legacy', 'spooled'):
+            subprocess.run([sys.executable, __file__, '--child', mode, '--pdf', pdf_path], check=True)
+
+
+if __name__ == '__main__':
+    main()
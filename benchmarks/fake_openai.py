@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Slow stand-in for the OpenAI API, so load tests measure the server and not the provider.
+
+Usage:
+    hypercorn benchmarks.fake_openai:app --bind 127.0.0.1:9000
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=test python src/main.py
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=test hypercorn src.asgi:app
+
+FAKE_LATENCY (seconds, default 0.5) is the time each upstream call takes.
+"""
+
+import asyncio
+import os
+import time
+
+from quart import Quart, Response, request
+
+FAKE_LATENCY = float(os.getenv('FAKE_LATENCY', '0.5'))
+AUDIO_CHUNKS = 8
+AUDIO_CHUNK = b'\xff\xfb' + b'\x00' * 4094
+
+app = Quart(__name__)
+
+
+@app.route('/v1/audio/speech', methods=['POST'])
+async def speech():
+    await request.get_json()
+
+    async def body():
+        for _ in range(AUDIO_CHUNKS):
+            await asyncio.sleep(FAKE_LATENCY / AUDIO_CHUNKS)
+            yield AUDIO_CHUNK
+
+    return Response(body(), mimetype='audio/mpeg')
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+async def chat_completions():
+    payload = await request.get_json()
+    await asyncio.sleep(FAKE_LATENCY)
+    text = payload['messages'][-1]['content']
+    return {
+        'id': 'chatcmpl-fake',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': payload.get('model', 'fake'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': text[::-1]},
+            'finish_reason': 'stop'
+        }],
+        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+    }
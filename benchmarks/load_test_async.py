@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Throughput and latency of the reader API under concurrent TTS/translation load,
+comparing the threaded Flask app with the ASGI app.
+
+Usage:
+    # 1. fake provider (see benchmarks/fake_openai.py)
+    hypercorn benchmarks.fake_openai:app --bind 127.0.0.1:9000
+
+    # 2. both servers against the same database, pointed at the fake provider,
+    #    with read-ahead off so that only the measured requests reach the provider
+    export OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=test READ_AHEAD_PAGES=0
+    python src/main.py --server --port 5000
+    hypercorn src.asgi:app --bind 127.0.0.1:5001
+
+    # 3. run
+    python benchmarks/load_test_async.py \\
+        --server flask=http://127.0.0.1:5000 --server asgi=http://127.0.0.1:5001
+
+Every request asks for a different page of a book imported for this run. Each
+sentence of that book carries the run id and its own number, so no two pages have
+the same text: audio and translation cache keys never repeat, within a run or
+across runs, and each request reaches the (fake) provider.
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+import uuid
+
+import httpx
+
+CONCURRENCY_LEVELS = (10, 50, 100, 200)
+
+# Roughly three sentences per default 1000 character page
+SENTENCE = "Sentence {number} of load test {run} keeps this page apart from every other page. "
+SENTENCES_PER_PAGE = 3
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def import_book(base_url, pages):
+    """Import and process a TXT book with at least `pages` distinct pages, return (id, total_pages)"""
+    run = uuid.uuid4().hex[:12]
+    sentences = (pages + 1) * SENTENCES_PER_PAGE * 4
+    text = "".join(SENTENCE.format(number=number, run=run) for number in range(sentences))
+
+    with httpx.Client(base_url=base_url, timeout=300) as client:
+        response = client.post(
+            '/api/books/import/txt',
+            files={'file': (f'load-test-{run}.txt', text.encode('utf-8'), 'text/plain')},
+            data={'title': f'Load test {run}', 'author': 'Benchmark'}
+        )
+        response.raise_for_status()
+        book_id = response.json()['book_id']
+        response = client.post(f'/api/books/{book_id}/process')
+        response.raise_for_status()
+        return book_id, response.json()['total_pages']
+
+
+async def run_level(base_url, book_id, kind, concurrency, requests_per_worker, pages):
+    latencies = []
+    errors = 0
+
+    async def worker(client):
+        nonlocal errors
+        for _ in range(requests_per_worker):
+            page = next(pages)
+            if kind == 'tts':
+                call = client.get(f'{base_url}/api/books/{book_id}/tts/{page}')
+            else:
+                call = client.post(f'{base_url}/api/books/{book_id}/translate/{page}')
+            start = time.perf_counter()
+            try:
+                response = await call
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Reader API load test (Flask vs ASGI)')
+    parser.add_argument('--server', action='append', required=True,
+                        help='name=base_url, may be given several times')
+    parser.add_argument('--book', type=int,
+                        help='existing processed book with enough uncached pages '
+                             '(default: import a new one through the first server)')
+    parser.add_argument('--kind', choices=('tts', 'translate'), default='tts')
+    parser.add_argument('--requests-per-worker', type=int, default=3)
+    parser.add_argument('--levels', type=int, nargs='+', default=list(CONCURRENCY_LEVELS))
+    args = parser.parse_args()
+
+    servers = [server.split('=', 1) for server in args.server]
+    needed = len(servers) * sum(args.levels) * args.requests_per_worker
+
+    if args.book:
+        book_id = args.book
+    else:
+        book_id, total_pages = import_book(servers[0][1].rstrip('/'), needed)
+        print(f"imported book {book_id} with {total_pages} pages")
+        if total_pages < needed:
+            parser.error(f'the imported book has {total_pages} pages, {needed} are needed')
+
+    # Shared between servers so neither profits from the other's cache
+    pages = itertools.count(1)
+
+    print(f"{'server':8s} {'conc':>5s} {'req/s':>8s} {'p50':>8s} {'p95':>8s} {'errors':>7s}")
+    for name, base_url in servers:
+        for concurrency in args.levels:
+            latencies, errors, elapsed = await run_level(
+                base_url.rstrip('/'), book_id, args.kind, concurrency, args.requests_per_worker, pages
+            )
+            rate = len(latencies) / elapsed if elapsed else 0
+            p50 = statistics.median(latencies) if latencies else float('nan')
+            p95 = percentile(latencies, 0.95) if latencies else float('nan')
+            print(f"{name:8s} {concurrency:5d} {rate:8.1f} {p50:7.2f}s {p95:7.2f}s {errors:7d}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,14 +1,20 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Request, Response, request, jsonify, send_file, stream_with_context
 from ..services.book_reader import BookReader
+from .http_cache import conditional, compress_response, make_etag
 from ..services.pdf_importer import PDFImporter
+from ..services.epub_importer import EPUBImporter
+from ..services.reimport import BookReimporter
 from ..database.book_db import BookDatabase
 import os
 from werkzeug.utils import secure_filename
 from ..services.txt_importer import TXTImporter
-import tempfile
 from ..services.text_processor import TextProcessor
 from ..services.tts_service import TTSService
 from ..services.translation_service import TranslationService
+from ..services.audio_cache import AudioCache
+from ..services.prefetch import ReadAheadScheduler, READ_AHEAD_TRANSLATE
+from ..services.pagination import BoundaryIndex, DEFAULT_PAGE_SIZE, clamp_page_size
+from ..services.upload_stream import SpooledUpload, UploadTooLarge, open_upload
 import time
 
 book_reader_bp = Blueprint('book_reader', __name__)
@@ -18,20 +24,127 @@ db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__)
 db = BookDatabase(db_path)
 reader = BookReader(api_key=os.getenv('OPENAI_API_KEY'), db=db)
 pdf_importer = PDFImporter(db)
+epub_importer = EPUBImporter(db)
 text_processor = TextProcessor()
 tts_service = TTSService()
 translation_service = TranslationService()
+audio_cache = AudioCache()
+read_ahead = ReadAheadScheduler()
 
-# Configure upload folder
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'pdf', 'txt'}
+# Most pages returned by one /pages request
+MAX_PAGE_RANGE = int(os.getenv('MAX_PAGE_RANGE', '20'))
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+ALLOWED_EXTENSIONS = {'pdf', 'txt', 'epub'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def file_extension(filename):
+    return filename.rsplit('.', 1)[1].lower()
+
+class UploadRequest(Request):
+    """Request class that spools multipart file parts straight into a SpooledUpload"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        suffix = os.path.splitext(filename or '')[1]
+        return SpooledUpload(suffix=suffix)
+
+@book_reader_bp.errorhandler(UploadTooLarge)
+def upload_too_large(e):
+    return jsonify({'error': str(e)}), 413
+
+@book_reader_bp.after_request
+def compress(response):
+    return compress_response(response)
+
+def reader_id():
+    """Identify the reader for per-user read-ahead limits"""
+    return request.headers.get('X-Reader-Id') or request.remote_addr or 'anonymous'
+
+def page_audio_key(content):
+    return AudioCache.make_key(content, tts_service.voice, tts_service.model, tts_service.speed)
+
+def reimport_upload(file, book_id, isbn):
+    """Re-import a book from an uploaded edition, then drop its stale audio and re-index it"""
+    with open_upload(file) as upload:
+        if upload.in_memory:
+            source = upload.getvalue()
+        else:
+            upload.flush()
+            source = upload.path
+        result = BookReimporter(db, pdf_importer=pdf_importer, epub_importer=epub_importer).reimport(
+            source, secure_filename(file.filename), book_id, isbn
+        )
+    if result.get('status') == 'error':
+        return result
+    
+    # Audio is cached by page text; texts that no longer exist will not be asked for again
+    stale_contents = result.pop('stale_contents')
+    for content in stale_contents:
+        audio_cache.invalidate(page_audio_key(content))
+    result['stale_audio'] = len(stale_contents)
+    result['passages'] = reader.index_stored_pages(result['book_id'])
+    return result
+
+def requested_page_size():
+    """Page size requested by the client (?size=), defaulting to the processed page size"""
+    return clamp_page_size(request.args.get('size', type=int))
+
+def requested_page_range():
+    """(first, last) page from ?from=&to=, or None if the range is invalid or too long"""
+    first_page = request.args.get('from', 1, type=int)
+    last_page = request.args.get('to', first_page, type=int)
+    if first_page < 1 or last_page < first_page or last_page - first_page + 1 > MAX_PAGE_RANGE:
+        return None
+    return first_page, last_page
+
+def send_cached_audio(audio_file, cache_key, download_name):
+    """Send an open audio cache file with ETag/304 and Range (206) support for seeking"""
+    # send_file only knows the size of paths, and ranges need it
+    size = os.fstat(audio_file.fileno()).st_size
+    response = send_file(
+        audio_file,
+        mimetype='audio/mpeg',
+        as_attachment=True,
+        download_name=download_name,
+        conditional=False,
+        etag=cache_key,
+        max_age=0
+    )
+    response.content_length = size
+    try:
+        return response.make_conditional(request, accept_ranges=True, complete_length=size)
+    except Exception:
+        audio_file.close()
+        raise
+
+def warm_page_audio(book_id, page_number, page_size=DEFAULT_PAGE_SIZE):
+    """Synthesize a page into the audio cache if it is not there yet; returns whether it did"""
+    page = db.get_page_content(book_id, page_number, page_size)
+    if not page:
+        return False
+    cache_key = page_audio_key(page['content'])
+    if audio_cache.get(cache_key):
+        return False
+    audio_cache.get_or_create(cache_key, lambda: tts_service.text_to_speech(page['content']))
+    return True
+
+def warm_page_translation(book_id, page_number, page_size=DEFAULT_PAGE_SIZE):
+    """Translate a page into the translation cache if it is not there yet; returns whether it did"""
+    page = db.get_page_content(book_id, page_number, page_size)
+    if not page or translation_service.is_cached(page['content']):
+        return False
+    translation_service.translate_cached(page['content'])
+    return True
+
+def schedule_read_ahead(book_id, page_number, page_size=DEFAULT_PAGE_SIZE):
+    """Prepare the next pages in the background while this one is being read"""
+    warmers = {'audio': lambda b, p: warm_page_audio(b, p, page_size)}
+    if READ_AHEAD_TRANSLATE or request.args.get('prefetch_translation') == '1':
+        warmers['translation'] = lambda b, p: warm_page_translation(b, p, page_size)
+    # Pages past the end are skipped by the warmers, so the total is not needed here
+    read_ahead.schedule(reader_id(), book_id, page_number, None, warmers, page_size)
+
 @book_reader_bp.route('/api/books/import/pdf', methods=['POST'])
 def import_pdf():
     """Import a PDF file into the database"""
@@ -51,22 +164,82 @@ def import_pdf():
         author = request.form.get('author')
         isbn = request.form.get('isbn')
         
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        # Parse the PDF straight from the spooled request body
+        with open_upload(file) as upload:
+            result = pdf_importer.import_pdf_stream(
+                upload, secure_filename(file.filename), title, author, isbn
+            )
+        
+        if result.get('status') == 'error':
+            return jsonify({'error': result['error']}), 500
+        
+        return jsonify(result)
+        
+    except UploadTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@book_reader_bp.route('/api/books/import/epub', methods=['POST'])
+def import_epub():
+    """Import an EPUB file into the database, chapter by chapter"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    if not allowed_file(file.filename) or file_extension(file.filename) != 'epub':
+        return jsonify({'error': 'Invalid file type'}), 400
+    
+    try:
+        # Read the EPUB straight from the spooled request body
+        with open_upload(file) as upload:
+            result = epub_importer.import_epub_stream(
+                upload, secure_filename(file.filename),
+                request.form.get('title'), request.form.get('author'), request.form.get('isbn')
+            )
+        
+        if result.get('status') == 'error':
+            return jsonify({'error': result['error']}), 400
         
-        # Import PDF
-        result = pdf_importer.import_pdf(filepath, title, author, isbn)
+        return jsonify(result)
         
-        # Clean up
-        os.remove(filepath)
+    except UploadTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@book_reader_bp.route('/api/books/reimport', methods=['POST'])
+def reimport_book():
+    """Replace a book's text with a corrected edition, rewriting only the changed pages"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+    
+    book_id = request.form.get('book_id', type=int)
+    isbn = request.form.get('isbn')
+    if book_id is None and not isbn:
+        return jsonify({'error': 'book_id or isbn is required'}), 400
+    
+    try:
+        result = reimport_upload(file, book_id, isbn)
         
         if result.get('status') == 'error':
-            return jsonify({'error': result['error']}), 500
+            status = 404 if result['error'] == 'Book not found' else 400
+            return jsonify({'error': result['error']}), status
         
         return jsonify(result)
         
+    except UploadTooLarge:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -84,25 +257,25 @@ def import_txt():
         return jsonify({'error': 'Invalid file type'}), 400
     
     try:
-        # Read the uploaded file
-        content = file.read()
-        
         # Initialize TXT importer
         txt_importer = TXTImporter(db)
         
-        # Import the TXT file
-        result = txt_importer.import_txt_from_bytes(
-            content,
-            title=request.form.get('title') or file.filename,
-            author=request.form.get('author') or 'Unknown Author',
-            isbn=request.form.get('isbn')
-        )
+        # Import the TXT file from the spooled request body
+        with open_upload(file) as upload:
+            result = txt_importer.import_txt_stream(
+                upload,
+                title=request.form.get('title') or file.filename,
+                author=request.form.get('author') or 'Unknown Author',
+                isbn=request.form.get('isbn')
+            )
         
         if result.get('status') == 'error':
             return jsonify({'error': result['error']}), 400
             
         return jsonify(result)
         
+    except UploadTooLarge:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -120,26 +293,20 @@ def extract_txt_metadata():
         return jsonify({'error': 'Invalid file type'}), 400
     
     try:
-        # Save the uploaded file temporarily
-        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as temp_file:
-            content = file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
-        
         # Initialize TXT importer
         txt_importer = TXTImporter(db)
         
-        # Extract metadata
-        metadata = txt_importer.extract_metadata(temp_path)
-        
-        # Clean up
-        os.unlink(temp_path)
+        # Extract metadata from the spooled request body
+        with open_upload(file) as upload:
+            metadata = txt_importer.extract_metadata_from_stream(upload)
         
         if 'error' in metadata:
             return jsonify({'error': metadata['error']}), 400
             
         return jsonify(metadata)
         
+    except UploadTooLarge:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -147,59 +314,92 @@ def extract_txt_metadata():
 def get_books():
     """Get all books or search books"""
     query = request.args.get('q', '')
-    if query:
-        books = db.search_books(query)
-    else:
-        books = db.search_books('')  # Get all books
-    return jsonify(books)
+    library = db.get_library_version()
+    return conditional(
+        make_etag('books', query, library['version']),
+        library['updated_at'],
+        lambda: jsonify(db.search_books(query))
+    )
 
 @book_reader_bp.route('/api/books/<int:book_id>', methods=['GET'])
 def get_book(book_id):
     """Get book details"""
-    book = db.get_book(book_id)
-    if not book:
+    version = db.get_book_version(book_id)
+    if not version:
+        return jsonify({'error': 'Book not found'}), 404
+    return conditional(
+        make_etag('book', book_id, version['version']),
+        version['updated_at'],
+        lambda: jsonify(db.get_book(book_id))
+    )
+
+@book_reader_bp.route('/api/books/<int:book_id>/chapters', methods=['GET'])
+def get_chapters(book_id):
+    """List a book's chapters with the pages they span"""
+    version = db.get_book_version(book_id)
+    if not version:
         return jsonify({'error': 'Book not found'}), 404
-    return jsonify(book)
+    return conditional(
+        make_etag('chapters', book_id, version['version']),
+        version['updated_at'],
+        lambda: jsonify({'chapters': db.get_chapters(book_id)})
+    )
+
+@book_reader_bp.route('/api/books/<int:book_id>/chapters/<int:chapter_number>', methods=['GET'])
+def get_chapter(book_id, chapter_number):
+    """Get one chapter's text, read by offset"""
+    version = db.get_book_version(book_id)
+    if not version:
+        return jsonify({'error': 'Book not found'}), 404
+
+    def build():
+        chapter = db.get_chapter(book_id, chapter_number)
+        if not chapter:
+            return jsonify({'error': 'Chapter not found'}), 404
+        return jsonify(chapter)
+
+    return conditional(make_etag('chapter', book_id, chapter_number, version['version']), version['updated_at'], build)
 
 @book_reader_bp.route('/api/books/<int:book_id>/process', methods=['POST'])
 def process_book(book_id):
-    """Process a book's content into chunks of 1000 characters each."""
+    """Build the sentence/paragraph boundary index used to paginate a book."""
     try:
         book = db.get_book(book_id)
         if not book:
             return jsonify({"error": "Book not found"}), 404
 
         # Get the book's content
-        content = ""
-        if book.get('chapters'):
+        content = book.get('text_content') or ""
+        if not content and book.get('chapters') and all(chapter['content'] for chapter in book['chapters']):
+            # Pages are cut from text_content, so keep a single copy of the text there
             content = "\n".join(chapter['content'] for chapter in book['chapters'])
-        elif book.get('text_content'):
-            content = book['text_content']
-        else:
+            db.update_book(book_id, {'text_content': content})
+        if not content and book.get('total_pages'):
+            # Imported page by page: pages are already stored, only the passage index is built
+            passages = reader.index_stored_pages(book_id)
+            if passages:
+                return jsonify({
+                    "message": "Book processed successfully",
+                    "total_pages": book['total_pages'],
+                    "passages_indexed": passages
+                })
+        if not content:
             return jsonify({"error": "No content found in book"}), 400
 
-        # Process the content into chunks of 1000 characters
-        chunk_size = 1000
-        chunks = []
-        total_length = len(content)
-        
-        for i in range(0, total_length, chunk_size):
-            chunk = content[i:i + chunk_size]
-            chunks.append({
-                'offset': i,
-                'content': chunk,
-                'page_number': len(chunks) + 1
-            })
-        
-        # Store processed chunks in database
-        db.update_book(book_id, {
-            'processed_chunks': chunks,
-            'total_pages': len(chunks)
-        })
+        # One pass over the text; any page size can then be served from the index
+        index = BoundaryIndex.build(content)
+        db.save_text_index(book_id, index)
+        # Passage index for answering questions about any part of the book
+        passages = reader.index_book(book_id, content, index)
+
+        # Drop chunk copies left over from the old fixed-size pagination
+        if book.get('processed_chunks'):
+            db.update_book(book_id, {'processed_chunks': None})
 
         return jsonify({
             "message": "Book processed successfully",
-            "total_pages": len(chunks)
+            "total_pages": index.total_pages(DEFAULT_PAGE_SIZE),
+            "passages_indexed": passages
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -208,30 +408,98 @@ def process_book(book_id):
 def get_book_page(book_id, page_number):
     """Get a specific page of the processed book."""
     try:
-        # Get book from database
-        book = db.get_book(book_id)
-        if not book:
+        version = db.get_book_version(book_id)
+        if not version:
             return jsonify({"error": "Book not found"}), 404
 
-        # Check if book has been processed
-        if not book.get('processed_chunks'):
+        page_size = requested_page_size()
+
+        def build():
+            # Check if book has been processed
+            if not version['total_pages']:
+                return jsonify({
+                    "error": "Book not processed yet",
+                    "message": "Please process the book first using /api/books/{book_id}/process endpoint"
+                }), 400
+
+            # Get the requested page
+            page = db.get_page_content(book_id, page_number, page_size)
+            if not page:
+                return jsonify({"error": "Page not found"}), 404
+
             return jsonify({
-                "error": "Book not processed yet",
-                "message": "Please process the book first using /api/books/{book_id}/process endpoint"
-            }), 400
+                "page_number": page_number,
+                "content": page['content'],
+                "total_pages": page['total_pages'],
+                "page_size": page_size
+            })
 
-        # Get the requested page
-        chunks = book['processed_chunks']
-        page = next((chunk for chunk in chunks if chunk['page_number'] == page_number), None)
-        
-        if not page:
-            return jsonify({"error": "Page not found"}), 404
+        response = conditional(
+            make_etag('page', book_id, version['version'], page_number, page_size),
+            version['updated_at'],
+            build
+        )
+        if response.status_code in (200, 304):
+            schedule_read_ahead(book_id, page_number, page_size)
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify({
-            "page_number": page_number,
-            "content": page['content'],
-            "total_pages": book['total_pages']
-        })
+@book_reader_bp.route('/api/books/<int:book_id>/pages', methods=['GET'])
+def get_book_pages(book_id):
+    """Get a contiguous range of pages (?from=&to=), optionally paired with a stored translation (?translation=fa)."""
+    try:
+        version = db.get_book_version(book_id)
+        if not version:
+            return jsonify({"error": "Book not found"}), 404
+
+        page_range = requested_page_range()
+        if not page_range:
+            return jsonify({"error": f"Invalid page range (at most {MAX_PAGE_RANGE} pages)"}), 400
+        first_page, last_page = page_range
+
+        page_size = requested_page_size()
+        language = request.args.get('translation')
+        # Stored translations are cut at the default page size, so they only line up with it
+        translated_book_id = (db.get_latest_translation_id(book_id, language)
+                              if language and page_size == DEFAULT_PAGE_SIZE else None)
+
+        def build():
+            if not version['total_pages']:
+                return jsonify({
+                    "error": "Book not processed yet",
+                    "message": "Please process the book first using /api/books/{book_id}/process endpoint"
+                }), 400
+
+            result = db.get_page_range(book_id, first_page, last_page, page_size)
+            if not result:
+                return jsonify({"error": "Page not found"}), 404
+
+            pages = result['pages']
+            if language:
+                translations = (db.get_translated_pages(translated_book_id, first_page, last_page)
+                                if translated_book_id else {})
+                for page in pages:
+                    page['translation'] = translations.get(page['page_number'])
+
+            return jsonify({
+                "from": pages[0]['page_number'],
+                "to": pages[-1]['page_number'],
+                "pages": pages,
+                "total_pages": result['total_pages'],
+                "page_size": page_size,
+                "translation_book_id": translated_book_id
+            })
+
+        response = conditional(
+            make_etag('pages', book_id, version['version'], first_page, last_page, page_size,
+                      language, translated_book_id),
+            version['updated_at'],
+            build
+        )
+        if response.status_code in (200, 304):
+            schedule_read_ahead(book_id, last_page, page_size)
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -239,55 +507,58 @@ def get_book_page(book_id, page_number):
 def get_page_audio(book_id, page_number):
     """Generate and return audio for a specific page."""
     try:
-        book = db.get_book(book_id)
-        if not book:
+        version = db.get_book_version(book_id)
+        if not version:
             return jsonify({"error": "Book not found"}), 404
 
-        if 'processed_chunks' not in book:
+        if not version['total_pages']:
             return jsonify({"error": "Book not processed yet"}), 400
 
         # Get the requested page
-        chunks = book['processed_chunks']
-        page = next((chunk for chunk in chunks if chunk['page_number'] == page_number), None)
-        
+        page_size = requested_page_size()
+        page = db.get_page_content(book_id, page_number, page_size)
         if not page:
             return jsonify({"error": "Page not found"}), 404
 
-        # Generate audio for the page content
-        audio_data = tts_service.text_to_speech(page['content'])
-
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_file:
-            temp_file.write(audio_data)
-            temp_file_path = temp_file.name
-
-        # Send the audio file
-        return send_file(
-            temp_file_path,
-            mimetype='audio/mpeg',
-            as_attachment=True,
-            download_name=f'page_{page_number}.mp3'
-        )
+        read_ahead.record_request('audio', book_id, page_number, page_size)
+        schedule_read_ahead(book_id, page_number, page_size)
+
+        # Serve from the audio cache, synthesizing only on a miss
+        cache_key = page_audio_key(page['content'])
+        # An open handle, so eviction cannot delete the file before it is sent
+        audio_file = audio_cache.open_file(cache_key)
+
+        if not audio_file and request.args.get('stream') == '1':
+            # Relay provider chunks as they arrive and cache them on the way through
+            chunks = audio_cache.tee(cache_key, tts_service.stream_speech(page['content']))
+            response = Response(stream_with_context(chunks), mimetype='audio/mpeg')
+            response.headers['Content-Disposition'] = f'attachment; filename=page_{page_number}.mp3'
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        if not audio_file:
+            audio_file = audio_cache.open_or_create(
+                cache_key,
+                lambda: tts_service.text_to_speech(page['content'])
+            )
+
+        return send_cached_audio(audio_file, cache_key, f'page_{page_number}.mp3')
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        # Clean up temporary file
-        if 'temp_file_path' in locals():
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
 
 @book_reader_bp.route('/api/books/<int:book_id>/translate/<int:page_number>', methods=['POST'])
 def translate_page(book_id, page_number):
     try:
         # Get the page content
-        page_content = db.get_page_content(book_id, page_number)
+        page_size = requested_page_size()
+        page_content = db.get_page_content(book_id, page_number, page_size)
         if not page_content:
             return jsonify({'error': 'Page not found'}), 404
 
-        # Translate the content
-        translated_content = translation_service.translate_to_farsi(page_content['content'])
+        read_ahead.record_request('translation', book_id, page_number, page_size)
+
+        # Translate the content (read-ahead may already have done it)
+        translated_content = translation_service.translate_cached(page_content['content'])
 
         return jsonify({
             'translated_content': translated_content
@@ -295,16 +566,58 @@ def translate_page(book_id, page_number):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@book_reader_bp.route('/api/books/<int:book_id>/ask', methods=['POST'])
+def ask_question(book_id):
+    """Answer a question about the book from its most relevant passages."""
+    try:
+        data = request.get_json(silent=True) or {}
+        question = (data.get('question') or '').strip()
+        if not question:
+            return jsonify({'error': 'No question provided'}), 400
+
+        if not db.get_book_version(book_id):
+            return jsonify({'error': 'Book not found'}), 404
+
+        return jsonify({'answer': reader.ask_question(book_id, question)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@book_reader_bp.route('/api/books/<int:book_id>/analyze', methods=['POST'])
+def analyze_book(book_id):
+    """Summarize the whole book and analyze its themes (map-reduce over the full text)."""
+    try:
+        if not db.get_book_version(book_id):
+            return jsonify({'error': 'Book not found'}), 404
+
+        return jsonify(reader.analyze_theme(book_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@book_reader_bp.route('/api/read-ahead/stats', methods=['GET'])
+def read_ahead_stats():
+    """Report how much read-ahead work was done and how often it was used"""
+    return jsonify(read_ahead.metrics())
+
+@book_reader_bp.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Report cache sizes and how many upstream calls request coalescing saved"""
+    return jsonify({
+        'audio': audio_cache.stats(),
+        'translation': translation_service.cache_stats(),
+        'llm': translation_service.llm_cache.stats()
+    })
+
 @book_reader_bp.route('/api/books/<int:book_id>/process-translation', methods=['POST'])
 def process_book_translation(book_id):
     """Process and translate chunks of a book to Farsi."""
     try:
-        # Get the book from database
-        book = db.get_book(book_id)
+        # Get the book details (not its text) from database
+        book = db.get_book_meta(book_id)
         if not book:
             return jsonify({'error': 'Book not found'}), 404
 
-        if not book.get('processed_chunks'):
+        total_pages = book.get('total_pages')
+        if not total_pages:
             return jsonify({'error': 'Book has not been processed yet'}), 400
 
         # Get translation parameters from request
@@ -319,28 +632,21 @@ def process_book_translation(book_id):
         if pages_to_translate is not None and pages_to_translate < 1:
             return jsonify({'error': 'Number of pages must be greater than 0'}), 400
 
-        # Filter chunks based on page range
-        all_chunks = book['processed_chunks']
-        start_idx = next((i for i, chunk in enumerate(all_chunks) 
-                         if chunk['page_number'] == start_page), None)
-        
-        if start_idx is None:
+        if start_page > total_pages:
             return jsonify({'error': f'Start page {start_page} not found'}), 404
             
-        # Calculate end index based on pages_to_translate
+        # Calculate the last page based on pages_to_translate
         if pages_to_translate is not None:
-            end_idx = min(start_idx + pages_to_translate, len(all_chunks))
+            end_page = min(start_page + pages_to_translate - 1, total_pages)
         else:
-            end_idx = len(all_chunks)
+            end_page = total_pages
             
-        chunks_to_translate = all_chunks[start_idx:end_idx]
-        total_chunks = len(chunks_to_translate)
+        pages_to_process = range(start_page, end_page + 1)
+        total_chunks = len(pages_to_process)
         
         if total_chunks == 0:
             return jsonify({'error': 'No pages to translate in the specified range'}), 400
 
-        # Process each chunk
-        translated_chunks = []
         start_time = time.time()
         
         print(f"\nStarting translation of book: {book['title']}")
@@ -348,51 +654,70 @@ def process_book_translation(book_id):
         print(f"Total chunks to translate: {total_chunks}")
         print("=" * 50)
         
-        for i, chunk in enumerate(chunks_to_translate, 1):
-            try:
-                chunk_start_time = time.time()
-                
-                # Translate the chunk content with book title context
-                translated_content = translation_service.translate_to_farsi(
-                    chunk['content'],
-                    book_title=book['title']
-                )
-                
-                # Create translated chunk with only the fields we have
-                translated_chunk = {
-                    'content': translated_content,
-                    'page_number': chunk['page_number'],
-                    'offset': chunk.get('offset', i - 1)  # Use index as offset if not present
-                }
-                translated_chunks.append(translated_chunk)
-                
-                # Calculate progress and time estimates
-                progress = (i / total_chunks) * 100
-                elapsed_time = time.time() - start_time
-                avg_time_per_chunk = elapsed_time / i
-                remaining_chunks = total_chunks - i
-                estimated_time_remaining = remaining_chunks * avg_time_per_chunk
-                
-                # Calculate chunk processing time
-                chunk_time = time.time() - chunk_start_time
-                
-                # Print detailed progress
-                print(f"\nChunk {i}/{total_chunks} ({progress:.1f}%)")
-                print(f"Page: {chunk['page_number']}")
-                print(f"Processing time: {chunk_time:.2f} seconds")
-                print(f"Average time per chunk: {avg_time_per_chunk:.2f} seconds")
-                print(f"Estimated time remaining: {estimated_time_remaining/60:.1f} minutes")
-                print("-" * 30)
-                
-            except Exception as e:
-                print(f"\nError translating chunk {i}: {str(e)}")
-                print(f"Chunk data: {chunk}")  # Add this line to debug chunk structure
-                continue
-
-        # Create new translated version in database
+        def read_pages():
+            for page_number in pages_to_process:
+                try:
+                    page = db.get_page_content(book_id, page_number)
+                except Exception as e:
+                    print(f"\nError reading page {page_number}: {str(e)}")
+                    continue
+                # A page that cannot be cut (e.g. total_pages stored at another page size)
+                # is skipped rather than aborting the whole translation
+                if not page or not page.get('content'):
+                    print(f"\nSkipping unreadable page {page_number}")
+                    continue
+                yield page
+
+        def translate_chunks():
+            """Translate pages a few at a time, packed up to the model's token budget;
+            each batch is written to the database before the next is read"""
+            done = 0
+            for batch in translation_service.batch_pages(read_pages()):
+                try:
+                    chunk_start_time = time.time()
+                    
+                    # Translate the batch with book title context, one request per batch
+                    translations = translation_service.translate_pages(
+                        [chunk['content'] for chunk in batch],
+                        book_title=book['title']
+                    )
+                    done += len(batch)
+                    
+                    # Calculate progress and time estimates
+                    progress = (done / total_chunks) * 100
+                    elapsed_time = time.time() - start_time
+                    avg_time_per_chunk = elapsed_time / done
+                    remaining_chunks = total_chunks - done
+                    estimated_time_remaining = remaining_chunks * avg_time_per_chunk
+                    
+                    # Calculate batch processing time
+                    chunk_time = time.time() - chunk_start_time
+                    
+                    # Print detailed progress
+                    print(f"\nChunk {done}/{total_chunks} ({progress:.1f}%)")
+                    print(f"Pages: {batch[0]['page_number']}-{batch[-1]['page_number']}")
+                    print(f"Processing time: {chunk_time:.2f} seconds")
+                    print(f"Average time per chunk: {avg_time_per_chunk:.2f} seconds")
+                    print(f"Estimated time remaining: {estimated_time_remaining/60:.1f} minutes")
+                    print("-" * 30)
+                    
+                    # Create translated chunks with only the fields we have
+                    for chunk, translated_content in zip(batch, translations):
+                        yield {
+                            'content': translated_content,
+                            'page_number': chunk['page_number'],
+                            'start_offset': chunk.get('start_offset'),
+                            'end_offset': chunk.get('end_offset')
+                        }
+                    
+                except Exception as e:
+                    print(f"\nError translating pages {batch[0]['page_number']}-{batch[-1]['page_number']}: {str(e)}")
+                    continue
+
+        # Create new translated version in database, streaming pages into it
         translated_book_id = db.create_translated_version(
             book_id,
-            translated_chunks,
+            translate_chunks(),
             'fa',  # Farsi language code
             translation_service.model  # Pass the model name
         )
@@ -0,0 +1,671 @@
+"""
+Asyncio-native variant of the book reader blueprint for ASGI servers.
+
+Routes and responses match src/api/book_reader_api.py, but slow upstream calls
+(TTS, translation) are awaited on the async OpenAI client instead of holding a
+worker thread, and SQLite / parsing work is pushed to the default thread pool.
+Services and caches are shared with the sync module, so both apps see the same
+database, audio cache and translation cache.
+"""
+
+import asyncio
+import io
+import os
+import time
+
+from quart import Blueprint, Response, jsonify, make_response, request, send_file
+from quart.wrappers.response import DataBody
+from werkzeug.utils import secure_filename
+
+from ..services.pagination import BoundaryIndex, DEFAULT_PAGE_SIZE, clamp_page_size
+from ..services.prefetch import READ_AHEAD_TRANSLATE
+from ..services.txt_importer import TXTImporter
+from ..services.upload_stream import UploadTooLarge
+from .http_cache import (COMPRESS_MIMETYPES, apply_validators, encode_body, is_not_modified,
+                         make_etag, parse_timestamp)
+from .book_reader_api import (MAX_PAGE_RANGE, allowed_file, audio_cache, db, epub_importer, file_extension, open_upload,
+                              page_audio_key, pdf_importer, read_ahead, reader, reimport_upload, translation_service,
+                              tts_service, warm_page_audio, warm_page_translation)
+
+book_reader_async_bp = Blueprint('book_reader_async', __name__)
+
+# Pages translated concurrently by process-translation
+TRANSLATION_CONCURRENCY = int(os.getenv('TRANSLATION_CONCURRENCY', '4'))
+
+run_sync = asyncio.to_thread
+
+
+@book_reader_async_bp.errorhandler(UploadTooLarge)
+async def upload_too_large(e):
+    return jsonify({'error': str(e)}), 413
+
+
+@book_reader_async_bp.after_request
+async def compress(response):
+    """Compress large JSON/text bodies, same policy as the sync blueprint"""
+    if (response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES
+            or not isinstance(response.response, DataBody)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data, encoding = encode_body(request, await response.get_data())
+    if encoding:
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+async def conditional(etag, last_modified, build):
+    """Async counterpart of http_cache.conditional; build is a coroutine function"""
+    modified = parse_timestamp(last_modified)
+
+    if is_not_modified(request, etag, modified):
+        response = Response('', status=304)
+    else:
+        response = await make_response(await build())
+        if response.status_code != 200:
+            return response
+
+    return apply_validators(response, etag, modified)
+
+
+def reader_id():
+    """Identify the reader for per-user read-ahead limits"""
+    return request.headers.get('X-Reader-Id') or request.remote_addr or 'anonymous'
+
+
+def requested_page_size():
+    """Page size requested by the client (?size=), defaulting to the processed page size"""
+    return clamp_page_size(request.args.get('size', type=int))
+
+
+def requested_page_range():
+    """(first, last) page from ?from=&to=, or None if the range is invalid or too long"""
+    first_page = request.args.get('from', 1, type=int)
+    last_page = request.args.get('to', first_page, type=int)
+    if first_page < 1 or last_page < first_page or last_page - first_page + 1 > MAX_PAGE_RANGE:
+        return None
+    return first_page, last_page
+
+
+def schedule_read_ahead(book_id, page_number, page_size=DEFAULT_PAGE_SIZE):
+    """Queue read-ahead on the shared background scheduler (never blocks the event loop)"""
+    warmers = {'audio': lambda b, p: warm_page_audio(b, p, page_size)}
+    if READ_AHEAD_TRANSLATE or request.args.get('prefetch_translation') == '1':
+        warmers['translation'] = lambda b, p: warm_page_translation(b, p, page_size)
+    read_ahead.schedule(reader_id(), book_id, page_number, None, warmers, page_size)
+
+
+async def _uploaded_file():
+    """Validate the multipart upload; returns (file, error_response)"""
+    files = await request.files
+    if 'file' not in files:
+        return None, (jsonify({'error': 'No file provided'}), 400)
+
+    file = files['file']
+    if file.filename == '':
+        return None, (jsonify({'error': 'No file selected'}), 400)
+
+    if not allowed_file(file.filename):
+        return None, (jsonify({'error': 'Invalid file type'}), 400)
+
+    return file, None
+
+
+@book_reader_async_bp.route('/api/books/import/pdf', methods=['POST'])
+async def import_pdf():
+    """Import a PDF file into the database"""
+    file, error = await _uploaded_file()
+    if error:
+        return error
+
+    try:
+        form = await request.form
+
+        def run_import():
+            with open_upload(file) as upload:
+                return pdf_importer.import_pdf_stream(
+                    upload, secure_filename(file.filename),
+                    form.get('title'), form.get('author'), form.get('isbn')
+                )
+
+        result = await run_sync(run_import)
+
+        if result.get('status') == 'error':
+            return jsonify({'error': result['error']}), 500
+
+        return jsonify(result)
+
+    except UploadTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/books/import/epub', methods=['POST'])
+async def import_epub():
+    """Import an EPUB file into the database, chapter by chapter"""
+    file, error = await _uploaded_file()
+    if error:
+        return error
+    if file_extension(file.filename) != 'epub':
+        return jsonify({'error': 'Invalid file type'}), 400
+
+    try:
+        form = await request.form
+
+        def run_import():
+            with open_upload(file) as upload:
+                return epub_importer.import_epub_stream(
+                    upload, secure_filename(file.filename),
+                    form.get('title'), form.get('author'), form.get('isbn')
+                )
+
+        result = await run_sync(run_import)
+
+        if result.get('status') == 'error':
+            return jsonify({'error': result['error']}), 400
+
+        return jsonify(result)
+
+    except UploadTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/books/reimport', methods=['POST'])
+async def reimport_book():
+    """Replace a book's text with a corrected edition, rewriting only the changed pages"""
+    file, error = await _uploaded_file()
+    if error:
+        return error
+
+    form = await request.form
+    book_id = form.get('book_id', type=int)
+    isbn = form.get('isbn')
+    if book_id is None and not isbn:
+        return jsonify({'error': 'book_id or isbn is required'}), 400
+
+    try:
+        result = await run_sync(reimport_upload, file, book_id, isbn)
+
+        if result.get('status') == 'error':
+            status = 404 if result['error'] == 'Book not found' else 400
+            return jsonify({'error': result['error']}), status
+
+        return jsonify(result)
+
+    except UploadTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/books/import/txt', methods=['POST'])
+async def import_txt():
+    """Import a TXT file into the database"""
+    file, error = await _uploaded_file()
+    if error:
+        return error
+
+    try:
+        form = await request.form
+        txt_importer = TXTImporter(db)
+
+        def run_import():
+            with open_upload(file) as upload:
+                return txt_importer.import_txt_stream(
+                    upload,
+                    title=form.get('title') or file.filename,
+                    author=form.get('author') or 'Unknown Author',
+                    isbn=form.get('isbn')
+                )
+
+        result = await run_sync(run_import)
+
+        if result.get('status') == 'error':
+            return jsonify({'error': result['error']}), 400
+
+        return jsonify(result)
+
+    except UploadTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/books/import/txt/metadata', methods=['POST'])
+async def extract_txt_metadata():
+    """Extract metadata from a TXT file"""
+    file, error = await _uploaded_file()
+    if error:
+        return error
+
+    try:
+        txt_importer = TXTImporter(db)
+
+        def run_extract():
+            with open_upload(file) as upload:
+                return txt_importer.extract_metadata_from_stream(upload)
+
+        metadata = await run_sync(run_extract)
+
+        if 'error' in metadata:
+            return jsonify({'error': metadata['error']}), 400
+
+        return jsonify(metadata)
+
+    except UploadTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/books', methods=['GET'])
+async def get_books():
+    """Get all books or search books"""
+    query = request.args.get('q', '')
+    library = await run_sync(db.get_library_version)
+
+    async def build():
+        return jsonify(await run_sync(db.search_books, query))
+
+    return await conditional(make_etag('books', query, library['version']), library['updated_at'], build)
+
+
+@book_reader_async_bp.route('/api/books/<int:book_id>', methods=['GET'])
+async def get_book(book_id):
+    """Get book details"""
+    version = await run_sync(db.get_book_version, book_id)
+    if not version:
+        return jsonify({'error': 'Book not found'}), 404
+
+    async def build():
+        return jsonify(await run_sync(db.get_book, book_id))
+
+    return await conditional(make_etag('book', book_id, version['version']), version['updated_at'], build)
+
+
+@book_reader_async_bp.route('/api/books/<int:book_id>/chapters', methods=['GET'])
+async def get_chapters(book_id):
+    """List a book's chapters with the pages they span"""
+    version = await run_sync(db.get_book_version, book_id)
+    if not version:
+        return jsonify({'error': 'Book not found'}), 404
+
+    async def build():
+        return jsonify({'chapters': await run_sync(db.get_chapters, book_id)})
+
+    return await conditional(make_etag('chapters', book_id, version['version']), version['updated_at'], build)
+
+
+@book_reader_async_bp.route('/api/books/<int:book_id>/chapters/<int:chapter_number>', methods=['GET'])
+async def get_chapter(book_id, chapter_number):
+    """Get one chapter's text, read by offset"""
+    version = await run_sync(db.get_book_version, book_id)
+    if not version:
+        return jsonify({'error': 'Book not found'}), 404
+
+    async def build():
+        chapter = await run_sync(db.get_chapter, book_id, chapter_number)
+        if not chapter:
+            return jsonify({'error': 'Chapter not found'}), 404
+        return jsonify(chapter)
+
+    return await conditional(make_etag('chapter', book_id, chapter_number, version['version']),
+                             version['updated_at'], build)
+
+
+@book_reader_async_bp.route('/api/books/<int:book_id>/process', methods=['POST'])
+async def process_book(book_id):
+    """Build the sentence/paragraph boundary index used to paginate a book."""
+    try:
+        book = await run_sync(db.get_book, book_id)
+        if not book:
+            return jsonify({"error": "Book not found"}), 404
+
+        content = book.get('text_content') or ""
+        if not content and book.get('chapters') and all(chapter['content'] for chapter in book['chapters']):
+            content = "\n".join(chapter['content'] for chapter in book['chapters'])
+            await run_sync(db.update_book, book_id, {'text_content': content})
+        if not content and book.get('total_pages'):
+            # Imported page by page: pages are already stored, only the passage index is built
+            passages = await run_sync(reader.index_stored_pages, book_id)
+            if passages:
+                return jsonify({
+                    "message": "Book processed successfully",
+                    "total_pages": book['total_pages'],
+                    "passages_indexed": passages
+                })
+        if not content:
+            return jsonify({"error": "No content found in book"}), 400
+
+        index = await run_sync(BoundaryIndex.build, content)
+        await run_sync(db.save_text_index, book_id, index)
+        passages = await run_sync(reader.index_book, book_id, content, index)
+
+        if book.get('processed_chunks'):
+            await run_sync(db.update_book, book_id, {'processed_chunks': None})
+
+        return jsonify({
+            "message": "Book processed successfully",
+            "total_pages": index.total_pages(DEFAULT_PAGE_SIZE),
+            "passages_indexed": passages
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/books/<int:book_id>/page/<int:page_number>', methods=['GET'])
+async def get_book_page(book_id, page_number):
+    """Get a specific page of the processed book."""
+    try:
+        version = await run_sync(db.get_book_version, book_id)
+        if not version:
+            return jsonify({"error": "Book not found"}), 404
+
+        page_size = requested_page_size()
+
+        async def build():
+            if not version['total_pages']:
+                return jsonify({
+                    "error": "Book not processed yet",
+                    "message": "Please process the book first using /api/books/{book_id}/process endpoint"
+                }), 400
+
+            page = await run_sync(db.get_page_content, book_id, page_number, page_size)
+            if not page:
+                return jsonify({"error": "Page not found"}), 404
+
+            return jsonify({
+                "page_number": page_number,
+                "content": page['content'],
+                "total_pages": page['total_pages'],
+                "page_size": page_size
+            })
+
+        response = await conditional(
+            make_etag('page', book_id, version['version'], page_number, page_size),
+            version['updated_at'],
+            build
+        )
+        if response.status_code in (200, 304):
+            schedule_read_ahead(book_id, page_number, page_size)
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/books/<int:book_id>/pages', methods=['GET'])
+async def get_book_pages(book_id):
+    """Get a contiguous range of pages (?from=&to=), optionally paired with a stored translation (?translation=fa)."""
+    try:
+        version = await run_sync(db.get_book_version, book_id)
+        if not version:
+            return jsonify({"error": "Book not found"}), 404
+
+        page_range = requested_page_range()
+        if not page_range:
+            return jsonify({"error": f"Invalid page range (at most {MAX_PAGE_RANGE} pages)"}), 400
+        first_page, last_page = page_range
+
+        page_size = requested_page_size()
+        language = request.args.get('translation')
+        # Stored translations are cut at the default page size, so they only line up with it
+        translated_book_id = None
+        if language and page_size == DEFAULT_PAGE_SIZE:
+            translated_book_id = await run_sync(db.get_latest_translation_id, book_id, language)
+
+        async def build():
+            if not version['total_pages']:
+                return jsonify({
+                    "error": "Book not processed yet",
+                    "message": "Please process the book first using /api/books/{book_id}/process endpoint"
+                }), 400
+
+            result = await run_sync(db.get_page_range, book_id, first_page, last_page, page_size)
+            if not result:
+                return jsonify({"error": "Page not found"}), 404
+
+            pages = result['pages']
+            if language:
+                translations = {}
+                if translated_book_id:
+                    translations = await run_sync(db.get_translated_pages, translated_book_id, first_page, last_page)
+                for page in pages:
+                    page['translation'] = translations.get(page['page_number'])
+
+            return jsonify({
+                "from": pages[0]['page_number'],
+                "to": pages[-1]['page_number'],
+                "pages": pages,
+                "total_pages": result['total_pages'],
+                "page_size": page_size,
+                "translation_book_id": translated_book_id
+            })
+
+        response = await conditional(
+            make_etag('pages', book_id, version['version'], first_page, last_page, page_size,
+                      language, translated_book_id),
+            version['updated_at'],
+            build
+        )
+        if response.status_code in (200, 304):
+            schedule_read_ahead(book_id, last_page, page_size)
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/books/<int:book_id>/tts/<int:page_number>', methods=['GET'])
+async def get_page_audio(book_id, page_number):
+    """Generate and return audio for a specific page."""
+    try:
+        version = await run_sync(db.get_book_version, book_id)
+        if not version:
+            return jsonify({"error": "Book not found"}), 404
+
+        if not version['total_pages']:
+            return jsonify({"error": "Book not processed yet"}), 400
+
+        page_size = requested_page_size()
+        page = await run_sync(db.get_page_content, book_id, page_number, page_size)
+        if not page:
+            return jsonify({"error": "Page not found"}), 404
+
+        read_ahead.record_request('audio', book_id, page_number, page_size)
+        schedule_read_ahead(book_id, page_number, page_size)
+
+        cache_key = page_audio_key(page['content'])
+        audio_file = await run_sync(audio_cache.open_file, cache_key)
+
+        if not audio_file and request.args.get('stream') == '1':
+            chunks = audio_cache.atee(cache_key, tts_service.astream_speech(page['content']))
+            response = Response(chunks, mimetype='audio/mpeg')
+            response.headers['Content-Disposition'] = f'attachment; filename=page_{page_number}.mp3'
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        if not audio_file:
+            audio_file = await audio_cache.aopen_or_create(
+                cache_key,
+                lambda: tts_service.atext_to_speech(page['content'])
+            )
+
+        # Quart sends files by path (opened again at send time, after eviction may have
+        # removed it) or from memory, so the handle opened under the cache lock is read in
+        with audio_file:
+            audio = io.BytesIO(await run_sync(audio_file.read))
+
+        response = await send_file(
+            audio,
+            mimetype='audio/mpeg',
+            as_attachment=True,
+            attachment_filename=f'page_{page_number}.mp3'
+        )
+        # Quart only derives an ETag for files sent by path, so the content key is set
+        # here, before the If-None-Match / Range handling that depends on it
+        response.set_etag(cache_key)
+        response.cache_control.public = False
+        response.cache_control.no_cache = True
+        await response.make_conditional(request, accept_ranges=True, complete_length=len(audio.getbuffer()))
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/books/<int:book_id>/translate/<int:page_number>', methods=['POST'])
+async def translate_page(book_id, page_number):
+    try:
+        page_size = requested_page_size()
+        page_content = await run_sync(db.get_page_content, book_id, page_number, page_size)
+        if not page_content:
+            return jsonify({'error': 'Page not found'}), 404
+
+        read_ahead.record_request('translation', book_id, page_number, page_size)
+
+        translated_content = await translation_service.atranslate_cached(page_content['content'])
+
+        return jsonify({
+            'translated_content': translated_content
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/books/<int:book_id>/ask', methods=['POST'])
+async def ask_question(book_id):
+    """Answer a question about the book from its most relevant passages."""
+    try:
+        data = await request.get_json(silent=True) or {}
+        question = (data.get('question') or '').strip()
+        if not question:
+            return jsonify({'error': 'No question provided'}), 400
+
+        if not await run_sync(db.get_book_version, book_id):
+            return jsonify({'error': 'Book not found'}), 404
+
+        return jsonify({'answer': await reader.aask_question(book_id, question)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/books/<int:book_id>/analyze', methods=['POST'])
+async def analyze_book(book_id):
+    """Summarize the whole book and analyze its themes (map-reduce over the full text)."""
+    try:
+        if not await run_sync(db.get_book_version, book_id):
+            return jsonify({'error': 'Book not found'}), 404
+
+        return jsonify(await reader.aanalyze_theme(book_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@book_reader_async_bp.route('/api/read-ahead/stats', methods=['GET'])
+async def read_ahead_stats():
+    """Report how much read-ahead work was done and how often it was used"""
+    return jsonify(read_ahead.metrics())
+
+
+@book_reader_async_bp.route('/api/cache/stats', methods=['GET'])
+async def cache_stats():
+    """Report cache sizes and how many upstream calls request coalescing saved"""
+    return jsonify({
+        'audio': audio_cache.stats(),
+        'translation': translation_service.cache_stats(),
+        'llm': translation_service.llm_cache.stats()
+    })
+
+
+@book_reader_async_bp.route('/api/books/<int:book_id>/process-translation', methods=['POST'])
+async def process_book_translation(book_id):
+    """Process and translate chunks of a book to Farsi, several pages at a time."""
+    try:
+        version = await run_sync(db.get_book_version, book_id)
+        if not version:
+            return jsonify({'error': 'Book not found'}), 404
+
+        total_pages = version['total_pages']
+        if not total_pages:
+            return jsonify({'error': 'Book has not been processed yet'}), 400
+
+        data = await request.get_json(silent=True) or {}
+        start_page = data.get('start_page', 1)
+        pages_to_translate = data.get('pages', None)
+
+        if start_page < 1:
+            return jsonify({'error': 'Start page must be greater than 0'}), 400
+
+        if pages_to_translate is not None and pages_to_translate < 1:
+            return jsonify({'error': 'Number of pages must be greater than 0'}), 400
+
+        if start_page > total_pages:
+            return jsonify({'error': f'Start page {start_page} not found'}), 404
+
+        if pages_to_translate is not None:
+            end_page = min(start_page + pages_to_translate - 1, total_pages)
+        else:
+            end_page = total_pages
+
+        book = await run_sync(db.get_book_meta, book_id)
+        semaphore = asyncio.Semaphore(TRANSLATION_CONCURRENCY)
+        start_time = time.time()
+
+        async def translate(batch):
+            async with semaphore:
+                try:
+                    contents = await translation_service.atranslate_pages(
+                        [page['content'] for page in batch],
+                        book_title=book['title']
+                    )
+                except Exception as e:
+                    print(f"\nError translating pages {batch[0]['page_number']}-{batch[-1]['page_number']}: {str(e)}")
+                    return []
+                return [{
+                    'content': content,
+                    'page_number': page['page_number'],
+                    'start_offset': page.get('start_offset'),
+                    'end_offset': page.get('end_offset')
+                } for page, content in zip(batch, contents)]
+
+        total_chunks = end_page - start_page + 1
+        translated_book_id = await run_sync(
+            db.create_translated_version,
+            book_id,
+            [],
+            'fa',
+            translation_service.model
+        )
+        if not translated_book_id:
+            return jsonify({'error': 'Failed to create translated version'}), 500
+
+        # Translate a window of pages at a time and store it before starting the next,
+        # so memory use does not grow with the length of the book. Within a window,
+        # consecutive pages are packed into requests up to the model's token budget.
+        window = TRANSLATION_CONCURRENCY * 16
+        for first in range(start_page, end_page + 1, window):
+            last = min(first + window - 1, end_page)
+            pages = await run_sync(db.get_page_range, book_id, first, last)
+            # Pages that cannot be cut are skipped rather than aborting the whole translation
+            readable = [page for page in pages['pages'] if page and page.get('content')] if pages else []
+            batches = list(translation_service.batch_pages(readable))
+            results = await asyncio.gather(*(translate(batch) for batch in batches))
+            await run_sync(db.add_book_pages, translated_book_id, [chunk for chunks in results for chunk in chunks])
+
+        total_time = time.time() - start_time
+        return jsonify({
+            'message': 'Translation completed successfully',
+            'translated_book_id': translated_book_id,
+            'total_time': f"{total_time/60:.1f} minutes",
+            'total_chunks': total_chunks,
+            'start_page': start_page,
+            'end_page': end_page
+        })
+
+    except Exception as e:
+        print(f"\nTranslation processing error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
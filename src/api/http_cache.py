@@ -0,0 +1,103 @@
+import gzip
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import Callable, Optional, Tuple
+
+from flask import Response, make_response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Responses smaller than this are not worth compressing
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_MIMETYPES = {'application/json', 'text/plain', 'text/html'}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def make_etag(*parts) -> str:
+    """Build an ETag value from the parts that identify a representation"""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse a SQLite CURRENT_TIMESTAMP string (UTC) into an aware datetime"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def is_not_modified(req, etag: str, modified: Optional[datetime]) -> bool:
+    """Whether the client's cached copy (If-None-Match / If-Modified-Since) is still current"""
+    if req.if_none_match:
+        return req.if_none_match.contains_weak(etag)
+    if modified and req.if_modified_since:
+        return modified <= req.if_modified_since
+    return False
+
+
+def apply_validators(response, etag: str, modified: Optional[datetime]):
+    """Attach the ETag / Last-Modified headers and require revalidation"""
+    response.set_etag(etag, weak=True)
+    if modified:
+        response.last_modified = modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional(etag: str, last_modified: Optional[str], build: Callable[[], Response]) -> Response:
+    """Answer 304 when the client already has this representation, otherwise build it.
+
+    The body is only built on a miss, so polling clients skip the database work and
+    serialization entirely. ETags are weak because the same representation may be
+    sent gzip- or brotli-encoded.
+    """
+    modified = parse_timestamp(last_modified)
+
+    if is_not_modified(request, etag, modified):
+        response = Response(status=304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+
+    return apply_validators(response, etag, modified)
+
+
+def should_compress(response) -> bool:
+    return not (response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESS_MIMETYPES)
+
+
+def encode_body(req, body: bytes) -> Tuple[bytes, Optional[str]]:
+    """Compress body with the best encoding the client accepts; returns (data, encoding)"""
+    if len(body) < COMPRESS_MIN_SIZE:
+        return body, None
+    accepted = req.accept_encodings
+    if brotli is not None and accepted['br']:
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    if accepted['gzip']:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), 'gzip'
+    return body, None
+
+
+def compress_response(response: Response) -> Response:
+    """Compress large text responses with brotli or gzip, depending on what the client accepts"""
+    if not should_compress(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data, encoding = encode_body(request, response.get_data())
+    if encoding:
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+    return response
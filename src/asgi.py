@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+RoboBook - نسخه ASGI رابط برنامه‌نویسی کتاب‌خوان
+
+اجرا:
+    hypercorn src.asgi:app --bind 0.0.0.0:5000
+"""
+
+import os
+import sys
+
+from dotenv import load_dotenv
+from quart import Quart
+from quart_cors import cors
+
+# تنظیم مسیر برای import‌های نسبی
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# بارگذاری تنظیمات از فایل .env
+load_dotenv()
+
+from src.api.book_reader_async_api import book_reader_async_bp
+from src.services.upload_stream import MAX_REQUEST_SIZE
+
+app = Quart(__name__)
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_SIZE
+app = cors(app)
+
+app.register_blueprint(book_reader_async_bp)
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', '5000')))
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Command line tools for the book library.
+
+Usage:
+    python -m src.cli import-dir /path/to/library
+    python -m src.cli import-dir /path/to/library --workers 4 --batch 50 --db books.db
+
+import-dir imports every PDF, TXT and EPUB file under a directory. Files are hashed and
+duplicates imported once, text is extracted and cleaned in a process pool, and books
+are written to the database in batched transactions. Books past the single-file
+importers' streaming thresholds (PDF_STREAM_MIN_PAGES, TXT_STREAM_MIN_BYTES) are
+imported afterwards page by page instead, so their text is never held whole. Finished
+files are recorded in a manifest (.robobook-import.jsonl in the directory by default),
+so an interrupted run picks up where it stopped.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import fitz
+from tqdm import tqdm
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.book_db import BookDatabase
+from src.services.epub_importer import EPUBImporter
+from src.services.pdf_importer import PDF_STREAM_MIN_PAGES, PDFImporter
+from src.services.txt_importer import TXT_STREAM_MIN_BYTES, TXTImporter
+
+IMPORT_EXTENSIONS = ('.pdf', '.txt', '.epub')
+MANIFEST_NAME = '.robobook-import.jsonl'
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'books.db')
+# Manifest statuses that are not retried on the next run
+FINISHED = ('imported', 'duplicate')
+
+
+def find_files(directory: str) -> List[str]:
+    """Importable files (PDF, TXT, EPUB) under a directory, in a stable order"""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        paths.extend(os.path.join(root, name) for name in sorted(files)
+                     if name.lower().endswith(IMPORT_EXTENSIONS))
+    return paths
+
+
+def file_hash(path: str, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def streams_pages(path: str, size: int) -> bool:
+    """Whether a file is big enough to be imported page by page, as the single-file importers would"""
+    if path.lower().endswith('.txt'):
+        return size >= TXT_STREAM_MIN_BYTES
+    if path.lower().endswith('.pdf'):
+        try:
+            doc = fitz.open(path)
+        except Exception:
+            # Left to extraction, which reports the error
+            return False
+        try:
+            return len(doc) >= PDF_STREAM_MIN_PAGES
+        finally:
+            doc.close()
+    return False
+
+
+def import_streamed(db: BookDatabase, path: str, workers: int) -> Dict:
+    """Import one large file straight into book_pages; returns the importer's result"""
+    if path.lower().endswith('.pdf'):
+        # Pages are extracted by the importer's own process pool
+        return PDFImporter(db, workers=workers).import_pdf(path, stream=True)
+    return TXTImporter(db).import_txt(path, stream=True)
+
+
+def extract_file(path: str) -> Dict:
+    """Extract and clean one file; runs in a worker process"""
+    if path.lower().endswith('.pdf'):
+        # The pool already spreads files over the CPUs, so pages are not split further
+        return PDFImporter(None, workers=1).extract_book(path)
+    if path.lower().endswith('.epub'):
+        return EPUBImporter(None).extract_book(path)
+    return TXTImporter(None).extract_book(path)
+
+
+class ImportManifest:
+    """Append-only JSON lines record of the files a directory import has handled.
+
+    The last entry for a path wins. Finished files whose size and modification time
+    are unchanged are skipped without being hashed again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by an interrupted run
+                        continue
+                    self.entries[entry['path']] = entry
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def finished(self, path: str, stat: os.stat_result) -> bool:
+        entry = self.entries.get(path)
+        return bool(entry and entry['status'] in FINISHED
+                    and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime)
+
+    def imported_hashes(self) -> Dict[str, str]:
+        """Content hash of every finished file, mapped to its path"""
+        return {entry['sha256']: path for path, entry in self.entries.items()
+                if entry['status'] in FINISHED}
+
+    def record(self, entry: Dict):
+        self.entries[entry['path']] = entry
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def iter_extracted(paths: List[str], workers: int) -> Iterator[Tuple[str, Optional[Dict], Optional[str]]]:
+    """(path, book, error) for each file, in completion order.
+
+    At most two files per worker are in flight, so extracted books do not pile up
+    ahead of the database writer.
+    """
+    if workers <= 1:
+        for path in paths:
+            try:
+                yield path, extract_file(path), None
+            except Exception as e:
+                yield path, None, str(e)
+        return
+
+    # spawn, like the PDF page extraction, so workers start without inherited state
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        queue = iter(paths)
+        pending = {}
+        while True:
+            for path in queue:
+                pending[executor.submit(extract_file, path)] = path
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    yield path, future.result(), None
+                except Exception as e:
+                    yield path, None, str(e)
+
+
+def import_directory(db: BookDatabase, directory: str, workers: int = os.cpu_count() or 1,
+                     batch_size: int = 20, manifest_path: Optional[str] = None,
+                     progress: bool = True) -> Counter:
+    """Import every PDF, TXT and EPUB file under a directory; returns counts per outcome"""
+    manifest = ImportManifest(manifest_path or os.path.join(directory, MANIFEST_NAME))
+    counts = Counter()
+    try:
+        # Hash new and changed files, importing each content only once
+        known = manifest.imported_hashes()
+        todo = {}
+        extracted, streamed = [], []
+        # Copies of a file imported in this run wait until its book is committed
+        duplicates = {}
+        for path in tqdm(find_files(directory), desc='Hashing', unit='file', disable=not progress):
+            relative = os.path.relpath(path, directory)
+            stat = os.stat(path)
+            if manifest.finished(relative, stat):
+                counts['skipped'] += 1
+                continue
+            entry = {'path': relative, 'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': file_hash(path)}
+            original = known.get(entry['sha256'])
+            if original in duplicates:
+                duplicates[original].append(entry)
+                continue
+            if original is not None:
+                manifest.record(dict(entry, status='duplicate', duplicate_of=original))
+                counts['duplicate'] += 1
+                continue
+            known[entry['sha256']] = relative
+            duplicates[relative] = []
+            todo[path] = entry
+            (streamed if streams_pages(path, stat.st_size) else extracted).append(path)
+
+        def imported(entry, book_id, title):
+            manifest.record(dict(entry, status='imported', book_id=book_id, title=title))
+            counts['imported'] += 1
+            for duplicate in duplicates.pop(entry['path']):
+                manifest.record(dict(duplicate, status='duplicate', duplicate_of=entry['path']))
+                counts['duplicate'] += 1
+
+        def failed(entry, error):
+            # Copies are retried with the original on the next run
+            for copy in [entry] + duplicates.pop(entry['path']):
+                manifest.record(dict(copy, status='failed', error=error))
+                counts['failed'] += 1
+            bar.write(f"{entry['path']}: {error}", file=sys.stderr)
+
+        batch = []
+
+        def flush():
+            # Files are only marked done once their books are committed
+            book_ids = db.add_books([book for _, book in batch])
+            for (entry, book), book_id in zip(batch, book_ids):
+                imported(entry, book_id, book['title'])
+            batch.clear()
+
+        with tqdm(total=len(todo), desc='Importing', unit='file', disable=not progress) as bar:
+            for path, book, error in iter_extracted(extracted, workers):
+                if error is None:
+                    batch.append((todo[path], book))
+                    if len(batch) >= batch_size:
+                        flush()
+                else:
+                    failed(todo[path], error)
+                bar.update(1)
+            if batch:
+                flush()
+
+            # Large books write their own pages as they are extracted, one at a time
+            for path in streamed:
+                result = import_streamed(db, path, workers)
+                if result['status'] == 'success':
+                    imported(todo[path], result['book_id'], result['title'])
+                else:
+                    failed(todo[path], result['error'])
+                bar.update(1)
+    finally:
+        manifest.close()
+
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='robobook', description='RoboBook library tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_dir = commands.add_parser('import-dir', help='import every PDF, TXT and EPUB file under a directory')
+    import_dir.add_argument('directory')
+    import_dir.add_argument('--db', default=DEFAULT_DB_PATH, help='database file (default: the reader app database)')
+    import_dir.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='extraction processes (1 extracts in this process)')
+    import_dir.add_argument('--batch', type=int, default=20, help='books written per transaction')
+    import_dir.add_argument('--manifest', help=f'progress manifest (default: DIRECTORY/{MANIFEST_NAME})')
+    import_dir.add_argument('--quiet', action='store_true', help='no progress bars')
+
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f'not a directory: {args.directory}')
+    counts = import_directory(
+        BookDatabase(args.db),
+        args.directory,
+        workers=args.workers,
+        batch_size=max(1, args.batch),
+        manifest_path=args.manifest,
+        progress=not args.quiet
+    )
+    print(', '.join(f'{outcome}: {counts[outcome]}'
+                    for outcome in ('imported', 'duplicate', 'skipped', 'failed')))
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,10 @@
 import sqlite3
+import hashlib
 import json
 import os
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Iterable, Iterator, Optional, Any, Tuple
+from ..services.pagination import BoundaryIndex, DEFAULT_PAGE_SIZE, PAGE_SEPARATOR
+from ..services.retrieval import BM25Index
 
 class BookDatabase:
     def __init__(self, db_path: str):
@@ -39,6 +42,46 @@ class BookDatabase:
             cursor.execute('ALTER TABLE books ADD COLUMN processed_chunks TEXT')
             cursor.execute('ALTER TABLE books ADD COLUMN total_pages INTEGER')
 
+        # Version counter and modification time used for HTTP conditional requests
+        if 'version' not in columns:
+            cursor.execute('ALTER TABLE books ADD COLUMN version INTEGER DEFAULT 1')
+        if 'updated_at' not in columns:
+            cursor.execute('ALTER TABLE books ADD COLUMN updated_at TIMESTAMP')
+            cursor.execute('UPDATE books SET updated_at = created_at')
+
+        # Written by create_translated_version but missing from the original schema
+        if 'translation_model' not in columns:
+            cursor.execute('ALTER TABLE books ADD COLUMN translation_model TEXT')
+
+        # Lookup of a book's translations when pairing pages with their translation
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_books_translations
+            ON books (original_book_id, translation_language)
+        ''')
+
+        # Library-wide change counter for list ETags; triggers bump it on every write to
+        # books, so adding, changing or deleting any book always gives a new value
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS library_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL,
+                updated_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            INSERT OR IGNORE INTO library_version (id, version, updated_at)
+            VALUES (1, 0, (SELECT MAX(COALESCE(updated_at, created_at)) FROM books))
+        ''')
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS books_{event.lower()}_library_version
+                AFTER {event} ON books
+                BEGIN
+                    UPDATE library_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = 1;
+                END
+            ''')
+
         # Create chapters table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS chapters (
@@ -51,6 +94,87 @@ class BookDatabase:
             )
         ''')
 
+        # Chapters detected at import are stored as offsets into the book's text (content is
+        # only set for chapters added one by one) together with the pages they span
+        cursor.execute("PRAGMA table_info(chapters)")
+        chapter_columns = [column[1] for column in cursor.fetchall()]
+        for column in ('start_offset', 'end_offset', 'start_page', 'end_page'):
+            if column not in chapter_columns:
+                cursor.execute(f'ALTER TABLE chapters ADD COLUMN {column} INTEGER')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_chapters_book
+            ON chapters (book_id, chapter_number)
+        ''')
+
+        # Sentence/paragraph boundary index used to paginate text_content at read time
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS book_text_index (
+                book_id INTEGER PRIMARY KEY,
+                text_length INTEGER NOT NULL,
+                word_step INTEGER NOT NULL,
+                paragraphs BLOB,
+                sentences BLOB,
+                words BLOB,
+                FOREIGN KEY (book_id) REFERENCES books (id)
+            )
+        ''')
+
+        # Stored page text for books that are not paginated from text_content (translations)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS book_pages (
+                book_id INTEGER NOT NULL,
+                page_number INTEGER NOT NULL,
+                start_offset INTEGER,
+                end_offset INTEGER,
+                content TEXT NOT NULL,
+                content_hash TEXT,
+                PRIMARY KEY (book_id, page_number),
+                FOREIGN KEY (book_id) REFERENCES books (id)
+            )
+        ''')
+
+        # BM25 passage index (one passage per page) used to answer questions about a book
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS book_passage_index (
+                book_id INTEGER PRIMARY KEY,
+                page_size INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                FOREIGN KEY (book_id) REFERENCES books (id)
+            )
+        ''')
+
+        # Partial summaries from map-reduce summarization, keyed by the hash of their input
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS text_summaries (
+                content_hash TEXT PRIMARY KEY,
+                level INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Final summaries per book ('book') and chapter ('chapter:<n>'), tied to the book version
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS book_summaries (
+                book_id INTEGER NOT NULL,
+                scope TEXT NOT NULL,
+                book_version INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (book_id, scope),
+                FOREIGN KEY (book_id) REFERENCES books (id)
+            )
+        ''')
+
+        # AI enrichment (characters, key points, vocabulary) keyed by chapter content hash
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chapter_enrichments (
+                content_hash TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
         # Create bookmarks table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS bookmarks (
@@ -74,8 +198,8 @@ class BookDatabase:
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO books (title, author, isbn, text_content)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO books (title, author, isbn, text_content, version, updated_at)
+            VALUES (?, ?, ?, ?, 1, CURRENT_TIMESTAMP)
         ''', (title, author, isbn, text_content))
         
         book_id = cursor.lastrowid
@@ -84,6 +208,38 @@ class BookDatabase:
         
         return book_id
 
+    def add_books(self, books: List[Dict[str, Any]]) -> List[int]:
+        """Add several books (title, author, isbn, text_content, chapters) in one transaction; returns their IDs."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        book_ids = []
+        try:
+            for book in books:
+                cursor.execute('''
+                    INSERT INTO books (title, author, isbn, text_content, version, updated_at)
+                    VALUES (?, ?, ?, ?, 1, CURRENT_TIMESTAMP)
+                ''', (book['title'], book.get('author'), book.get('isbn'), book.get('text_content')))
+                book_id = cursor.lastrowid
+                cursor.executemany('''
+                    INSERT INTO chapters
+                        (book_id, chapter_number, title, start_offset, end_offset, start_page, end_page)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', [
+                    (book_id, chapter['chapter_number'], chapter['title'], chapter['start_offset'],
+                     chapter['end_offset'], chapter.get('start_page'), chapter.get('end_page'))
+                    for chapter in book.get('chapters', [])
+                ])
+                book_ids.append(book_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        return book_ids
+
     def get_book(self, book_id: int) -> Optional[Dict[str, Any]]:
         """Get a book by ID."""
         conn = sqlite3.connect(self.db_path)
@@ -149,7 +305,11 @@ class BookDatabase:
             values.append(value)
         
         values.append(book_id)
-        
+
+        # Every change bumps the version so cached responses are invalidated
+        update_fields.append("version = COALESCE(version, 1) + 1")
+        update_fields.append("updated_at = CURRENT_TIMESTAMP")
+
         query = f'''
             UPDATE books 
             SET {', '.join(update_fields)}
@@ -164,6 +324,41 @@ class BookDatabase:
         
         return success
 
+    def get_book_version(self, book_id: int) -> Optional[Dict[str, Any]]:
+        """Get a book's version counter and last modification time without loading its content."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT version, COALESCE(updated_at, created_at), total_pages FROM books WHERE id = ?
+        ''', (book_id,))
+
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+        return {'version': row[0] or 1, 'updated_at': row[1], 'total_pages': row[2]}
+
+    def get_library_version(self) -> Dict[str, Any]:
+        """Get the library's change counter and last modification time, for list-level caching.
+
+        The counter covers the whole library, so any write to any book changes the
+        version of every search.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT version, updated_at FROM library_version WHERE id = 1')
+
+        version, updated_at = cursor.fetchone()
+        conn.close()
+
+        return {
+            'version': version,
+            'updated_at': updated_at
+        }
+
     def search_books(self, query: str) -> List[Dict[str, Any]]:
         """Search books by title or author."""
         conn = sqlite3.connect(self.db_path)
@@ -204,13 +399,112 @@ class BookDatabase:
             INSERT INTO chapters (book_id, chapter_number, title, content)
             VALUES (?, ?, ?, ?)
         ''', (book_id, chapter_number, title, content))
-        
+
         chapter_id = cursor.lastrowid
+
+        # Chapters are part of the book representation
+        cursor.execute('''
+            UPDATE books SET version = COALESCE(version, 1) + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (book_id,))
+
         conn.commit()
         conn.close()
         
         return chapter_id
 
+    def save_chapters(self, book_id: int, chapters: List[Dict[str, Any]]) -> None:
+        """Replace a book's chapters with detected ones (chapter_number, title, offsets, optional pages)."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('DELETE FROM chapters WHERE book_id = ?', (book_id,))
+        cursor.executemany('''
+            INSERT INTO chapters
+                (book_id, chapter_number, title, start_offset, end_offset, start_page, end_page)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (book_id, chapter['chapter_number'], chapter['title'], chapter['start_offset'],
+             chapter['end_offset'], chapter.get('start_page'), chapter.get('end_page'))
+            for chapter in chapters
+        ])
+
+        conn.commit()
+        conn.close()
+
+    def save_chapter_pages(self, book_id: int, index: BoundaryIndex, page_size: int = DEFAULT_PAGE_SIZE) -> None:
+        """Set the page range of each chapter from a book's boundary index."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT id, start_offset, end_offset FROM chapters
+            WHERE book_id = ? AND start_offset IS NOT NULL
+        ''', (book_id,))
+        cursor.executemany('UPDATE chapters SET start_page = ?, end_page = ? WHERE id = ?', [
+            (index.page_of(start, page_size), index.page_of(max(start, end - 1), page_size), chapter_id)
+            for chapter_id, start, end in cursor.fetchall()
+        ])
+
+        conn.commit()
+        conn.close()
+
+    def get_chapters(self, book_id: int) -> List[Dict[str, Any]]:
+        """List a book's chapters without their text."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT id, chapter_number, title, start_offset, end_offset, start_page, end_page
+            FROM chapters WHERE book_id = ?
+            ORDER BY chapter_number
+        ''', (book_id,))
+
+        rows = cursor.fetchall()
+        conn.close()
+
+        return [
+            {
+                'id': row[0],
+                'chapter_number': row[1],
+                'title': row[2],
+                'start_offset': row[3],
+                'end_offset': row[4],
+                'start_page': row[5],
+                'end_page': row[6]
+            }
+            for row in rows
+        ]
+
+    def get_chapter(self, book_id: int, chapter_number: int) -> Optional[Dict[str, Any]]:
+        """Get one chapter with its text, read by offset from the book's text."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT id, chapter_number, title, content, start_offset, end_offset, start_page, end_page
+            FROM chapters WHERE book_id = ? AND chapter_number = ?
+        ''', (book_id, chapter_number))
+
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+        content = row[3]
+        if content is None and row[4] is not None:
+            content = self.get_text_slice(book_id, row[4], row[5]) or ''
+        return {
+            'id': row[0],
+            'chapter_number': row[1],
+            'title': row[2],
+            'content': content,
+            'start_offset': row[4],
+            'end_offset': row[5],
+            'start_page': row[6],
+            'end_page': row[7]
+        }
+
     def get_bookmarks(self, book_id: int) -> List[Dict[str, Any]]:
         """Get all bookmarks for a book."""
         conn = sqlite3.connect(self.db_path)
@@ -260,18 +554,207 @@ class BookDatabase:
         
         return bookmark_id
 
-    def get_page_content(self, book_id: int, page_number: int) -> dict:
+    def get_enrichment(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Get stored AI enrichment for a chapter content hash."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT data FROM chapter_enrichments WHERE content_hash = ?', (content_hash,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        return json.loads(row[0]) if row else None
+
+    def save_enrichment(self, content_hash: str, data: Dict[str, Any]) -> None:
+        """Store AI enrichment for a chapter content hash."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT OR REPLACE INTO chapter_enrichments (content_hash, data) VALUES (?, ?)
+        ''', (content_hash, json.dumps(data, ensure_ascii=False)))
+        
+        conn.commit()
+        conn.close()
+
+    def get_text_summary(self, content_hash: str) -> Optional[str]:
+        """Get a stored partial summary by the hash of its input."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT summary FROM text_summaries WHERE content_hash = ?', (content_hash,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        return row[0] if row else None
+
+    def save_text_summary(self, content_hash: str, level: int, summary: str) -> None:
+        """Store a partial summary by the hash of its input."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT OR REPLACE INTO text_summaries (content_hash, level, summary) VALUES (?, ?, ?)
+        ''', (content_hash, level, summary))
+        
+        conn.commit()
+        conn.close()
+
+    def get_book_summary(self, book_id: int, scope: str = 'book') -> Optional[str]:
+        """Get a stored book or chapter summary, if it was made from the current version of the book."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT s.summary FROM book_summaries s JOIN books b ON b.id = s.book_id
+            WHERE s.book_id = ? AND s.scope = ? AND s.book_version = COALESCE(b.version, 1)
+        ''', (book_id, scope))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        return row[0] if row else None
+
+    def save_book_summary(self, book_id: int, scope: str, summary: str) -> None:
+        """Store a book or chapter summary for the current version of the book."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT OR REPLACE INTO book_summaries (book_id, scope, book_version, summary)
+            SELECT id, ?, COALESCE(version, 1), ? FROM books WHERE id = ?
+        ''', (scope, summary, book_id))
+        
+        conn.commit()
+        conn.close()
+
+    def save_text_index(self, book_id: int, index: BoundaryIndex, page_size: int = DEFAULT_PAGE_SIZE) -> None:
+        """Store a book's boundary index and its page count at the default page size."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        row = index.to_row()
+        cursor.execute('''
+            INSERT OR REPLACE INTO book_text_index
+                (book_id, text_length, word_step, paragraphs, sentences, words)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (book_id, row['text_length'], row['word_step'],
+              row['paragraphs'], row['sentences'], row['words']))
+        
+        conn.commit()
+        conn.close()
+
+        self.save_chapter_pages(book_id, index, page_size)
+        self.update_book(book_id, {'total_pages': index.total_pages(page_size)})
+
+    def get_text_index(self, book_id: int) -> Optional[BoundaryIndex]:
+        """Load a book's boundary index, or None if the book has not been processed."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT text_length, word_step, paragraphs, sentences, words
+            FROM book_text_index WHERE book_id = ?
+        ''', (book_id,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        if not row:
+            return None
+        return BoundaryIndex.from_row(*row)
+
+    def save_passage_index(self, book_id: int, index: BM25Index, page_size: int = DEFAULT_PAGE_SIZE) -> None:
+        """Store a book's passage retrieval index."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT OR REPLACE INTO book_passage_index (book_id, page_size, data) VALUES (?, ?, ?)
+        ''', (book_id, page_size, index.to_bytes()))
+        
+        conn.commit()
+        conn.close()
+
+    def get_passage_index(self, book_id: int) -> Optional[Tuple[BM25Index, int]]:
+        """Load a book's passage retrieval index and the page size its passages were cut at."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT data, page_size FROM book_passage_index WHERE book_id = ?', (book_id,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        if not row:
+            return None
+        return BM25Index.from_bytes(row[0]), row[1]
+
+    def get_text_slice(self, book_id: int, start: int, end: int) -> Optional[str]:
+        """Read characters [start, end) of a book's text without loading the whole text."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT substr(text_content, ?, ?) FROM books WHERE id = ?
+        ''', (start + 1, end - start, book_id))
+
+        row = cursor.fetchone()
+        if row and row[0] is None:
+            # Imported page by page: stitch the slice from the pages it overlaps
+            cursor.execute('''
+                SELECT content, start_offset FROM book_pages
+                WHERE book_id = ? AND end_offset > ? AND start_offset < ?
+                ORDER BY page_number
+            ''', (book_id, start, end))
+            pages = cursor.fetchall()
+            if pages:
+                first = pages[0][1]
+                text = PAGE_SEPARATOR.join(content for content, _ in pages)
+                row = (text[max(start - first, 0):end - first],)
+        conn.close()
+        
+        return row[0] if row else None
+
+    def get_page_content(self, book_id: int, page_number: int, page_size: int = DEFAULT_PAGE_SIZE) -> dict:
         """
         Get the content of a specific page from a book.
         
+        Pages of processed books are cut from text_content at read time using the
+        boundary index; translated versions store their pages in book_pages (older
+        ones as processed_chunks).
+        
         Args:
             book_id (int): The ID of the book
             page_number (int): The page number to retrieve
+            page_size (int): Approximate characters per page
             
         Returns:
             dict: A dictionary containing the page content and metadata
         """
         try:
+            index = self.get_text_index(book_id)
+            if index:
+                bounds = index.page_bounds(page_number, page_size)
+                if not bounds:
+                    return None
+                start, end = bounds
+                return {
+                    'content': self.get_text_slice(book_id, start, end),
+                    'page_number': page_number,
+                    'total_pages': index.total_pages(page_size),
+                    'start_offset': start,
+                    'end_offset': end
+                }
+
+            stored = self.get_stored_pages(book_id, page_number, page_number)
+            if stored:
+                page = stored['pages'][0]
+                page['total_pages'] = stored['total_pages']
+                return page
+
             book = self.get_book(book_id)
             if not book:
                 return None
@@ -295,13 +778,108 @@ class BookDatabase:
             print(f"Error getting page content: {str(e)}")
             return None
 
-    def create_translated_version(self, original_book_id: int, translated_chunks: List[Dict], language: str, model: str) -> int:
+    def get_page_range(self, book_id: int, first_page: int, last_page: int,
+                       page_size: int = DEFAULT_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+        """
+        Get a contiguous range of pages with one read of the underlying text.
+        
+        The range is clipped to the book's last page. Pages of processed books are cut
+        from a single substr() covering the whole range; unindexed books (translated
+        versions) are read from book_pages, or from processed_chunks for older ones.
+        
+        Args:
+            book_id (int): The ID of the book
+            first_page (int): First page of the range (1-based)
+            last_page (int): Last page of the range, inclusive
+            page_size (int): Approximate characters per page
+            
+        Returns:
+            dict: total_pages and the list of pages, or None if the range is empty
+        """
+        index = self.get_text_index(book_id)
+        if not index:
+            stored = self.get_stored_pages(book_id, first_page, last_page)
+            if stored:
+                return stored
+            book = self.get_book(book_id)
+            if not book or not book.get('processed_chunks'):
+                return None
+            pages = [
+                {'page_number': chunk['page_number'], 'content': chunk['content']}
+                for chunk in book['processed_chunks']
+                if first_page <= chunk['page_number'] <= last_page
+            ]
+            if not pages:
+                return None
+            return {'total_pages': book['total_pages'], 'pages': pages}
+
+        total_pages = index.total_pages(page_size)
+        last_page = min(last_page, total_pages)
+        if first_page < 1 or first_page > last_page:
+            return None
+
+        bounds = [index.page_bounds(page_number, page_size) for page_number in range(first_page, last_page + 1)]
+        range_start, range_end = bounds[0][0], bounds[-1][1]
+        text = self.get_text_slice(book_id, range_start, range_end) or ''
+
+        pages = [
+            {
+                'page_number': first_page + i,
+                'content': text[start - range_start:end - range_start],
+                'start_offset': start,
+                'end_offset': end
+            }
+            for i, (start, end) in enumerate(bounds)
+        ]
+        return {'total_pages': total_pages, 'pages': pages}
+
+    def get_latest_translation_id(self, book_id: int, language: str) -> Optional[int]:
+        """Get the ID of the most recent translated version of a book in a language."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT id FROM books
+            WHERE original_book_id = ? AND is_translation = 1 AND translation_language = ?
+            ORDER BY id DESC LIMIT 1
+        ''', (book_id, language))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        return row[0] if row else None
+
+    def get_translated_pages(self, translated_book_id: int, first_page: int, last_page: int) -> Dict[int, str]:
+        """Get translated pages in a range, reading only matching chunks via SQLite's JSON functions."""
+        stored = self.get_stored_pages(translated_book_id, first_page, last_page)
+        if stored:
+            return {page['page_number']: page['content'] for page in stored['pages']}
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT json_extract(chunk.value, '$.page_number'), json_extract(chunk.value, '$.content')
+            FROM books, json_each(books.processed_chunks) AS chunk
+            WHERE books.id = ?
+              AND json_extract(chunk.value, '$.page_number') BETWEEN ? AND ?
+        ''', (translated_book_id, first_page, last_page))
+        
+        pages = {page_number: content for page_number, content in cursor.fetchall()}
+        conn.close()
+        
+        return pages
+
+    def create_translated_version(self, original_book_id: int, translated_chunks: Iterable[Dict], language: str, model: str) -> int:
         """
         Create a new translated version of a book.
         
+        Chunks are written to book_pages as they arrive, so passing a generator keeps
+        memory use constant no matter how long the book is.
+        
         Args:
             original_book_id (int): ID of the original book
-            translated_chunks (List[Dict]): List of translated chunks
+            translated_chunks (Iterable[Dict]): Translated chunks (page_number, content, offset)
             language (str): Language code of the translation
             model (str): Name of the OpenAI model used for translation
             
@@ -311,36 +889,385 @@ class BookDatabase:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        # Get original book details
-        original_book = self.get_book(original_book_id)
-        if not original_book:
-            conn.close()
-            return None
-            
-        # Create new book entry for translation
+        # Create new book entry for translation from the original's details
         cursor.execute('''
             INSERT INTO books (
-                title, author, isbn, processed_chunks, total_pages,
-                is_translation, original_book_id, translation_language, translation_model
+                title, author, isbn, total_pages,
+                is_translation, original_book_id, translation_language, translation_model,
+                version, updated_at
             )
-            VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?)
-        ''', (
-            f"{original_book['title']} ({language})",
-            original_book['author'],
-            original_book['isbn'],
-            json.dumps(translated_chunks),
-            original_book['total_pages'],
-            original_book_id,
-            language,
-            model
-        ))
+            SELECT title || ' (' || ? || ')', author, isbn, total_pages,
+                   1, id, ?, ?, 1, CURRENT_TIMESTAMP
+            FROM books WHERE id = ?
+        ''', (language, language, model, original_book_id))
+        
+        if cursor.rowcount == 0:
+            conn.close()
+            return None
         
         translated_book_id = cursor.lastrowid
         conn.commit()
         conn.close()
         
+        self.add_book_pages(translated_book_id, (
+            {
+                'page_number': chunk['page_number'],
+                'content': chunk['content'],
+                'start_offset': chunk.get('start_offset', chunk.get('offset')),
+                'end_offset': chunk.get('end_offset')
+            }
+            for chunk in translated_chunks
+        ))
+        
         return translated_book_id
 
+    def add_book_pages(self, book_id: int, pages: Iterable[Dict], batch_size: int = 50) -> int:
+        """Store pages (page_number, content, start_offset, end_offset) as they are produced; returns the count."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        count = 0
+        batch = []
+        
+        def flush():
+            cursor.executemany('''
+                INSERT OR REPLACE INTO book_pages
+                    (book_id, page_number, start_offset, end_offset, content, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', batch)
+            conn.commit()
+            batch.clear()
+        
+        try:
+            for page in pages:
+                content = page['content']
+                batch.append((
+                    book_id, page['page_number'], page.get('start_offset'), page.get('end_offset'),
+                    content, hashlib.sha256(content.encode('utf-8')).hexdigest()
+                ))
+                count += 1
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+        finally:
+            conn.close()
+        
+        return count
+
+    def get_stored_pages(self, book_id: int, first_page: int, last_page: int) -> Optional[Dict[str, Any]]:
+        """Get a range of pages from book_pages, with the book's page count."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT page_number, content, start_offset, end_offset FROM book_pages
+            WHERE book_id = ? AND page_number BETWEEN ? AND ?
+            ORDER BY page_number
+        ''', (book_id, first_page, last_page))
+        rows = cursor.fetchall()
+        
+        total_pages = None
+        if rows:
+            cursor.execute('''
+                SELECT COALESCE(b.total_pages, MAX(p.page_number))
+                FROM books b LEFT JOIN book_pages p ON p.book_id = b.id
+                WHERE b.id = ?
+            ''', (book_id,))
+            total_pages = cursor.fetchone()[0]
+        conn.close()
+        
+        if not rows:
+            return None
+        
+        pages = [
+            {'page_number': page_number, 'content': content, 'start_offset': start, 'end_offset': end}
+            for page_number, content, start, end in rows
+        ]
+        return {'total_pages': total_pages, 'pages': pages}
+
+    def iter_text(self, book_id: int, block_size: int = 64 * 1024) -> Iterator[str]:
+        """Yield a book's text_content in blocks, so it can be processed without loading it whole."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            position = 1
+            while True:
+                cursor.execute('SELECT substr(text_content, ?, ?) FROM books WHERE id = ?',
+                               (position, block_size, book_id))
+                row = cursor.fetchone()
+                if not row or not row[0]:
+                    return
+                yield row[0]
+                position += block_size
+        finally:
+            conn.close()
+
+    def iter_pages(self, book_id: int) -> Iterator[Dict[str, Any]]:
+        """Yield a book's stored pages in order, one row at a time."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+                SELECT page_number, content, start_offset, end_offset FROM book_pages
+                WHERE book_id = ? ORDER BY page_number
+            ''', (book_id,))
+            for page_number, content, start, end in cursor:
+                yield {'page_number': page_number, 'content': content, 'start_offset': start, 'end_offset': end}
+        finally:
+            conn.close()
+
+    def get_book_text(self, book_id: int) -> Optional[str]:
+        """A book's whole text: text_content, or its stored pages joined for books imported page by page."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT COALESCE(
+                (SELECT text_content FROM books WHERE id = ?),
+                (SELECT group_concat(content, ?)
+                 FROM (SELECT content FROM book_pages WHERE book_id = ? ORDER BY page_number))
+            )
+        ''', (book_id, PAGE_SEPARATOR, book_id))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        return row[0] if row else None
+
+    def delete_book(self, book_id: int) -> None:
+        """Remove a book with its pages and indexes (used to undo a failed import)."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        for table in ('book_pages', 'book_text_index', 'book_passage_index', 'book_summaries', 'chapters'):
+            cursor.execute(f'DELETE FROM {table} WHERE book_id = ?', (book_id,))
+        cursor.execute('DELETE FROM books WHERE id = ?', (book_id,))
+        
+        conn.commit()
+        conn.close()
+
+    def find_book_by_isbn(self, isbn: str) -> Optional[int]:
+        """Get the ID of the most recently added original (not translated) book with an ISBN."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT id FROM books
+            WHERE isbn = ? AND COALESCE(is_translation, 0) = 0
+            ORDER BY id DESC LIMIT 1
+        ''', (isbn,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        return row[0] if row else None
+
+    def _derived_pages(self, book_id: int) -> Iterator[Tuple[int, str]]:
+        """(page_number, content) of a book paginated from text_content at the default page size"""
+        index = self.get_text_index(book_id)
+        if index:
+            for page_number in range(1, index.total_pages() + 1):
+                start, end = index.page_bounds(page_number)
+                yield page_number, self.get_text_slice(book_id, start, end)
+            return
+        
+        # Not processed yet: paginate the text the way /process would
+        text = (self.get_book(book_id) or {}).get('text_content')
+        if not text:
+            return
+        index = BoundaryIndex.build(text)
+        for page_number in range(1, index.total_pages() + 1):
+            start, end = index.page_bounds(page_number)
+            yield page_number, text[start:end]
+
+    def sync_book_pages(self, book_id: int, pages: Iterable[Dict], batch_size: int = 50) -> Dict[str, Any]:
+        """
+        Replace a book's pages with those of a new edition, rewriting only pages whose content changed.
+        
+        Pages are compared by content hash. A book paginated from text_content is compared
+        against its pages at the default page size and is stored page by page afterwards.
+        Stored translations keep the pages whose source did not change (pages that only
+        moved are moved along) and lose the rest, so only those need translating again.
+        
+        Args:
+            book_id (int): The ID of the book
+            pages (Iterable[Dict]): The new pages (page_number, content, start_offset, end_offset) in order
+        
+        Returns:
+            dict: page_count, changed_pages (new or different content), removed_pages,
+            stale_contents (old page texts that are no longer in the book) and, per
+            translated version, how many pages were kept and moved and how many are
+            left without a translation
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            # The old edition, with the hash index the comparisons need
+            cursor.execute('''
+                CREATE TEMP TABLE old_pages (
+                    page_number INTEGER PRIMARY KEY, content_hash TEXT, content TEXT
+                )
+            ''')
+            cursor.execute('''
+                INSERT INTO old_pages
+                SELECT page_number, content_hash, content FROM book_pages WHERE book_id = ?
+            ''', (book_id,))
+            stored = cursor.rowcount > 0
+            if not stored:
+                # Stored pages are trimmed, so trimmed text is what is compared; the untrimmed
+                # text is kept because that is what was served (and voiced)
+                cursor.executemany('INSERT INTO old_pages VALUES (?, ?, ?)', (
+                    (page_number, hashlib.sha256(content.strip().encode('utf-8')).hexdigest(), content)
+                    for page_number, content in self._derived_pages(book_id)
+                ))
+            cursor.execute('CREATE INDEX temp.idx_old_pages_hash ON old_pages (content_hash)')
+        
+            # The new edition is staged as it is read, so the book is never held in memory
+            cursor.execute('''
+                CREATE TEMP TABLE new_pages (
+                    page_number INTEGER PRIMARY KEY, start_offset INTEGER, end_offset INTEGER,
+                    content TEXT NOT NULL, content_hash TEXT NOT NULL
+                )
+            ''')
+            batch = []
+            for page in pages:
+                content = page['content']
+                batch.append((page['page_number'], page.get('start_offset'), page.get('end_offset'),
+                              content, hashlib.sha256(content.encode('utf-8')).hexdigest()))
+                if len(batch) >= batch_size:
+                    cursor.executemany('INSERT INTO new_pages VALUES (?, ?, ?, ?, ?)', batch)
+                    batch.clear()
+            cursor.executemany('INSERT INTO new_pages VALUES (?, ?, ?, ?, ?)', batch)
+        
+            cursor.execute('SELECT COUNT(*) FROM new_pages')
+            page_count = cursor.fetchone()[0]
+            cursor.execute('''
+                CREATE TEMP TABLE changed_pages AS
+                SELECT n.page_number,
+                       (SELECT MIN(o.page_number) FROM old_pages o WHERE o.content_hash = n.content_hash) AS moved_from
+                FROM new_pages n LEFT JOIN old_pages o ON o.page_number = n.page_number
+                WHERE o.content_hash IS NOT n.content_hash
+            ''')
+            cursor.execute('SELECT page_number FROM changed_pages ORDER BY page_number')
+            changed_pages = [row[0] for row in cursor.fetchall()]
+            cursor.execute('SELECT page_number FROM old_pages WHERE page_number > ? ORDER BY page_number',
+                           (page_count,))
+            removed_pages = [row[0] for row in cursor.fetchall()]
+            cursor.execute('''
+                SELECT content FROM old_pages
+                WHERE content_hash NOT IN (SELECT content_hash FROM new_pages)
+            ''')
+            stale_contents = [row[0] for row in cursor.fetchall()]
+        
+            # Translations: keep unchanged pages, carry moved ones along, drop the rest
+            cursor.execute('''
+                SELECT id FROM books WHERE original_book_id = ? AND is_translation = 1
+            ''', (book_id,))
+            translations = {}
+            for (translated_id,) in cursor.fetchall():
+                cursor.execute('''
+                    SELECT c.page_number, t.start_offset, t.end_offset, t.content, t.content_hash
+                    FROM changed_pages c
+                    JOIN book_pages t ON t.book_id = ? AND t.page_number = c.moved_from
+                ''', (translated_id,))
+                moved = cursor.fetchall()
+                cursor.execute('''
+                    DELETE FROM book_pages
+                    WHERE book_id = ? AND (page_number > ? OR page_number IN (SELECT page_number FROM changed_pages))
+                ''', (translated_id, page_count))
+                cursor.executemany('''
+                    INSERT INTO book_pages (book_id, page_number, start_offset, end_offset, content, content_hash)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [(translated_id,) + row for row in moved])
+                cursor.execute('''
+                    UPDATE books SET total_pages = ?, version = COALESCE(version, 1) + 1,
+                                     updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (page_count, translated_id))
+                cursor.execute('SELECT COUNT(*) FROM book_pages WHERE book_id = ?', (translated_id,))
+                translated = cursor.fetchone()[0]
+                translations[translated_id] = {
+                    'kept': translated - len(moved),
+                    'moved': len(moved),
+                    'untranslated': page_count - translated
+                }
+        
+            # The book itself: only changed pages are written, unchanged ones get their new offsets
+            if stored:
+                cursor.execute('''
+                    DELETE FROM book_pages
+                    WHERE book_id = ? AND (page_number > ? OR page_number IN (SELECT page_number FROM changed_pages))
+                ''', (book_id, page_count))
+                cursor.execute('''
+                    UPDATE book_pages
+                    SET start_offset = (SELECT start_offset FROM new_pages n WHERE n.page_number = book_pages.page_number),
+                        end_offset = (SELECT end_offset FROM new_pages n WHERE n.page_number = book_pages.page_number)
+                    WHERE book_id = ?
+                ''', (book_id,))
+                cursor.execute('''
+                    INSERT INTO book_pages (book_id, page_number, start_offset, end_offset, content, content_hash)
+                    SELECT ?, n.page_number, n.start_offset, n.end_offset, n.content, n.content_hash
+                    FROM new_pages n JOIN changed_pages c ON c.page_number = n.page_number
+                ''', (book_id,))
+            else:
+                cursor.execute('''
+                    INSERT INTO book_pages (book_id, page_number, start_offset, end_offset, content, content_hash)
+                    SELECT ?, page_number, start_offset, end_offset, content, content_hash FROM new_pages
+                ''', (book_id,))
+        
+            # Pages are now served from book_pages; the text and its indexes describe the old edition
+            for table in ('book_text_index', 'book_passage_index'):
+                cursor.execute(f'DELETE FROM {table} WHERE book_id = ?', (book_id,))
+            cursor.execute('''
+                UPDATE books SET text_content = NULL, processed_chunks = NULL, total_pages = ?,
+                                 version = COALESCE(version, 1) + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (page_count, book_id))
+        
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        return {
+            'page_count': page_count,
+            'changed_pages': changed_pages,
+            'removed_pages': removed_pages,
+            'stale_contents': stale_contents,
+            'translations': translations
+        }
+
+    def get_book_meta(self, book_id: int) -> Optional[Dict[str, Any]]:
+        """Get a book's details without its text, chapters or chunks."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT id, title, author, isbn, total_pages, COALESCE(version, 1), COALESCE(updated_at, created_at)
+            FROM books WHERE id = ?
+        ''', (book_id,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        if not row:
+            return None
+        return {
+            'id': row[0],
+            'title': row[1],
+            'author': row[2],
+            'isbn': row[3],
+            'total_pages': row[4],
+            'version': row[5],
+            'updated_at': row[6]
+        }
+
     def get_translated_versions(self, book_id: int) -> List[Dict]:
         """
         Get all translated versions of a book.
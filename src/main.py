@@ -30,7 +30,9 @@ from src.db.database import BookDatabase
 from src.utils.speech import SpeechHandler
 from src.utils.speech.stt.openai_stt import OpenAISTT
 from src.utils.config import AppConfig
-from src.api.book_reader_api import book_reader_bp
+from src.api.book_reader_api import book_reader_bp, UploadRequest
+from src.services.container import ServiceContainer
+from src.services.upload_stream import MAX_REQUEST_SIZE
 
 # تنظیم لاگینگ
 logging.basicConfig(
@@ -52,6 +54,9 @@ logger = logging.getLogger("RoboBook")
 load_dotenv()
 
 app = Flask(__name__)
+# آپلودها مستقیم در یک بافر spool شده نوشته می‌شوند (حافظه برای فایل‌های کوچک، یک فایل موقت برای بزرگ‌ها)
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_SIZE
 CORS(app)
 
 # Register blueprints
@@ -63,9 +68,8 @@ openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 # Configure upload folder
 app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
 
-def initialize_services():
-    """راه‌اندازی سرویس‌های اصلی برنامه"""
-    config = AppConfig()
+def build_services(config):
+    """ساخت سرویس‌های اصلی برنامه از روی تنظیمات"""
     db = BookDatabase(config.db_path)
     llm = LLMService(model_type=config.model_type, api_key=config.api_key)
     
@@ -106,13 +110,33 @@ def initialize_services():
         speech.gtts_language = "fa"  # تنظیم زبان فارسی برای gTTS
         logger.info(f"Set gTTS language to: fa (Persian)")
     
-    return config, db, llm, speech, openai_stt
+    return {'db': db, 'llm': llm, 'speech': speech, 'openai_stt': openai_stt}
+
+# سرویس‌ها یک بار ساخته می‌شوند و همه درخواست‌ها از همان نمونه‌ها استفاده می‌کنند
+services = ServiceContainer(AppConfig, build_services, fingerprint=lambda config: config.model_dump())
+
+def initialize_services():
+    """راه‌اندازی سرویس‌های اصلی برنامه (فقط بار اول ساخته می‌شوند)"""
+    return services.get()
 
 @app.route('/')
 def index():
     """صفحه اصلی وب اپلیکیشن"""
     return render_template('index.html')
 
+@app.route('/api/config/reload', methods=['POST'])
+def reload_config():
+    """بارگذاری دوباره تنظیمات؛ اگر تغییر کرده باشند سرویس‌ها از نو ساخته می‌شوند"""
+    try:
+        reloaded = services.reload()
+    except Exception as e:
+        logger.error(f"Error reloading config: {e}")
+        return jsonify({"status": "error", "error": str(e)}), 500
+    
+    if reloaded:
+        logger.info("Config changed, services rebuilt")
+    return jsonify({"status": "success", "reloaded": reloaded})
+
 def modify_voice(audio_data, sample_rate):
     """Modify the voice to sound more robotic"""
     # Convert to mono if stereo
@@ -145,12 +169,13 @@ def query():
     try:
         data = request.get_json()
         query_text = data.get('query', '')
+        current = services.get()
         
         # Search for books
-        books = search_books(query_text)
+        books = search_books(query_text, current.db)
         
         # Generate response using GPT-4
-        response = generate_response(query_text, books)
+        response = generate_response(query_text, books, current.llm)
         
         # Generate TTS response
         audio_data, audio_format = generate_tts_response(response)
@@ -182,7 +207,7 @@ def text_to_speech():
     if not text:
         return jsonify({"error": "No text provided"}), 400
     
-    speech.speak(text)
+    services.get().speech.speak(text)
     return jsonify({"status": "success"})
 
 @app.route('/api/tts_file', methods=['POST'])
@@ -194,6 +219,8 @@ def text_to_speech_file():
     if not text:
         return jsonify({"error": "No text provided"}), 400
     
+    speech = services.get().speech
+    
     try:
         # ایجاد یک فایل موقت برای ذخیره صدا
         with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_file:
@@ -357,11 +384,13 @@ def listen():
         # Get the transcribed text
         transcribed_text = transcript.text
         
+        current = services.get()
+        
         # Search for books based on transcribed text
-        books = search_books(transcribed_text)
+        books = search_books(transcribed_text, current.db)
         
         # Generate response using GPT-4
-        response = generate_response(transcribed_text, books)
+        response = generate_response(transcribed_text, books, current.llm)
         
         # Generate TTS response
         audio_data, audio_format = generate_tts_response(response)
@@ -389,24 +418,26 @@ def listen():
 def listen_and_respond():
     """گوش دادن به صدا، تبدیل به متن، پاسخگویی و تبدیل پاسخ به گفتار"""
     try:
+        current = services.get()
+        
         # گوش دادن و تشخیص گفتار با OpenAI STT
-        text = openai_stt.listen()
+        text = current.openai_stt.listen()
         
         if not text:
-            speech.speak("متأسفانه نتوانستم صدای شما را تشخیص دهم. لطفاً دوباره تلاش کنید.")
+            current.speech.speak("متأسفانه نتوانستم صدای شما را تشخیص دهم. لطفاً دوباره تلاش کنید.")
             return jsonify({
                 "status": "error",
                 "error": "Could not recognize speech"
             }), 400
         
         # جستجوی کتاب‌ها
-        book_results = db.search_books(text)
+        book_results = current.db.search_books(text)
         
         # دریافت پاسخ
-        response = llm.process_query(text, book_results)
+        response = current.llm.process_query(text, book_results)
         
         # تبدیل پاسخ به گفتار
-        speech.speak(response)
+        current.speech.speak(response)
         
         return jsonify({
             "status": "success",
@@ -434,11 +465,13 @@ def interactive_mode():
             print("خداحافظ!")
             break
         
+        current = services.get()
+        
         # جستجو در پایگاه داده کتاب‌ها
-        book_results = db.search_books(query)
+        book_results = current.db.search_books(query)
         
         # پردازش پرسش با مدل زبانی
-        response = llm.process_query(query, book_results)
+        response = current.llm.process_query(query, book_results)
         
         print(f"\nپاسخ: {response}")
         
@@ -470,13 +503,9 @@ def test_speech():
     except Exception as e:
         print(f"خطا در تست گفتار: {e}")
 
-def search_books(query: str) -> list:
+def search_books(query: str, db: BookDatabase) -> list:
     """Search for books in the database based on the query"""
     try:
-        # Initialize database connection
-        config = AppConfig()
-        db = BookDatabase(config.db_path)
-        
         # Search for books
         results = db.search_books(query)
         return results
@@ -484,13 +513,9 @@ def search_books(query: str) -> list:
         print(f"Error searching books: {str(e)}")
         return []
 
-def generate_response(query: str, books: list) -> str:
+def generate_response(query: str, books: list, llm: LLMService) -> str:
     """Generate a response using GPT-4 based on the query and book results"""
     try:
-        # Initialize LLM service
-        config = AppConfig()
-        llm = LLMService(model_type=config.model_type, api_key=config.api_key)
-        
         # Generate response
         response = llm.process_query(query, books)
         return response
@@ -540,8 +565,7 @@ def main():
     
     args = parser.parse_args()
     
-    global config, db, llm, speech, openai_stt
-    config, db, llm, speech, openai_stt = initialize_services()
+    initialize_services()
     
     if args.test:
         test_speech()
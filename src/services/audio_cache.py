@@ -0,0 +1,303 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import AsyncIterable, AsyncIterator, Awaitable, BinaryIO, Callable, Iterable, Iterator, Optional
+
+from .single_flight import SingleFlight
+
+# Chunk size used when replaying a cached file to a coalesced stream
+READ_CHUNK_SIZE = 64 * 1024
+
+# Times a miss is synthesized again when the new file is evicted before it can be opened
+OPEN_ATTEMPTS = 3
+
+# Default location and size budget for cached page audio
+AUDIO_CACHE_DIR = os.getenv(
+    'AUDIO_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'audio_cache')
+)
+AUDIO_CACHE_MAX_BYTES = int(os.getenv('AUDIO_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+
+class AudioCache:
+    """Content-addressed on-disk cache for synthesized audio with size-bounded LRU eviction.
+
+    Files are named after hash(text, voice, model, speed), so identical requests map to
+    the same file no matter which book or page they came from. Recency is kept in memory
+    and mirrored to file mtimes so the LRU order survives restarts.
+
+    Misses are coalesced: while one caller synthesizes a key, other callers for the same
+    key wait for that file instead of calling the TTS provider again.
+    """
+
+    def __init__(self, cache_dir: str = AUDIO_CACHE_DIR, max_bytes: int = AUDIO_CACHE_MAX_BYTES,
+                 extension: str = '.mp3'):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+        self._flights = SingleFlight()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(text: str, voice: str, model: str, speed: float) -> str:
+        """Hash of everything that changes the synthesized audio"""
+        payload = json.dumps([text, voice, model, float(speed)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.extension)
+
+    def _load_index(self):
+        """Rebuild the LRU order from the files already on disk"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.part'):
+                # Left behind by an interrupted write
+                os.unlink(os.path.join(self.cache_dir, name))
+                continue
+            if not name.endswith(self.extension):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, name[:-len(self.extension)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached file path for key and mark it as recently used"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self.path_for(key)
+            if not os.path.exists(path):
+                self._total_bytes -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def open_file(self, key: str) -> Optional[BinaryIO]:
+        """Open the cached file for key and mark it as recently used.
+
+        The file is opened while the lock is held, so eviction cannot remove it
+        between the lookup and the open; an open handle stays readable after the
+        file is unlinked, so the caller can serve it for as long as it needs.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self.path_for(key)
+            try:
+                audio_file = open(path, 'rb')
+            except FileNotFoundError:
+                self._total_bytes -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return audio_file
+
+    def open_or_create(self, key: str, synthesize: Callable[[], bytes]) -> BinaryIO:
+        """Open the cached file for key, synthesizing it first on a miss"""
+        for _ in range(OPEN_ATTEMPTS):
+            audio_file = self.open_file(key)
+            if audio_file is not None:
+                return audio_file
+            # A concurrent put may evict the new file before it is opened; try again
+            self.get_or_create(key, synthesize)
+        raise RuntimeError('audio was evicted before it could be served')
+
+    async def aopen_or_create(self, key: str, synthesize: Callable[[], Awaitable[bytes]]) -> BinaryIO:
+        """Async variant of open_or_create; synthesize is a coroutine function"""
+        for _ in range(OPEN_ATTEMPTS):
+            audio_file = await asyncio.to_thread(self.open_file, key)
+            if audio_file is not None:
+                return audio_file
+            await self.aget_or_create(key, synthesize)
+        raise RuntimeError('audio was evicted before it could be served')
+
+    def put(self, key: str, audio_data: bytes) -> str:
+        """Store audio for key atomically and evict old entries if over budget"""
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.part')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(audio_data)
+        return self.commit(key, temp_path)
+
+    def commit(self, key: str, temp_path: str) -> str:
+        """Move a fully written temp file into the cache under key"""
+        path = self.path_for(key)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+        return path
+
+    def _read_chunks(self, audio_file: BinaryIO) -> Iterator[bytes]:
+        with audio_file:
+            while True:
+                chunk = audio_file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    async def _aread_chunks(self, audio_file: BinaryIO) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                chunk = await asyncio.to_thread(audio_file.read, READ_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            audio_file.close()
+
+    def tee(self, key: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass audio chunks through to the caller while writing them into the cache.
+
+        The entry is only committed once the whole stream has been written; if the
+        stream fails or the client disconnects, the partial file is discarded.
+        If the same key is already being synthesized, wait for it and replay the
+        cached file instead of starting a second upstream stream. ``chunks`` should be
+        lazy (a generator) so that no upstream call is made in that case.
+        """
+        while True:
+            call, leader = self._flights.join(key)
+            if leader:
+                break
+            try:
+                call.wait()
+            except Exception:
+                # The leading stream was aborted; take over
+                continue
+            audio_file = self.open_file(key)
+            if audio_file is None:
+                # Evicted between the flight and the replay; synthesize it again
+                continue
+            yield from self._read_chunks(audio_file)
+            return
+
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.part')
+        path = None
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            path = self.commit(key, temp_path)
+        finally:
+            if path is None:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                self._flights.finish(key, error=RuntimeError('audio stream aborted'))
+            else:
+                self._flights.finish(key, result=path)
+
+    async def atee(self, key: str, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """Async variant of tee for streamed responses in the ASGI app.
+
+        File writes, reads and the commit run in worker threads so that a slow disk
+        does not stall the event loop.
+        """
+        while True:
+            future, leader = self._flights.ajoin(key)
+            if leader:
+                break
+            try:
+                await asyncio.shield(future)
+            except Exception:
+                continue
+            audio_file = await asyncio.to_thread(self.open_file, key)
+            if audio_file is None:
+                continue
+            async for chunk in self._aread_chunks(audio_file):
+                yield chunk
+            return
+
+        fd, temp_path = await asyncio.to_thread(tempfile.mkstemp, dir=self.cache_dir, suffix='.part')
+        path = None
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                async for chunk in chunks:
+                    await asyncio.to_thread(f.write, chunk)
+                    yield chunk
+            path = await asyncio.to_thread(self.commit, key, temp_path)
+        finally:
+            if path is None:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                self._flights.afinish(key, error=RuntimeError('audio stream aborted'))
+            else:
+                self._flights.afinish(key, result=path)
+
+    async def aget_or_create(self, key: str, synthesize: Callable[[], Awaitable[bytes]]) -> str:
+        """Async variant of get_or_create; synthesize is a coroutine function"""
+        path = await asyncio.to_thread(self.get, key)
+        if path:
+            return path
+
+        async def create():
+            path = await asyncio.to_thread(self.get, key)
+            if path:
+                return path
+            audio_data = await synthesize()
+            return await asyncio.to_thread(self.put, key, audio_data)
+
+        return await self._flights.ado(key, create)
+
+    def get_or_create(self, key: str, synthesize: Callable[[], bytes]) -> str:
+        """Return the cached file for key, synthesizing and storing it on a miss.
+
+        Concurrent misses for the same key share a single synthesize() call.
+        """
+        path = self.get(key)
+        if path:
+            return path
+        # Re-check inside the flight: an earlier flight may have just stored the file
+        return self._flights.do(key, lambda: self.get(key) or self.put(key, synthesize()))
+
+    def invalidate(self, key: str) -> bool:
+        """Drop a single entry"""
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is None:
+                return False
+            self._total_bytes -= size
+        try:
+            os.unlink(self.path_for(key))
+        except OSError:
+            pass
+        return True
+
+    def _evict(self):
+        """Remove least recently used files until the cache fits its budget (lock held)"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.unlink(self.path_for(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'coalescing': self._flights.metrics()
+            }
@@ -1,13 +1,47 @@
-from typing import Dict, List, Optional
-from openai import OpenAI
+from typing import Dict, Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI, AsyncOpenAI
+import asyncio
+import hashlib
 import json
+import os
 from ..database.book_db import BookDatabase
+from .llm_cache import get_llm_cache
+from .pagination import BoundaryIndex, DEFAULT_PAGE_SIZE
+from .retrieval import BM25Index, CONTEXT_TOKEN_BUDGET, RETRIEVAL_TOP_K
+from .tokenizer import count_tokens, fit_tokens
+from .summarizer import HierarchicalSummarizer
+
+# 'merged' asks for characters, key points and vocabulary in one JSON response;
+# 'concurrent' sends the three separate requests in parallel
+ENHANCE_MODE = os.getenv('ENHANCE_MODE', 'merged')
+# The merged request needs a model that supports JSON mode
+ENHANCE_MODEL = os.getenv('ENHANCE_MODEL', 'gpt-4-turbo')
+# Bump when the enrichment prompts change so stored results are regenerated
+ENHANCE_VERSION = 1
+
+ENHANCE_FIELDS = ('characters', 'key_points', 'vocabulary')
 
 class BookReader:
     def __init__(self, api_key: str, db: BookDatabase):
         """Initialize the book reader service"""
+        self.api_key = api_key
         self.openai_client = OpenAI(api_key=api_key)
+        self._async_client = None
+        self.llm_cache = get_llm_cache()
         self.db = db
+        self.summarizer = HierarchicalSummarizer(self.openai_client.chat.completions.create, self.llm_cache, db,
+                                                 acreate=self._acreate)
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Async client, created on first use by the ASGI app"""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=self.api_key)
+        return self._async_client
+
+    def _acreate(self, **params):
+        return self.async_client.chat.completions.create(**params)
     
     def read_chapter(self, book_id: int, chapter_number: int) -> Dict:
         """Read a chapter and generate AI-enhanced content"""
@@ -32,131 +66,325 @@ class BookReader:
     
     def ask_question(self, book_id: int, question: str, context: Optional[str] = None) -> str:
         """Ask a question about the book content"""
+        return self.llm_cache.complete(
+            self.openai_client.chat.completions.create,
+            site='question',
+            **self._question_request(book_id, question, context)
+        )
+
+    async def aask_question(self, book_id: int, question: str, context: Optional[str] = None) -> str:
+        """Async variant of ask_question for the ASGI app"""
+        params = await asyncio.to_thread(self._question_request, book_id, question, context)
+        return await self.llm_cache.acomplete(self._acreate, site='question', **params)
+
+    def _question_request(self, book_id: int, question: str, context: Optional[str] = None) -> Dict:
+        """Chat completion parameters answering question from the book's most relevant passages"""
         # Get relevant context if not provided
         if not context:
-            book = self.db.get_book(book_id)
-            context = book['text_content'][:2000]  # First 2000 chars for context
-        
-        # Generate AI response
-        response = self.openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[
+            context = self._retrieve_context(book_id, question)
+        if not context:
+            # Book not processed yet (no passage index), or nothing in it matched:
+            # first 2000 chars for context, from the first stored page for page-imported books
+            context = self.db.get_text_slice(book_id, 0, 2000)
+            if not context:
+                stored = self.db.get_stored_pages(book_id, 1, 1)
+                context = stored['pages'][0]['content'][:2000] if stored else ""
+
+        # A stored whole-book summary gives the passages their place in the story
+        book_summary = self.db.get_book_summary(book_id)
+        if book_summary:
+            context = f"Book summary: {book_summary}\n\n{context}"
+
+        return {
+            'model': "gpt-4",
+            'messages': [
                 {"role": "system", "content": "You are a helpful book assistant. Answer questions about the book content accurately and concisely."},
                 {"role": "user", "content": f"Context: {context}\n\nQuestion: {question}"}
             ],
-            temperature=0.7,
-            max_tokens=500
-        )
-        
-        return response.choices[0].message.content
+            'temperature': 0.7,
+            'max_tokens': 500
+        }
     
+    def index_book(self, book_id: int, text: str, index: BoundaryIndex, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+        """Build and store the passage retrieval index for a processed book; returns the passage count"""
+        passages = (
+            text[start:end]
+            for start, end in (index.page_bounds(page_number, page_size)
+                               for page_number in range(1, index.total_pages(page_size) + 1))
+        )
+        return self.index_passages(book_id, passages, page_size)
+
+    def index_stored_pages(self, book_id: int) -> int:
+        """Build the passage index of a book stored page by page, reading one page at a time"""
+        return self.index_passages(book_id, (page['content'] for page in self.db.iter_pages(book_id)))
+
+    def index_passages(self, book_id: int, passages: Iterable[str], page_size: int = DEFAULT_PAGE_SIZE) -> int:
+        """Store a BM25 index over passages (one per page, in page order); returns the passage count"""
+        passage_index = BM25Index.build(passages)
+        self.db.save_passage_index(book_id, passage_index, page_size)
+        return len(passage_index)
+
+    def _retrieve_context(self, book_id: int, question: str,
+                          k: int = RETRIEVAL_TOP_K, token_budget: int = CONTEXT_TOKEN_BUDGET) -> Optional[str]:
+        """The pages most relevant to the question, in book order, within the token budget"""
+        stored = self.db.get_passage_index(book_id)
+        if not stored:
+            return None
+        passage_index, page_size = stored
+
+        passages = []
+        remaining = token_budget
+        for doc, _ in passage_index.search(question, k):
+            page = self.db.get_page_content(book_id, doc + 1, page_size)
+            if not page or not page['content']:
+                continue
+            content = page['content']
+            tokens = count_tokens(content, "gpt-4")
+            if tokens > remaining:
+                if passages:
+                    break
+                # Always include the best passage, trimmed to the budget
+                content = content[:fit_tokens(content, remaining, "gpt-4")]
+                tokens = remaining
+            passages.append((doc + 1, content))
+            remaining -= tokens
+
+        if not passages:
+            return None
+        return "\n\n".join(f"[Page {page_number}]\n{content}" for page_number, content in sorted(passages))
+
     def summarize_chapter(self, book_id: int, chapter_number: int) -> str:
-        """Generate a summary of a chapter"""
+        """Generate a summary of a chapter (chapters longer than one request are summarized map-reduce)"""
+        scope = f"chapter:{chapter_number}"
+        summary = self.db.get_book_summary(book_id, scope)
+        if summary:
+            return summary
+
         chapter = self.db.get_chapter(book_id, chapter_number)
         if not chapter:
             return None
         
         # Generate AI summary
-        response = self.openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful book assistant. Create a concise summary of the chapter."},
-                {"role": "user", "content": f"Chapter content: {chapter['content']}"}
-            ],
-            temperature=0.7,
-            max_tokens=300
+        summary = self.summarizer.summarize(
+            chapter['content'],
+            "You are a helpful book assistant. Create a concise summary of the chapter.",
+            label="chapter",
+            max_tokens=300,
+            temperature=0.7
         )
+        self.db.save_book_summary(book_id, scope, summary)
         
-        return response.choices[0].message.content
+        return summary
+
+    def summarize_book(self, book_id: int) -> Optional[str]:
+        """Summarize the whole book; the result is stored and reused by analyze_theme and ask_question"""
+        summary = self.db.get_book_summary(book_id)
+        if summary:
+            return summary
+
+        text = self.db.get_book_text(book_id)
+        if not text:
+            return None
+
+        summary = self.summarizer.summarize(
+            text,
+            "You are a helpful book assistant. Create a concise summary of the whole book.",
+            label="book",
+            max_tokens=500
+        )
+        self.db.save_book_summary(book_id, 'book', summary)
+        return summary
+
+    async def asummarize_book(self, book_id: int) -> Optional[str]:
+        """Async variant of summarize_book"""
+        summary = await asyncio.to_thread(self.db.get_book_summary, book_id)
+        if summary:
+            return summary
+
+        text = await asyncio.to_thread(self.db.get_book_text, book_id)
+        if not text:
+            return None
+
+        summary = await self.summarizer.asummarize(
+            text,
+            "You are a helpful book assistant. Create a concise summary of the whole book.",
+            label="book",
+            max_tokens=500
+        )
+        await asyncio.to_thread(self.db.save_book_summary, book_id, 'book', summary)
+        return summary
     
     def analyze_theme(self, book_id: int) -> Dict:
-        """Analyze themes and topics in the book"""
+        """Analyze themes and topics in the whole book"""
         book = self.db.get_book(book_id)
         if not book:
             return None
         
-        # Generate AI analysis
-        response = self.openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a literary analyst. Analyze the main themes and topics in the book."},
-                {"role": "user", "content": f"Book content: {book['text_content'][:4000]}"}  # First 4000 chars for analysis
-            ],
-            temperature=0.7,
-            max_tokens=500
+        # Generate AI analysis over the book condensed by map-reduce summarization;
+        # the partial summaries are shared with summarize_book
+        analysis = self.summarizer.summarize(
+            self.db.get_book_text(book_id) or "",
+            "You are a literary analyst. Analyze the main themes and topics in the book.",
+            label="book",
+            max_tokens=500,
+            site='theme',
+            temperature=0.3
         )
         
         return {
-            'analysis': response.choices[0].message.content,
+            'analysis': analysis,
+            # Stored for later questions; costs one extra call on top of the shared partial summaries
+            'summary': self.summarize_book(book_id),
             'book_title': book['title'],
             'book_author': book['author']
         }
     
+    async def aanalyze_theme(self, book_id: int) -> Dict:
+        """Async variant of analyze_theme for the ASGI app"""
+        book = await asyncio.to_thread(self.db.get_book, book_id)
+        if not book:
+            return None
+
+        analysis = await self.summarizer.asummarize(
+            await asyncio.to_thread(self.db.get_book_text, book_id) or "",
+            "You are a literary analyst. Analyze the main themes and topics in the book.",
+            label="book",
+            max_tokens=500,
+            site='theme',
+            temperature=0.3
+        )
+
+        return {
+            'analysis': analysis,
+            'summary': await self.asummarize_book(book_id),
+            'book_title': book['title'],
+            'book_author': book['author']
+        }
+
     def _enhance_content(self, content: str, book_title: str, author: str) -> Dict:
-        """Enhance book content with AI-generated features"""
-        # Generate character analysis
-        characters = self._analyze_characters(content)
-        
-        # Generate key points
-        key_points = self._extract_key_points(content)
-        
-        # Generate vocabulary list
-        vocabulary = self._extract_vocabulary(content)
-        
+        """Enhance book content with AI-generated features.
+
+        Results are stored per content hash, so reopening a chapter does not call the API.
+        """
+        content_hash = self._enhancement_key(content)
+        enhancement = self.db.get_enrichment(content_hash)
+
+        if enhancement is None:
+            if ENHANCE_MODE == 'merged':
+                enhancement = self._enhance_merged(content, book_title, author)
+            if enhancement is None:
+                enhancement = self._enhance_concurrent(content)
+            # Do not pin a reply we could not parse at all
+            if any(enhancement[field] for field in ENHANCE_FIELDS):
+                self.db.save_enrichment(content_hash, enhancement)
+
         return {
             'original_content': content,
-            'characters': characters,
-            'key_points': key_points,
-            'vocabulary': vocabulary
+            'characters': enhancement['characters'],
+            'key_points': enhancement['key_points'],
+            'vocabulary': enhancement['vocabulary']
         }
-    
+
+    @staticmethod
+    def _enhancement_key(content: str) -> str:
+        return hashlib.sha256(f"{ENHANCE_VERSION}\n{content}".encode('utf-8')).hexdigest()
+
+    def _enhance_merged(self, content: str, book_title: str, author: str) -> Optional[Dict]:
+        """Generate all three artifacts with one JSON-mode request; None if the reply is unusable"""
+        try:
+            reply = self.llm_cache.complete(
+                self.openai_client.chat.completions.create,
+                site='enrichment',
+                model=ENHANCE_MODEL,
+                messages=[
+                    {"role": "system", "content": (
+                        f"You are a reading assistant for the book '{book_title}' by {author}. "
+                        "Analyze the text and return a JSON object with exactly these keys: "
+                        "\"characters\" (array of objects with \"name\" and \"description\"), "
+                        "\"key_points\" (array of strings) and "
+                        "\"vocabulary\" (array of objects with \"word\" and \"meaning\")."
+                    )},
+                    {"role": "user", "content": content}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.3,
+                max_tokens=900
+            )
+            result = json.loads(reply)
+        except Exception as e:
+            print(f"Merged enrichment failed, falling back to separate requests: {str(e)}")
+            return None
+
+        if not all(isinstance(result.get(field), list) for field in ENHANCE_FIELDS):
+            return None
+        return {field: result[field] for field in ENHANCE_FIELDS}
+
+    def _enhance_concurrent(self, content: str) -> Dict:
+        """Run the three separate enrichment requests in parallel"""
+        with ThreadPoolExecutor(max_workers=len(ENHANCE_FIELDS)) as executor:
+            characters = executor.submit(self._analyze_characters, content)
+            key_points = executor.submit(self._extract_key_points, content)
+            vocabulary = executor.submit(self._extract_vocabulary, content)
+
+            return {
+                'characters': characters.result(),
+                'key_points': key_points.result(),
+                'vocabulary': vocabulary.result()
+            }
+
     def _analyze_characters(self, content: str) -> List[Dict]:
         """Analyze characters mentioned in the content"""
-        response = self.openai_client.chat.completions.create(
+        reply = self.llm_cache.complete(
+            self.openai_client.chat.completions.create,
+            site='enrichment',
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "Extract and analyze characters mentioned in the text. Return as JSON array."},
                 {"role": "user", "content": content}
             ],
-            temperature=0.7,
+            temperature=0.3,
             max_tokens=300
         )
         
         try:
-            return json.loads(response.choices[0].message.content)
+            return json.loads(reply)
         except:
             return []
     
     def _extract_key_points(self, content: str) -> List[str]:
         """Extract key points from the content"""
-        response = self.openai_client.chat.completions.create(
+        reply = self.llm_cache.complete(
+            self.openai_client.chat.completions.create,
+            site='enrichment',
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "Extract key points from the text. Return as JSON array."},
                 {"role": "user", "content": content}
             ],
-            temperature=0.7,
+            temperature=0.3,
             max_tokens=300
         )
         
         try:
-            return json.loads(response.choices[0].message.content)
+            return json.loads(reply)
         except:
             return []
     
     def _extract_vocabulary(self, content: str) -> List[Dict]:
         """Extract vocabulary words and their meanings"""
-        response = self.openai_client.chat.completions.create(
+        reply = self.llm_cache.complete(
+            self.openai_client.chat.completions.create,
+            site='enrichment',
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "Extract vocabulary words and their meanings. Return as JSON array."},
                 {"role": "user", "content": content}
             ],
-            temperature=0.7,
+            temperature=0.3,
             max_tokens=300
         )
         
         try:
-            return json.loads(response.choices[0].message.content)
+            return json.loads(reply)
         except:
             return [] 
\ No newline at end of file
@@ -0,0 +1,107 @@
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Headings closer together than this on average are a table of contents, not chapters
+MIN_CHAPTER_CHARS = 500
+
+# One pass finds every heading: a chapter keyword followed by a number anywhere, or a
+# number (Arabic or Roman) standing alone on its own line
+CHAPTER_PATTERN = re.compile(
+    r'(?:فصل|Chapter|CHAPTER|بخش|باب|قسمت)\s+(\d+|[IVXLC]+\b)'
+    r'|^[ \t]*(\d+|[IVXLC]+)[.)]?[ \t]*$',
+    re.MULTILINE
+)
+
+_ROMAN = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100}
+
+
+def _roman_to_int(numeral: str) -> int:
+    total = 0
+    for i, letter in enumerate(numeral):
+        value = _ROMAN[letter]
+        if i + 1 < len(numeral) and _ROMAN[numeral[i + 1]] > value:
+            total -= value
+        else:
+            total += value
+    return total
+
+
+def _heading_number(match: re.Match) -> int:
+    token = match.group(1) or match.group(2)
+    return int(token) if token.isdigit() else _roman_to_int(token)
+
+
+class ChapterDetector:
+    """Finds chapter headings in text fed to it in order, whole or a page at a time.
+
+    Headings must be numbered in sequence from 1, which keeps cross references
+    ("as shown in Chapter 3") and stray numbers out. When numbering starts again at 1
+    right after a run of headings too close together to be chapters, that run was a
+    table of contents and is dropped.
+    """
+
+    def __init__(self, min_chapter_chars: int = MIN_CHAPTER_CHARS):
+        self.min_chapter_chars = min_chapter_chars
+        self.headings: List[Tuple[int, str, int]] = []  # (offset, title, number)
+        # Filled by feed_pages
+        self.page_starts: List[int] = []
+        self.text_length = 0
+
+    def feed(self, offset: int, text: str) -> None:
+        """Scan text that starts at offset in the whole book"""
+        for match in CHAPTER_PATTERN.finditer(text):
+            number = _heading_number(match)
+            start = offset + match.start()
+            last = self.headings[-1][2] if self.headings else 0
+            if number == 1 and self.headings:
+                if start - self.headings[0][0] >= self.min_chapter_chars * len(self.headings):
+                    continue
+                self.headings = []
+            elif number != last + 1:
+                continue
+            self.headings.append((start, match.group(0).strip(), number))
+
+    def feed_pages(self, pages: Iterable[Dict]) -> Iterator[Dict]:
+        """Pass stored pages (content, start_offset, end_offset) through, scanning each one;
+        page_chapters() gives the chapters with their page ranges once they are consumed"""
+        for page in pages:
+            self.feed(page['start_offset'], page['content'])
+            self.page_starts.append(page['start_offset'])
+            self.text_length = page['end_offset']
+            yield page
+
+    def page_chapters(self) -> List[Dict]:
+        """Chapters of the pages passed through feed_pages"""
+        return self.chapters(self.text_length, self.page_starts)
+
+    def chapters(self, text_length: int, page_starts: Optional[Sequence[int]] = None) -> List[Dict]:
+        """Chapters found so far, each running up to the next heading (the last to text_length).
+
+        With the start offsets of a book's stored pages, each chapter also gets its
+        first and last page.
+        """
+        starts = [offset for offset, _, _ in self.headings] + [text_length]
+        chapters = [
+            {
+                'chapter_number': number,
+                'title': title,
+                'start_offset': offset,
+                'end_offset': starts[i + 1]
+            }
+            for i, (offset, title, number) in enumerate(self.headings)
+        ]
+        if page_starts is not None:
+            for chapter in chapters:
+                chapter['start_page'] = bisect_right(page_starts, chapter['start_offset'])
+                chapter['end_page'] = bisect_right(
+                    page_starts, max(chapter['start_offset'], chapter['end_offset'] - 1)
+                )
+        return chapters
+
+
+def detect_chapters(text: str, min_chapter_chars: int = MIN_CHAPTER_CHARS) -> List[Dict]:
+    """Chapters of a whole text with their character offsets; empty if it has no headings"""
+    detector = ChapterDetector(min_chapter_chars)
+    detector.feed(0, text)
+    return detector.chapters(len(text))
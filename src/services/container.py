@@ -0,0 +1,55 @@
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+ConfigLoader = Callable[[], Any]
+ServiceBuilder = Callable[[Any], Dict[str, Any]]
+
+
+class ServiceContainer:
+    """Application-scoped services, built once and shared by every request.
+
+    ``build`` turns a config into the services (database, LLM, speech, ...) and the
+    container publishes them together as one snapshot with the config, so a request
+    never mixes a database from one config with an LLM from another. The snapshot is
+    built on first use under a lock; after that get() is a plain attribute read.
+
+    reload() re-reads the config and, if it differs from the current one, builds a
+    new snapshot and swaps it in. Requests already running keep the snapshot they
+    started with.
+    """
+
+    def __init__(self, load_config: ConfigLoader, build: ServiceBuilder,
+                 fingerprint: Callable[[Any], Any] = repr):
+        self._load_config = load_config
+        self._build = build
+        self._fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._services: Optional[SimpleNamespace] = None
+        self._config_fingerprint = None
+
+    def get(self) -> SimpleNamespace:
+        """The current services (config, and whatever build returned), building them on first use"""
+        services = self._services
+        if services is None:
+            with self._lock:
+                if self._services is None:
+                    self._publish(self._load_config())
+                services = self._services
+        return services
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the config and rebuild the services if it changed; returns whether they were rebuilt"""
+        with self._lock:
+            config = self._load_config()
+            if (not force and self._services is not None
+                    and self._fingerprint(config) == self._config_fingerprint):
+                return False
+            self._publish(config)
+            return True
+
+    def _publish(self, config: Any):
+        # Build fully before swapping, so a failed build leaves the old services in place
+        services = SimpleNamespace(config=config, **self._build(config))
+        self._config_fingerprint = self._fingerprint(config)
+        self._services = services
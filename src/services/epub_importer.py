@@ -0,0 +1,293 @@
+import html.entities
+import os
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import unquote
+from ..database.book_db import BookDatabase
+from .pagination import PAGE_SEPARATOR, iter_text_pages
+from .text_normalizer import TextNormalizer
+
+EPUBSource = Union[str, BinaryIO]
+
+# Bytes of a spine document handed to the parser at a time
+EPUB_READ_BLOCK_SIZE = 64 * 1024
+
+_CONTAINER_NS = '{urn:oasis:names:tc:opendocument:xmlns:container}'
+_OPF_NS = '{http://www.idpf.org/2007/opf}'
+_DC_NS = '{http://purl.org/dc/elements/1.1/}'
+
+# Elements whose start and end are paragraph breaks in the extracted text
+_BLOCK_TAGS = frozenset([
+    'p', 'div', 'br', 'hr', 'li', 'ul', 'ol', 'dl', 'dt', 'dd', 'blockquote', 'pre',
+    'section', 'article', 'header', 'footer', 'aside', 'nav', 'figure', 'figcaption',
+    'table', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'
+])
+# Elements whose text is not part of the book
+_SKIP_TAGS = frozenset(['head', 'script', 'style'])
+# Headings that name a chapter
+_TITLE_TAGS = frozenset(['h1', 'h2', 'h3'])
+
+
+class _XHTMLText:
+    """Collects the text of an XHTML document and its first heading.
+
+    Used as an ElementTree parser target (expat does the parsing) and, for documents
+    that are not well-formed XML, driven by _HTMLText.
+    """
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.heading: Optional[str] = None
+        self._heading_parts: Optional[List[str]] = None
+        self._skip = 0
+
+    def start(self, tag: str, attrs=None):
+        name = tag.rsplit('}', 1)[-1].lower()
+        if name in _SKIP_TAGS:
+            self._skip += 1
+        elif name in _BLOCK_TAGS:
+            self.parts.append('\n\n')
+            if name in _TITLE_TAGS and self.heading is None and self._heading_parts is None:
+                self._heading_parts = []
+
+    def end(self, tag: str):
+        name = tag.rsplit('}', 1)[-1].lower()
+        if name in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif name in _BLOCK_TAGS:
+            self.parts.append('\n\n')
+            if name in _TITLE_TAGS and self._heading_parts is not None:
+                self.heading = ' '.join(''.join(self._heading_parts).split()) or None
+                self._heading_parts = None
+
+    def data(self, text: str):
+        if not self._skip:
+            self.parts.append(text)
+            if self._heading_parts is not None:
+                self._heading_parts.append(text)
+
+    def close(self) -> Tuple[str, Optional[str]]:
+        return ''.join(self.parts), self.heading
+
+
+class _HTMLText(HTMLParser):
+    """Lenient fallback for spine documents with HTML entities or markup errors"""
+
+    def __init__(self, target: _XHTMLText):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag)
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+def extract_xhtml(archive: zipfile.ZipFile, name: str) -> Tuple[str, Optional[str]]:
+    """Text and first heading of a spine document, parsed as it is read out of the zip"""
+    target = _XHTMLText()
+    parser = ET.XMLParser(target=target)
+    # Named HTML entities resolve when the document declares the XHTML DTD
+    parser.entity.update(html.entities.entitydefs)
+    try:
+        with archive.open(name) as member:
+            for block in iter(lambda: member.read(EPUB_READ_BLOCK_SIZE), b''):
+                parser.feed(block)
+        return parser.close()
+    except ET.ParseError:
+        pass
+
+    target = _XHTMLText()
+    fallback = _HTMLText(target)
+    with archive.open(name) as member:
+        fallback.feed(member.read().decode('utf-8', errors='replace'))
+    fallback.close()
+    return target.close()
+
+
+def read_package(archive: zipfile.ZipFile) -> Dict:
+    """Metadata (title, author, isbn) and the spine document paths of an EPUB"""
+    container = ET.fromstring(archive.read('META-INF/container.xml'))
+    rootfile = container.find(f'.//{_CONTAINER_NS}rootfile')
+    if rootfile is None:
+        raise ValueError('EPUB container has no package document')
+    opf_path = rootfile.get('full-path')
+    opf_dir = posixpath.dirname(opf_path)
+    package = ET.fromstring(archive.read(opf_path))
+
+    def text(tag):
+        element = package.find(f'{_OPF_NS}metadata/{_DC_NS}{tag}')
+        return element.text.strip() if element is not None and element.text else None
+
+    isbn = None
+    for identifier in package.iterfind(f'{_OPF_NS}metadata/{_DC_NS}identifier'):
+        value = (identifier.text or '').strip()
+        scheme = identifier.get(f'{_OPF_NS}scheme', '')
+        if value.lower().startswith('urn:isbn:') or scheme.upper() == 'ISBN':
+            isbn = value.split(':')[-1]
+            break
+
+    manifest = {
+        item.get('id'): posixpath.normpath(posixpath.join(opf_dir, unquote(item.get('href'))))
+        for item in package.iterfind(f'{_OPF_NS}manifest/{_OPF_NS}item')
+    }
+    spine = [
+        manifest[itemref.get('idref')]
+        for itemref in package.iterfind(f'{_OPF_NS}spine/{_OPF_NS}itemref')
+        if itemref.get('linear') != 'no' and itemref.get('idref') in manifest
+    ]
+
+    return {
+        'title': text('title'),
+        'author': text('creator'),
+        'isbn': isbn,
+        'spine': spine
+    }
+
+
+class EPUBImporter:
+    """Imports EPUBs chapter by chapter: every spine document with text is one chapter.
+
+    The XHTML is read out of the zip and parsed one document at a time, and each
+    chapter is cut into pages that never cross into the next chapter, so chapter
+    boundaries and page ranges are exact.
+    """
+
+    def __init__(self, db: BookDatabase, normalizer: Optional[TextNormalizer] = None):
+        """Initialize the EPUB importer service"""
+        self.db = db
+        self.normalizer = normalizer or TextNormalizer()
+
+    def iter_chapters(self, archive: zipfile.ZipFile, spine: List[str]) -> Iterator[Dict]:
+        """Cleaned chapters (chapter_number, title, content) in reading order; empty documents are skipped"""
+        number = 0
+        for name in spine:
+            text, heading = extract_xhtml(archive, name)
+            content = self.normalizer.normalize(text)
+            if not content:
+                continue
+            number += 1
+            yield {
+                'chapter_number': number,
+                'title': heading or f'Chapter {number}',
+                'content': content
+            }
+
+    def import_epub(self, epub_path: str, title: Optional[str] = None,
+                    author: Optional[str] = None, isbn: Optional[str] = None) -> Dict:
+        """Import an EPUB file into the database"""
+        try:
+            return self._import_archive(epub_path, epub_path, title, author, isbn)
+
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def import_epub_stream(self, stream: BinaryIO, filename: str, title: Optional[str] = None,
+                           author: Optional[str] = None, isbn: Optional[str] = None) -> Dict:
+        """Import an EPUB from a seekable binary stream (e.g. a spooled upload)"""
+        try:
+            return self._import_archive(stream, filename, title, author, isbn)
+
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def _import_archive(self, source: EPUBSource, source_name: str, title: Optional[str],
+                        author: Optional[str], isbn: Optional[str]) -> Dict:
+        with zipfile.ZipFile(source) as archive:
+            package = read_package(archive)
+            title = title or package['title'] or os.path.splitext(os.path.basename(source_name))[0]
+            author = author or package['author'] or 'Unknown Author'
+            isbn = isbn or package['isbn']
+
+            book_id = self.db.add_book(title=title, author=author, isbn=isbn)
+            try:
+                page_count, chapters = self._store_chapters(book_id, self.iter_chapters(archive, package['spine']))
+            except Exception:
+                self.db.delete_book(book_id)
+                raise
+
+        return {
+            'book_id': book_id,
+            'title': title,
+            'author': author,
+            'page_count': page_count,
+            'chapter_count': len(chapters),
+            'status': 'success'
+        }
+
+    def iter_pages(self, chapters: Iterator[Dict], stored: List[Dict]) -> Iterator[Dict]:
+        """Pages of the chapters in order, never crossing a chapter boundary.
+
+        Each chapter is appended to ``stored`` (with its offsets and pages, without its
+        content) once its last page has been yielded.
+        """
+        page_count = 0
+        offset = 0
+        for chapter in chapters:
+            start_page = page_count + 1
+            for page in iter_text_pages([chapter['content']], first_page=start_page, start_offset=offset):
+                page_count = page['page_number']
+                yield page
+            stored.append({
+                'chapter_number': chapter['chapter_number'],
+                'title': chapter['title'],
+                'start_offset': offset,
+                'end_offset': page['end_offset'],
+                'start_page': start_page,
+                'end_page': page_count
+            })
+            offset = page['end_offset'] + len(PAGE_SEPARATOR)
+
+    def _store_chapters(self, book_id: int, chapters: Iterator[Dict]) -> Tuple[int, List[Dict]]:
+        """Write chapters to book_pages as they are parsed; returns the page count and the chapters"""
+        stored = []
+        page_count = self.db.add_book_pages(book_id, self.iter_pages(chapters, stored))
+        self.db.save_chapters(book_id, stored)
+        # Pages are served from book_pages, so the book is readable without /process
+        self.db.update_book(book_id, {'total_pages': page_count})
+        return page_count, stored
+
+    def extract_book(self, epub_path: str) -> Dict:
+        """Extract and clean an EPUB without storing it.
+
+        Returns title, author, isbn, text_content (chapters joined by PAGE_SEPARATOR)
+        and chapters, as taken by BookDatabase.add_books; bulk imports run this in
+        worker processes.
+        """
+        with zipfile.ZipFile(epub_path) as archive:
+            package = read_package(archive)
+            contents = []
+            chapters = []
+            offset = 0
+            for chapter in self.iter_chapters(archive, package['spine']):
+                content = chapter.pop('content')
+                chapter['start_offset'] = offset
+                chapter['end_offset'] = offset + len(content)
+                chapters.append(chapter)
+                contents.append(content)
+                offset = chapter['end_offset'] + len(PAGE_SEPARATOR)
+
+        return {
+            'title': package['title'] or os.path.splitext(os.path.basename(epub_path))[0],
+            'author': package['author'] or 'Unknown Author',
+            'isbn': package['isbn'],
+            'text_content': PAGE_SEPARATOR.join(contents),
+            'chapters': chapters
+        }
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from .single_flight import SingleFlight
+
+LLM_CACHE_PATH = os.getenv(
+    'LLM_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'llm_cache.db')
+)
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', '512'))
+LLM_CACHE_MAX_ROWS = int(os.getenv('LLM_CACHE_MAX_ROWS', '50000'))
+# Share of max_rows freed by one eviction, so eviction runs once per that many writes
+LLM_CACHE_EVICT_FRACTION = 0.1
+# Calls sampled above this temperature are not cached (pass cache=True to override)
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', '0.3'))
+
+DAY = 24 * 60 * 60
+
+# Per call site: how long an answer stays valid (None = forever)
+CALL_SITES = {
+    'translation': {'ttl': None},
+    'summary': {'ttl': 30 * DAY},
+    'enrichment': {'ttl': 30 * DAY},
+    'theme': {'ttl': 30 * DAY},
+    'question': {'ttl': DAY},
+    'default': {'ttl': DAY},
+}
+
+
+class LLMCache:
+    """Two-tier cache for chat completion results.
+
+    Keys are a hash of the full request (model, messages and sampling parameters), so
+    any change to the prompt is a miss. Entries live in a small in-memory LRU in front
+    of a size-bounded SQLite table that is shared by every process using the same file.
+    Concurrent misses for one key share a single API call.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+                 max_rows: int = LLM_CACHE_MAX_ROWS, max_temperature: float = LLM_CACHE_MAX_TEMPERATURE):
+        # Read at call time, so the shared cache follows LLM_CACHE_PATH as patched in tests
+        self.path = path or LLM_CACHE_PATH
+        self.memory_entries = memory_entries
+        self.max_rows = max_rows
+        self.max_temperature = max_temperature
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (content, expires_at)
+        self._flights = SingleFlight()
+        self._metrics = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'uncached': 0}
+        self._rows = 0  # rows on disk as of the last count, plus rows written since
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                site TEXT,
+                content TEXT NOT NULL,
+                expires_at REAL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)')
+        conn.commit()
+        self._rows = conn.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+        conn.close()
+
+    @staticmethod
+    def make_key(params: dict) -> str:
+        """Hash of everything that determines the completion"""
+        payload = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def cacheable(self, params: dict) -> bool:
+        """Whether a call's result may be reused for an identical later call"""
+        if params.get('stream') or params.get('n', 1) != 1:
+            return False
+        return params.get('temperature', 1.0) <= self.max_temperature
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                content, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._metrics['memory_hits'] += 1
+                    return content
+                del self._memory[key]
+
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT content, expires_at FROM llm_cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (key, now)
+        ).fetchone()
+        if row:
+            conn.execute('UPDATE llm_cache SET last_used = ? WHERE key = ?', (now, key))
+            conn.commit()
+        conn.close()
+
+        if not row:
+            return None
+        self._remember(key, row[0], row[1])
+        with self._lock:
+            self._metrics['disk_hits'] += 1
+        return row[0]
+
+    def put(self, key: str, content: str, ttl: Optional[float] = None, site: str = 'default'):
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        self._remember(key, content, expires_at)
+
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO llm_cache (key, site, content, expires_at, last_used) VALUES (?, ?, ?, ?, ?)',
+            (key, site, content, expires_at, now)
+        )
+        # Replaced keys are counted too, so the count only errs towards evicting early
+        with self._lock:
+            self._rows += 1
+            over_budget = self._rows > self.max_rows
+        if over_budget:
+            self._evict(conn, now)
+        conn.commit()
+        conn.close()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired rows, then least recently used ones until a tenth of the budget is free"""
+        target = self.max_rows - max(1, int(self.max_rows * LLM_CACHE_EVICT_FRACTION))
+        conn.execute('DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,))
+        # Counted again here: other processes sharing the file write rows this one has not seen
+        rows = conn.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+        excess = max(0, rows - target)
+        conn.execute('''
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_used LIMIT ?
+            )
+        ''', (excess,))
+        with self._lock:
+            self._rows = rows - excess
+
+    def _remember(self, key: str, content: str, expires_at: Optional[float]):
+        with self._lock:
+            self._memory[key] = (content, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _policy(self, site: str, ttl: Optional[float]) -> Optional[float]:
+        return ttl if ttl is not None else CALL_SITES.get(site, CALL_SITES['default'])['ttl']
+
+    def complete(self, create: Callable[..., Any], site: str = 'default', ttl: Optional[float] = None,
+                 cache: Optional[bool] = None, **params) -> str:
+        """Message content of create(**params), served from the cache when possible.
+
+        ``create`` is a chat.completions.create method. ``cache`` overrides the
+        temperature decision; ``ttl`` overrides the call site's TTL.
+        """
+        if not (cache if cache is not None else self.cacheable(params)):
+            with self._lock:
+                self._metrics['uncached'] += 1
+            return create(**params).choices[0].message.content
+
+        key = self.make_key(params)
+        content = self.get(key)
+        if content is not None:
+            return content
+
+        def call():
+            content = self.get(key)
+            if content is None:
+                with self._lock:
+                    self._metrics['misses'] += 1
+                content = create(**params).choices[0].message.content
+                self.put(key, content, self._policy(site, ttl), site)
+            return content
+
+        return self._flights.do(key, call)
+
+    async def acomplete(self, create: Callable[..., Awaitable[Any]], site: str = 'default',
+                        ttl: Optional[float] = None, cache: Optional[bool] = None, **params) -> str:
+        """Async variant of complete; create is an AsyncOpenAI chat.completions.create method"""
+        if not (cache if cache is not None else self.cacheable(params)):
+            with self._lock:
+                self._metrics['uncached'] += 1
+            return (await create(**params)).choices[0].message.content
+
+        key = self.make_key(params)
+        content = await asyncio.to_thread(self.get, key)
+        if content is not None:
+            return content
+
+        async def call():
+            content = await asyncio.to_thread(self.get, key)
+            if content is None:
+                with self._lock:
+                    self._metrics['misses'] += 1
+                content = (await create(**params)).choices[0].message.content
+                await asyncio.to_thread(self.put, key, content, self._policy(site, ttl), site)
+            return content
+
+        return await self._flights.ado(key, call)
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        rows = conn.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+        conn.close()
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['memory_entries'] = len(self._memory)
+        metrics['disk_rows'] = rows
+        metrics['coalesced'] = self._flights.metrics()['coalesced']
+        return metrics
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """The process-wide cache shared by every OpenAI call site"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMCache()
+        return _shared_cache
@@ -0,0 +1,179 @@
+import re
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 1000  # characters per page
+MIN_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 20000
+# Between pages when a book stored page by page is read as one text
+PAGE_SEPARATOR = '\n\n'
+
+# Distance between sampled word boundaries, used when a window has no sentence end
+WORD_SAMPLE_STEP = 32
+
+# Paragraph break, or end of sentence (Latin and Persian punctuation, closing quotes) plus whitespace
+_BOUNDARY_PATTERN = re.compile(r'\n[ \t\r\f\v]*\n\s*|[.!?؟…]+["\'»”’)\]]*\s+')
+_WHITESPACE_PATTERN = re.compile(r'\s')
+
+
+class BoundaryIndex:
+    """Offsets in a book's text where a page may start, stored as compact unsigned int arrays.
+
+    ``paragraphs`` and ``sentences`` hold the offset of the first character after each
+    paragraph break / sentence end, ``words`` a sample of word starts (one every
+    ``word_step`` characters) as the fallback for text without punctuation. Page
+    boundaries for any page size are found by binary search, so nothing is re-chunked
+    or copied when the size changes.
+    """
+
+    def __init__(self, text_length: int, paragraphs: array, sentences: array, words: array,
+                 word_step: int = WORD_SAMPLE_STEP):
+        self.text_length = text_length
+        self.paragraphs = paragraphs
+        self.sentences = sentences
+        self.words = words
+        self.word_step = word_step
+
+    @classmethod
+    def build(cls, text: str, word_step: int = WORD_SAMPLE_STEP) -> 'BoundaryIndex':
+        """Scan the text once and record paragraph, sentence and sampled word boundaries"""
+        paragraphs = array('I')
+        sentences = array('I')
+        for match in _BOUNDARY_PATTERN.finditer(text):
+            offset = match.end()
+            if offset >= len(text):
+                break
+            if match.group().count('\n') >= 2:
+                paragraphs.append(offset)
+            sentences.append(offset)
+
+        words = array('I')
+        position = word_step
+        while position < len(text):
+            match = _WHITESPACE_PATTERN.search(text, position)
+            if not match:
+                break
+            words.append(match.end())
+            position = max(match.end(), position + word_step)
+
+        return cls(len(text), paragraphs, sentences, words, word_step)
+
+    def total_pages(self, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+        if self.text_length == 0:
+            return 0
+        return (self.text_length + page_size - 1) // page_size
+
+    def _snap(self, offset: int, window: int) -> int:
+        """Move a nominal page break back to the best boundary within window characters"""
+        for boundaries in (self.paragraphs, self.sentences, self.words):
+            i = bisect_right(boundaries, offset) - 1
+            if i >= 0 and boundaries[i] > offset - window:
+                return boundaries[i]
+        return offset
+
+    def page_bounds(self, page_number: int, page_size: int = DEFAULT_PAGE_SIZE) -> Optional[Tuple[int, int]]:
+        """Return (start, end) character offsets of a 1-based page, or None if out of range"""
+        total = self.total_pages(page_size)
+        if page_number < 1 or page_number > total:
+            return None
+        window = max(1, page_size // 4)
+        start = 0 if page_number == 1 else self._snap((page_number - 1) * page_size, window)
+        end = self.text_length if page_number == total else self._snap(page_number * page_size, window)
+        return start, end
+
+    def page_of(self, offset: int, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+        """1-based page that contains a character offset"""
+        total = self.total_pages(page_size)
+        if total == 0:
+            return 0
+        page_number = min(max(offset, 0) // page_size + 1, total)
+        # Breaks are snapped back by up to a quarter page, so the nominal page can be one off
+        if page_number < total and offset >= self.page_bounds(page_number + 1, page_size)[0]:
+            return page_number + 1
+        if page_number > 1 and offset < self.page_bounds(page_number, page_size)[0]:
+            return page_number - 1
+        return page_number
+
+    def to_row(self) -> dict:
+        """Serialize for storage in the book_text_index table"""
+        return {
+            'text_length': self.text_length,
+            'word_step': self.word_step,
+            'paragraphs': self.paragraphs.tobytes(),
+            'sentences': self.sentences.tobytes(),
+            'words': self.words.tobytes()
+        }
+
+    @classmethod
+    def from_row(cls, text_length: int, word_step: int, paragraphs: bytes,
+                 sentences: bytes, words: bytes) -> 'BoundaryIndex':
+        def unpack(blob):
+            values = array('I')
+            values.frombytes(blob or b'')
+            return values
+        return cls(text_length, unpack(paragraphs), unpack(sentences), unpack(words), word_step)
+
+
+def clamp_page_size(page_size: Optional[int]) -> int:
+    """Keep a client-requested page size within sane limits"""
+    if not page_size:
+        return DEFAULT_PAGE_SIZE
+    return max(MIN_PAGE_SIZE, min(MAX_PAGE_SIZE, page_size))
+
+
+def find_break(text: str, start: int, end: int) -> int:
+    """Offset in (start, end] right after the last sentence end in text[start:end].
+
+    Falls back to the last whitespace, and to end itself when the window is a single word.
+    """
+    last = None
+    for match in _BOUNDARY_PATTERN.finditer(text, start, end):
+        last = match.end()
+    if last is not None and last > start:
+        return last
+    for offset in range(end - 1, start, -1):
+        if text[offset].isspace():
+            return offset + 1
+    return end
+
+
+def iter_text_pages(pieces: Iterable[str], page_size: int = DEFAULT_PAGE_SIZE,
+                    first_page: int = 1, start_offset: int = 0) -> Iterator[Dict]:
+    """Cut text arriving in pieces into stored pages of about page_size characters.
+
+    Pages end at the last sentence end (or whitespace) in their final quarter and are
+    trimmed; offsets are into the pages joined by PAGE_SEPARATOR, which is how a book
+    stored page by page is read back as one text. first_page and start_offset continue
+    the numbering of pages already stored (e.g. earlier chapters).
+    """
+    buffer = ''
+    offset = start_offset
+    page_number = first_page - 1
+
+    def page(content):
+        nonlocal offset, page_number
+        page_number += 1
+        start = offset
+        offset += len(content) + len(PAGE_SEPARATOR)
+        return {
+            'page_number': page_number,
+            'content': content,
+            'start_offset': start,
+            'end_offset': start + len(content)
+        }
+
+    for piece in pieces:
+        buffer += piece
+        position = 0
+        while len(buffer) - position > page_size:
+            cut = find_break(buffer, position + page_size - page_size // 4, position + page_size)
+            content = buffer[position:cut].strip()
+            position = cut
+            if content:
+                yield page(content)
+        buffer = buffer[position:]
+
+    content = buffer.strip()
+    if content:
+        yield page(content)
@@ -1,65 +1,120 @@
 import PyPDF2
 import io
 import os
-from typing import Dict, Optional, List
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional, List, Tuple, Union
 from ..database.book_db import BookDatabase
+from .chapters import ChapterDetector, detect_chapters
+from .pagination import PAGE_SEPARATOR
+from .text_normalizer import TextNormalizer
+from .upload_stream import SpooledUpload
 import fitz  # PyMuPDF for better PDF handling
-import re
+
+# Worker processes for extracting the text of large PDFs
+PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', str(min(os.cpu_count() or 1, 8))))
+# Below this many pages, starting the workers costs more than it saves (see benchmarks/bench_pdf_extract.py)
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '300'))
+# Pages handed to a worker at a time
+PDF_EXTRACT_BATCH = 50
+# From this many pages on, PDFs are stored page by page instead of as one text_content string
+PDF_STREAM_MIN_PAGES = int(os.getenv('PDF_STREAM_MIN_PAGES', '500'))
+
+PDFSource = Union[str, bytes]
+
+
+def extract_page_range(source: PDFSource, first: int, last: int) -> List[str]:
+    """Text of pages first..last-1 of a PDF given by path or bytes; runs in a worker process"""
+    doc = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype='pdf')
+    try:
+        return [doc[number].get_text() for number in range(first, last)]
+    finally:
+        doc.close()
+
 
 class PDFImporter:
-    def __init__(self, db: BookDatabase):
+    def __init__(self, db: BookDatabase, workers: int = PDF_EXTRACT_WORKERS,
+                 parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES,
+                 stream_min_pages: int = PDF_STREAM_MIN_PAGES,
+                 normalizer: Optional[TextNormalizer] = None):
         """Initialize the PDF importer service"""
         self.db = db
+        self.normalizer = normalizer or TextNormalizer()
+        self.workers = workers
+        self.parallel_min_pages = parallel_min_pages
+        self.stream_min_pages = stream_min_pages
+
+    def iter_page_texts(self, doc, source: Optional[PDFSource] = None) -> Iterator[str]:
+        """Text of every page in order.
+
+        Large documents are split into page batches extracted by a process pool, each
+        worker opening the document itself from ``source``. PDF bytes are written to a
+        temp file once and workers get its path, so the document is not pickled into
+        every batch. Small documents, or documents without a source, are read in this
+        process. Only a bounded number of batches is in flight, so results do not pile
+        up ahead of the consumer.
+        """
+        page_count = len(doc)
+        if source is None or self.workers <= 1 or page_count < self.parallel_min_pages:
+            for page in doc:
+                yield page.get_text()
+            return
+
+        if isinstance(source, str):
+            yield from self._iter_parallel(source, page_count)
+            return
+
+        fd, path = tempfile.mkstemp(suffix='.pdf', prefix='robobook-pdf-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(source)
+            yield from self._iter_parallel(path, page_count)
+        finally:
+            os.unlink(path)
+
+    def _iter_parallel(self, path: str, page_count: int) -> Iterator[str]:
+        ranges = [(first, min(first + PDF_EXTRACT_BATCH, page_count))
+                  for first in range(0, page_count, PDF_EXTRACT_BATCH)]
+        # spawn rather than fork: the importer runs inside a threaded web server
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            pending = []
+            for first, last in ranges:
+                pending.append(executor.submit(extract_page_range, path, first, last))
+                if len(pending) >= self.workers * 2:
+                    yield from pending.pop(0).result()
+            for future in pending:
+                yield from future.result()
     
     def import_pdf(self, pdf_path: str, title: Optional[str] = None, 
-                   author: Optional[str] = None, isbn: Optional[str] = None) -> Dict:
+                   author: Optional[str] = None, isbn: Optional[str] = None,
+                   stream: Optional[bool] = None) -> Dict:
         """Import a PDF file into the database"""
         try:
             # Open PDF with PyMuPDF for better text extraction
             doc = fitz.open(pdf_path)
+            return self._import_document(doc, pdf_path, title, author, isbn, source=pdf_path, stream=stream)
             
-            # Extract metadata if available
-            metadata = doc.metadata
-            if not title:
-                title = metadata.get('title', os.path.splitext(os.path.basename(pdf_path))[0])
-            if not author:
-                author = metadata.get('author', 'Unknown Author')
-            
-            # Extract text from all pages
-            text_content = []
-            for page in doc:
-                text_content.append(page.get_text())
-            
-            # Join all text with proper spacing
-            full_text = '\n\n'.join(text_content)
-            
-            # Clean up the text
-            full_text = self._clean_text(full_text)
-            
-            # Split into chapters if possible
-            chapters = self._split_into_chapters(full_text)
-            
-            # Get page count before closing
-            page_count = len(doc)
-            
-            # Add to database
-            book_id = self.db.add_book(
-                title=title,
-                author=author,
-                text_content=full_text,
-                isbn=isbn
-            )
-            
-            # Close document after we're done using it
-            doc.close()
-            
+        except Exception as e:
             return {
-                'book_id': book_id,
-                'title': title,
-                'author': author,
-                'page_count': page_count,
-                'status': 'success'
+                'status': 'error',
+                'error': str(e)
             }
+    
+    def import_pdf_stream(self, upload: SpooledUpload, filename: str, title: Optional[str] = None,
+                          author: Optional[str] = None, isbn: Optional[str] = None,
+                          stream: Optional[bool] = None) -> Dict:
+        """Import a PDF straight from a spooled upload without copying it to uploads/"""
+        try:
+            if upload.in_memory:
+                source = upload.getvalue()
+                doc = fitz.open(stream=source, filetype='pdf')
+            else:
+                upload.flush()
+                source = upload.path
+                doc = fitz.open(source)
+            return self._import_document(doc, filename, title, author, isbn, source=source, stream=stream)
             
         except Exception as e:
             return {
@@ -68,21 +123,13 @@ class PDFImporter:
             }
     
     def import_pdf_from_bytes(self, pdf_bytes: bytes, title: str, 
-                            author: str, isbn: Optional[str] = None) -> Dict:
+                            author: str, isbn: Optional[str] = None,
+                            stream: Optional[bool] = None) -> Dict:
         """Import a PDF from bytes (useful for uploaded files)"""
         try:
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                temp_file.write(pdf_bytes)
-                temp_path = temp_file.name
-            
-            # Import the temporary file
-            result = self.import_pdf(temp_path, title, author, isbn)
-            
-            # Clean up
-            os.unlink(temp_path)
-            
-            return result
+            doc = fitz.open(stream=pdf_bytes, filetype='pdf')
+            return self._import_document(doc, title or 'document.pdf', title, author, isbn, source=pdf_bytes,
+                                         stream=stream)
             
         except Exception as e:
             return {
@@ -90,65 +137,114 @@ class PDFImporter:
                 'error': str(e)
             }
     
-    def _clean_text(self, text: str) -> str:
-        """Clean up extracted text"""
-        # Remove multiple spaces
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove special characters but keep Persian characters
-        text = re.sub(r'[^\w\s\u0600-\u06FF\uFB8A\u067E\u0686\u06AF]', '', text)
+    def _import_document(self, doc, source_name: str, title: Optional[str],
+                         author: Optional[str], isbn: Optional[str],
+                         source: Optional[PDFSource] = None, stream: Optional[bool] = None) -> Dict:
+        """Extract, clean and store an already opened PDF document.
+
+        ``source`` is the path or bytes the document was opened from; with it, large
+        documents are extracted in parallel. With ``stream`` (the default from
+        stream_min_pages pages on) pages are cleaned and written to book_pages as they
+        are extracted, so memory use does not depend on the size of the book.
+        """
+        try:
+            # Extract metadata if available
+            metadata = doc.metadata
+            if not title:
+                title = metadata.get('title') or os.path.splitext(os.path.basename(source_name))[0]
+            if not author:
+                author = metadata.get('author') or 'Unknown Author'
+            
+            # Get page count before closing
+            page_count = len(doc)
+            if stream is None:
+                stream = page_count >= self.stream_min_pages
+            
+            if stream:
+                book_id = self._store_pages(doc, source, title, author, isbn)
+            else:
+                full_text, chapters = self._extract_text(doc, source)
+        finally:
+            # Close document after we're done using it
+            doc.close()
         
-        # Fix common OCR issues
-        text = text.replace('٠', '0')
-        text = text.replace('١', '1')
-        text = text.replace('٢', '2')
-        text = text.replace('٣', '3')
-        text = text.replace('٤', '4')
-        text = text.replace('٥', '5')
-        text = text.replace('٦', '6')
-        text = text.replace('٧', '7')
-        text = text.replace('٨', '8')
-        text = text.replace('٩', '9')
+        if not stream:
+            # Add to database
+            book_id = self.db.add_book(
+                title=title,
+                author=author,
+                text_content=full_text,
+                isbn=isbn
+            )
+            self.db.save_chapters(book_id, chapters)
         
-        return text.strip()
+        return {
+            'book_id': book_id,
+            'title': title,
+            'author': author,
+            'page_count': page_count,
+            'status': 'success'
+        }
     
-    def _split_into_chapters(self, text: str) -> List[str]:
-        """Split text into chapters based on common patterns"""
-        # Common chapter patterns in Persian and English
-        chapter_patterns = [
-            r'فصل\s+\d+',
-            r'Chapter\s+\d+',
-            r'بخش\s+\d+',
-            r'باب\s+\d+',
-            r'قسمت\s+\d+',
-            r'^\d+\.',  # Numbered sections
-            r'^\d+\)',  # Numbered sections with parenthesis
-            r'^[IVX]+\.',  # Roman numerals
-            r'^[A-Z]\.'  # Letter sections
-        ]
-        
-        # Combine patterns
-        pattern = '|'.join(chapter_patterns)
+    def _extract_text(self, doc, source: Optional[PDFSource] = None) -> Tuple[str, List[Dict]]:
+        """Cleaned text of a whole document and its chapters"""
+        # Extract and clean the text of all pages, separated by paragraph breaks
+        full_text = ''.join(self.normalizer.iter_normalize(
+            text + '\n\n' for text in self.iter_page_texts(doc, source)
+        ))
         
-        # Split text into chapters
-        chapters = re.split(f'({pattern})', text)
-        
-        # Clean up chapters
-        cleaned_chapters = []
-        current_chapter = []
-        
-        for part in chapters:
-            if re.match(pattern, part):
-                if current_chapter:
-                    cleaned_chapters.append('\n'.join(current_chapter))
-                current_chapter = [part]
-            else:
-                current_chapter.append(part)
-        
-        if current_chapter:
-            cleaned_chapters.append('\n'.join(current_chapter))
+        # Find chapter headings; chapters are stored as offsets into the text
+        return full_text, detect_chapters(full_text)
+    
+    def extract_book(self, pdf_path: str) -> Dict:
+        """Extract and clean a PDF without storing it.
+
+        Returns title, author, text_content, chapters and page_count, as taken by
+        BookDatabase.add_books; bulk imports run this in worker processes.
+        """
+        doc = fitz.open(pdf_path)
+        try:
+            metadata = doc.metadata
+            full_text, chapters = self._extract_text(doc, pdf_path)
+            return {
+                'title': metadata.get('title') or os.path.splitext(os.path.basename(pdf_path))[0],
+                'author': metadata.get('author') or 'Unknown Author',
+                'text_content': full_text,
+                'chapters': chapters,
+                'page_count': len(doc)
+            }
+        finally:
+            doc.close()
+    
+    def iter_clean_pages(self, doc, source: Optional[PDFSource] = None) -> Iterator[Dict]:
+        """Cleaned pages with their offsets in the book's text (pages joined by PAGE_SEPARATOR)"""
+        offset = 0
+        for page_number, text in enumerate(self.iter_page_texts(doc, source), 1):
+            content = self.normalizer.normalize(text)
+            yield {
+                'page_number': page_number,
+                'content': content,
+                'start_offset': offset,
+                'end_offset': offset + len(content)
+            }
+            offset += len(content) + len(PAGE_SEPARATOR)
+    
+    def _store_pages(self, doc, source: Optional[PDFSource], title: str, author: str,
+                     isbn: Optional[str]) -> int:
+        """Write a document to book_pages in batches as it is extracted; returns the book ID"""
+        book_id = self.db.add_book(title=title, author=author, isbn=isbn)
+        # Chapter headings are found page by page as the pages go to the database
+        detector = ChapterDetector()
         
-        return cleaned_chapters
+        try:
+            page_count = self.db.add_book_pages(book_id, detector.feed_pages(self.iter_clean_pages(doc, source)))
+            self.db.save_chapters(book_id, detector.page_chapters())
+            # Pages are served from book_pages, so the book is readable without /process
+            self.db.update_book(book_id, {'total_pages': page_count})
+        except Exception:
+            self.db.delete_book(book_id)
+            raise
+        return book_id
     
     def extract_metadata(self, pdf_path: str) -> Dict:
         """Extract metadata from PDF file"""
@@ -0,0 +1,196 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from .pagination import DEFAULT_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Read-ahead defaults, overridable from the environment
+READ_AHEAD_PAGES = int(os.getenv('READ_AHEAD_PAGES', '2'))
+READ_AHEAD_WORKERS = int(os.getenv('READ_AHEAD_WORKERS', '1'))
+READ_AHEAD_MAX_PER_USER = int(os.getenv('READ_AHEAD_MAX_PER_USER', '4'))
+# Readers whose position is remembered; the least recently active are forgotten first
+READ_AHEAD_MAX_READERS = int(os.getenv('READ_AHEAD_MAX_READERS', '10000'))
+READ_AHEAD_TRANSLATE = os.getenv('READ_AHEAD_TRANSLATE', '0') == '1'
+
+# Background threads run at this nice value so they never compete with live requests
+READ_AHEAD_NICE = 10
+
+# fn(book_id, page_number) -> True if it filled a cache, False if the page was already there
+Warmer = Callable[[int, int], bool]
+
+
+def _lower_thread_priority():
+    """Lower the scheduling priority of the current worker thread where the OS allows it"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), READ_AHEAD_NICE)
+    except (AttributeError, OSError):
+        pass
+
+
+class ReadAheadScheduler:
+    """Warm caches for the next pages while a reader is on page N.
+
+    Each reader gets at most ``max_per_user`` queued pages. Jumping to a page outside
+    the current read-ahead window (or to another book) cancels that reader's queued
+    work. Every prefetched (kind, book, page, page size) is remembered so later
+    requests can be counted as hits, which is what the ``hit_rate`` metric reports:
+    of the pages a warmer actually filled, the share a reader then asked for. Pages
+    that were already cached count as ``already_cached`` and never as hits.
+
+    Readers are identified by a client-supplied id or address, so per-reader state
+    is bounded: queues are dropped once empty and only the last ``max_readers``
+    positions are kept. A forgotten reader just starts a new window.
+    """
+
+    def __init__(self, pages_ahead: int = READ_AHEAD_PAGES, max_workers: int = READ_AHEAD_WORKERS,
+                 max_per_user: int = READ_AHEAD_MAX_PER_USER, max_tracked: int = 1000,
+                 max_readers: int = READ_AHEAD_MAX_READERS):
+        self.pages_ahead = pages_ahead
+        self.max_per_user = max_per_user
+        self.max_tracked = max_tracked
+        self.max_readers = max_readers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='read-ahead',
+            initializer=_lower_thread_priority
+        )
+        self._lock = threading.Lock()
+        # user -> (book_id, page_number), least recently active first
+        self._positions = OrderedDict()
+        # user -> {(book_id, page, page_size): future}
+        self._pending: Dict[str, Dict[Tuple[int, int, int], object]] = {}
+        # (kind, book_id, page, page_size) -> True if warmed here, False if it was already cached
+        self._prefetched = OrderedDict()
+        self._metrics = {
+            'scheduled': 0,
+            'completed': 0,
+            'cancelled': 0,
+            'failed': 0,
+            'warmed': 0,
+            'already_cached': 0,
+            'used': 0
+        }
+        self._last_error: Optional[str] = None
+
+    def schedule(self, user_id: str, book_id: int, page_number: int, total_pages: Optional[int],
+                 warmers: Dict[str, Warmer], page_size: int = DEFAULT_PAGE_SIZE):
+        """Queue the pages after page_number for background warming.
+
+        Args:
+            user_id: Identifier of the reader (used for the per-user cap)
+            book_id: Book being read
+            page_number: Page the reader is on now
+            total_pages: Last valid page number, or None if the warmers skip missing pages
+            warmers: Mapping of kind ('audio', 'translation') to fn(book_id, page_number),
+                returning whether it did any work
+            page_size: Page size the warmers cut pages at
+        """
+        if self.pages_ahead <= 0 or not warmers:
+            return
+
+        with self._lock:
+            previous = self._positions.get(user_id)
+            if previous and not self._in_window(previous, book_id, page_number):
+                self._cancel_locked(user_id)
+            self._positions[user_id] = (book_id, page_number)
+            self._positions.move_to_end(user_id)
+            while len(self._positions) > self.max_readers:
+                self._positions.popitem(last=False)
+
+            pending = self._pending.get(user_id, {})
+            last_page = page_number + self.pages_ahead
+            if total_pages is not None:
+                last_page = min(total_pages, last_page)
+            for target in range(page_number + 1, last_page + 1):
+                key = (book_id, target, page_size)
+                if key in pending or self._is_queued_elsewhere(key):
+                    continue
+                kinds = {kind: fn for kind, fn in warmers.items()
+                         if (kind,) + key not in self._prefetched}
+                if not kinds:
+                    continue
+                if len(pending) >= self.max_per_user:
+                    break
+                future = self._executor.submit(self._run, user_id, key, kinds)
+                pending[key] = future
+                self._metrics['scheduled'] += 1
+            # Kept only while something is queued; jobs remove themselves under the same lock
+            if pending:
+                self._pending[user_id] = pending
+
+    def _in_window(self, previous: Tuple[int, int], book_id: int, page_number: int) -> bool:
+        prev_book, prev_page = previous
+        return prev_book == book_id and prev_page <= page_number <= prev_page + self.pages_ahead
+
+    def _is_queued_elsewhere(self, key: Tuple[int, int, int]) -> bool:
+        return any(key in pending for pending in self._pending.values())
+
+    def cancel(self, user_id: str):
+        """Drop all queued (not yet started) work for a reader"""
+        with self._lock:
+            self._cancel_locked(user_id)
+
+    def _cancel_locked(self, user_id: str):
+        for future in self._pending.pop(user_id, {}).values():
+            if future.cancel():
+                self._metrics['cancelled'] += 1
+
+    def _run(self, user_id: str, key: Tuple[int, int, int], warmers: Dict[str, Warmer]):
+        book_id, page_number, _ = key
+        try:
+            for kind, warm in warmers.items():
+                try:
+                    warmed = bool(warm(book_id, page_number))
+                except Exception as e:
+                    logger.warning("Read-ahead %s failed for book %s page %s", kind, book_id, page_number,
+                                   exc_info=True)
+                    with self._lock:
+                        self._metrics['failed'] += 1
+                        self._last_error = f"{kind} book {book_id} page {page_number}: {e}"
+                    continue
+                with self._lock:
+                    self._remember_locked((kind,) + key, warmed)
+            with self._lock:
+                self._metrics['completed'] += 1
+        finally:
+            with self._lock:
+                pending = self._pending.get(user_id)
+                if pending is not None:
+                    pending.pop(key, None)
+                    if not pending:
+                        del self._pending[user_id]
+
+    def _remember_locked(self, entry: Tuple[str, int, int, int], warmed: bool):
+        # Already cached pages are remembered too, so they are not scheduled again
+        self._prefetched[entry] = warmed
+        self._prefetched.move_to_end(entry)
+        self._metrics['warmed' if warmed else 'already_cached'] += 1
+        while len(self._prefetched) > self.max_tracked:
+            self._prefetched.popitem(last=False)
+
+    def record_request(self, kind: str, book_id: int, page_number: int,
+                       page_size: int = DEFAULT_PAGE_SIZE) -> bool:
+        """Note a foreground request; returns True if it was served by a prefetch"""
+        with self._lock:
+            if self._prefetched.pop((kind, book_id, page_number, page_size), False):
+                self._metrics['used'] += 1
+                return True
+            return False
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['queued'] = sum(len(p) for p in self._pending.values())
+            metrics['readers'] = len(self._positions)
+            metrics['last_error'] = self._last_error
+        warmed = metrics['warmed']
+        metrics['hit_rate'] = round(metrics['used'] / warmed, 3) if warmed else 0.0
+        return metrics
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
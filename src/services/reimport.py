@@ -0,0 +1,95 @@
+import io
+import os
+import zipfile
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from ..database.book_db import BookDatabase
+from .chapters import ChapterDetector
+from .epub_importer import EPUBImporter, read_package
+from .pagination import iter_text_pages
+from .pdf_importer import PDFImporter
+from .txt_importer import SNIFF_SIZE, TXTImporter, detect_encoding, iter_decode_buffer, mapped_file
+import fitz  # PyMuPDF for better PDF handling
+
+# A file path, or the file's bytes (an upload that stayed in memory)
+EditionSource = Union[str, bytes]
+
+
+class BookReimporter:
+    """Replaces a book's text with a corrected edition in place.
+
+    The new file is cut into pages the way its importer would store them and
+    BookDatabase.sync_book_pages rewrites only the pages whose content hash changed.
+    The book keeps its ID, bookmarks and the translations of unchanged pages; the
+    caller drops cached audio for the page texts that are gone (stale_contents).
+    """
+
+    def __init__(self, db: BookDatabase, pdf_importer: Optional[PDFImporter] = None,
+                 txt_importer: Optional[TXTImporter] = None, epub_importer: Optional[EPUBImporter] = None):
+        """Initialize the re-import service"""
+        self.db = db
+        self.pdf_importer = pdf_importer or PDFImporter(db)
+        self.txt_importer = txt_importer or TXTImporter(db)
+        self.epub_importer = epub_importer or EPUBImporter(db)
+
+    def reimport(self, source: EditionSource, filename: str, book_id: Optional[int] = None,
+                 isbn: Optional[str] = None) -> Dict:
+        """Re-import a book, found by ID or else by ISBN, from a new PDF, TXT or EPUB file"""
+        try:
+            if book_id is None and isbn:
+                book_id = self.db.find_book_by_isbn(isbn)
+            if book_id is None or not self.db.get_book_version(book_id):
+                return {
+                    'status': 'error',
+                    'error': 'Book not found'
+                }
+
+            with self._edition(source, filename) as (pages, chapters):
+                result = self.db.sync_book_pages(book_id, pages)
+                self.db.save_chapters(book_id, chapters())
+
+            result.update({'book_id': book_id, 'status': 'success'})
+            return result
+
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    @contextmanager
+    def _edition(self, source: EditionSource,
+                 filename: str) -> Iterator[Tuple[Iterator[Dict], Callable[[], List[Dict]]]]:
+        """Pages of a file as its importer stores them, and a function giving its chapters
+        once the pages have been consumed"""
+        extension = os.path.splitext(filename)[1].lower()
+
+        if extension == '.epub':
+            with zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source)) as archive:
+                chapters = []
+                spine = read_package(archive)['spine']
+                yield self.epub_importer.iter_pages(self.epub_importer.iter_chapters(archive, spine), chapters), \
+                    lambda: chapters
+            return
+
+        detector = ChapterDetector()
+        if extension == '.pdf':
+            doc = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype='pdf')
+            try:
+                yield detector.feed_pages(self.pdf_importer.iter_clean_pages(doc, source)), detector.page_chapters
+            finally:
+                doc.close()
+        elif extension == '.txt':
+            with (mapped_file(source) if isinstance(source, str) else nullcontext(source)) as buffer:
+                encoding = detect_encoding(bytes(buffer[:SNIFF_SIZE]))
+                if encoding is None:
+                    raise ValueError('Could not read file with any supported encoding')
+                blocks = iter_decode_buffer(buffer, encoding)
+                try:
+                    cleaned = self.txt_importer.normalizer.iter_normalize(blocks)
+                    yield detector.feed_pages(iter_text_pages(cleaned)), detector.page_chapters
+                finally:
+                    blocks.close()
+        else:
+            raise ValueError(f'Unsupported file type: {extension or filename}')
+
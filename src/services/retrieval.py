@@ -0,0 +1,86 @@
+import json
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+# Passages pulled into a question's context, and the token budget they share
+RETRIEVAL_TOP_K = 4
+CONTEXT_TOKEN_BUDGET = 1500
+
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Arabic code points that Persian text often uses interchangeably with the Persian ones
+_PERSIAN_FOLD = str.maketrans({'ي': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'أ': 'ا', 'إ': 'ا', '‌': ' '})
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in is it its of on or she that the their
+them they this to was were what when where which who why with you your
+از با به برای که این آن را در و یا تا هم می ها های است بود شد شود کرد کند یک هر اما اگر چه
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with Arabic/Persian letter variants folded and stopwords dropped"""
+    tokens = _TOKEN_PATTERN.findall(text.translate(_PERSIAN_FOLD).lower())
+    return [token for token in tokens if len(token) > 1 and token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a book's passages (one passage per page).
+
+    Only passage lengths and postings are kept; passage text stays in the book row
+    and is read back by offset for the few passages a query actually uses.
+    """
+
+    def __init__(self, doc_lengths: List[int], postings: Dict[str, List[int]], k1: float = 1.5, b: float = 0.75):
+        self.doc_lengths = doc_lengths
+        # term -> flat [doc, tf, doc, tf, ...]
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+    @classmethod
+    def build(cls, passages: Iterable[str]) -> 'BM25Index':
+        doc_lengths = []
+        postings: Dict[str, List[int]] = {}
+        for doc, passage in enumerate(passages):
+            counts = Counter(tokenize(passage))
+            doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).extend((doc, tf))
+        return cls(doc_lengths, postings)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> List[Tuple[int, float]]:
+        """Top-k (passage number, score) for a query, best first"""
+        total = len(self.doc_lengths)
+        if not total:
+            return []
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            df = len(posting) // 2
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for i in range(0, len(posting), 2):
+                doc, tf = posting[i], posting[i + 1]
+                norm = 1 - self.b + self.b * self.doc_lengths[doc] / self.avg_length if self.avg_length else 1
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def to_bytes(self) -> bytes:
+        payload = {'lengths': self.doc_lengths, 'postings': self.postings}
+        return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'BM25Index':
+        payload = json.loads(zlib.decompress(data).decode('utf-8'))
+        return cls(payload['lengths'], payload['postings'])
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    """One in-flight computation that any number of callers can wait on"""
+
+    def __init__(self, future: Optional[asyncio.Future] = None):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        # Set when the leader is a coroutine; followers on its loop await this
+        self.future = future
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one.
+
+    The first caller for a key (the leader) runs the computation; callers arriving
+    while it is still running wait for it and get the same result or exception. Once
+    the call finishes the key is forgotten, so results are never cached here: that is
+    the job of the cache in front of it.
+
+    Thread callers use ``do``; coroutines on the event loop use ``ado``. Both share one
+    key space, so a request on the loop joins a read-ahead warmer running in a thread
+    and the other way round. Both count towards the same metrics, where ``coalesced``
+    is the number of upstream calls saved.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._metrics = {
+            'calls': 0,
+            'executed': 0,
+            'coalesced': 0
+        }
+
+    def join(self, key: str) -> Tuple[_Call, bool]:
+        """Register interest in key; returns (call, is_leader).
+
+        A leader must call ``finish`` exactly once. Followers call ``call.wait()``,
+        which also works when the leader is a coroutine.
+        """
+        with self._lock:
+            self._metrics['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._metrics['coalesced'] += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self._metrics['executed'] += 1
+            return call, True
+
+    def finish(self, key: str, result=None, error: BaseException = None):
+        """Publish the leader's outcome to every follower and release the key"""
+        with self._lock:
+            call = self._calls.pop(key)
+        call.result = result
+        call.error = error
+        call.done.set()
+        # Coroutine leaders finish on their own loop, so the future is set directly
+        if call.future is not None:
+            if error is not None:
+                call.future.set_exception(error)
+            else:
+                call.future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any]):
+        """Run fn once for all concurrent callers of key and return its result"""
+        call, leader = self.join(key)
+        if not leader:
+            return call.wait()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result=result)
+        return result
+
+    def ajoin(self, key: str) -> Tuple[asyncio.Future, bool]:
+        """Async variant of join; followers await the returned future"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._metrics['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._metrics['coalesced'] += 1
+            else:
+                future = loop.create_future()
+                # Mark the outcome as retrieved even when nobody ended up waiting for it
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                self._calls[key] = _Call(future)
+                self._metrics['executed'] += 1
+                return future, True
+
+        if call.future is not None and call.future.get_loop() is loop:
+            return call.future, False
+        # Led by a thread (e.g. a read-ahead warmer): wait for it without blocking the loop
+        return loop.run_in_executor(None, call.wait), False
+
+    def afinish(self, key: str, result=None, error: BaseException = None):
+        """Async variant of finish, called on the leader's event loop"""
+        self.finish(key, result=result, error=error)
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]):
+        """Async variant of do; fn is a coroutine function.
+
+        The computation runs as its own task, so a leader whose request is cancelled
+        does not take the followers' result down with it.
+        """
+        future, leader = self.ajoin(key)
+        if leader:
+            task = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: self._settle(key, t))
+        return await asyncio.shield(future)
+
+    def _settle(self, key: str, task: asyncio.Task):
+        if task.cancelled():
+            self.afinish(key, error=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self.afinish(key, error=task.exception())
+        else:
+            self.afinish(key, result=task.result())
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def metrics(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['in_flight'] = len(self._calls)
+        return metrics
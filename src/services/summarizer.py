@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional
+
+from .llm_cache import LLMCache
+from .pagination import BoundaryIndex
+
+# Text sent to the model in one call: about 4k tokens, well inside the context window
+SUMMARY_CHUNK_CHARS = int(os.getenv('SUMMARY_CHUNK_CHARS', '16000'))
+SUMMARY_WORKERS = int(os.getenv('SUMMARY_WORKERS', '4'))
+SUMMARY_MAX_TOKENS = 400
+# Bump when the map/reduce prompts change so stored partial summaries are regenerated
+SUMMARY_VERSION = 1
+
+MAP_PROMPT = ("You are a helpful book assistant. Summarize this part of a book in a few paragraphs. "
+              "Keep the names of characters and places, key events and recurring themes.")
+REDUCE_PROMPT = ("You are a helpful book assistant. The following are summaries of consecutive parts "
+                 "of a book. Combine them into one summary in a few paragraphs, keeping names, key "
+                 "events and recurring themes.")
+
+
+class HierarchicalSummarizer:
+    """Map-reduce summarization for texts of any length.
+
+    Text that fits in one call is sent as is. Longer text is cut into chunks on
+    paragraph/sentence boundaries and summarized in parallel; the partial summaries are
+    then combined level by level until they fit in one final call. Every partial
+    summary is stored by the hash of its input, so re-running over the same book (or a
+    book sharing chapters) only pays for the parts that changed.
+
+    The a* methods do the same with ``acreate`` (an AsyncOpenAI create method) for the
+    ASGI app, running at most ``workers`` calls at a time.
+    """
+
+    def __init__(self, create: Callable[..., Any], llm_cache: LLMCache, store, model: str = "gpt-4",
+                 chunk_chars: int = SUMMARY_CHUNK_CHARS, workers: int = SUMMARY_WORKERS,
+                 acreate: Optional[Callable[..., Awaitable[Any]]] = None):
+        self.create = create
+        self.acreate = acreate
+        self.llm_cache = llm_cache
+        self.store = store  # BookDatabase: get_text_summary / save_text_summary
+        self.model = model
+        self.chunk_chars = chunk_chars
+        self.workers = workers
+
+    def _call(self, instruction: str, text: str, max_tokens: int,
+              site: str = 'summary', temperature: float = 0.3) -> str:
+        return self.llm_cache.complete(
+            self.create,
+            site=site,
+            model=self.model,
+            messages=[
+                {"role": "system", "content": instruction},
+                {"role": "user", "content": text}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+
+    async def _acall(self, instruction: str, text: str, max_tokens: int,
+                     site: str = 'summary', temperature: float = 0.3) -> str:
+        return await self.llm_cache.acomplete(
+            self.acreate,
+            site=site,
+            model=self.model,
+            messages=[
+                {"role": "system", "content": instruction},
+                {"role": "user", "content": text}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+
+    @staticmethod
+    def _part_key(level: int, text: str) -> str:
+        return hashlib.sha256(f"{SUMMARY_VERSION}\n{level}\n{text}".encode('utf-8')).hexdigest()
+
+    def _summarize_part(self, level: int, text: str) -> str:
+        """Summarize one chunk (level 1) or one group of summaries (level > 1), reusing stored results"""
+        key = self._part_key(level, text)
+        summary = self.store.get_text_summary(key)
+        if summary is None:
+            summary = self._call(MAP_PROMPT if level == 1 else REDUCE_PROMPT, text, SUMMARY_MAX_TOKENS)
+            self.store.save_text_summary(key, level, summary)
+        return summary
+
+    async def _asummarize_part(self, level: int, text: str) -> str:
+        """Async variant of _summarize_part"""
+        key = self._part_key(level, text)
+        summary = await asyncio.to_thread(self.store.get_text_summary, key)
+        if summary is None:
+            summary = await self._acall(MAP_PROMPT if level == 1 else REDUCE_PROMPT, text, SUMMARY_MAX_TOKENS)
+            await asyncio.to_thread(self.store.save_text_summary, key, level, summary)
+        return summary
+
+    def split(self, text: str) -> List[str]:
+        """Cut text into chunks of about chunk_chars, on paragraph or sentence boundaries"""
+        index = BoundaryIndex.build(text)
+        return [text[start:end] for start, end in
+                (index.page_bounds(n, self.chunk_chars) for n in range(1, index.total_pages(self.chunk_chars) + 1))]
+
+    def _group(self, summaries: List[str]) -> List[str]:
+        """Pack consecutive summaries into groups that each fit in one call"""
+        groups, current = [], []
+        for summary in summaries:
+            if current and sum(len(s) for s in current) + len(summary) > self.chunk_chars:
+                groups.append("\n\n".join(current))
+                current = []
+            current.append(summary)
+        if current:
+            groups.append("\n\n".join(current))
+        return groups
+
+    def reduce(self, text: str) -> str:
+        """Condense text until it fits in a single call; short text is returned unchanged"""
+        if len(text) <= self.chunk_chars:
+            return text
+
+        parts = self.split(text)
+        level = 1
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='summarize') as executor:
+            while True:
+                parts = list(executor.map(lambda part, level=level: self._summarize_part(level, part), parts))
+                combined = "\n\n".join(parts)
+                if len(combined) <= self.chunk_chars or len(parts) == 1:
+                    return combined
+                parts = self._group(parts)
+                level += 1
+
+    async def areduce(self, text: str) -> str:
+        """Async variant of reduce"""
+        if len(text) <= self.chunk_chars:
+            return text
+
+        parts = await asyncio.to_thread(self.split, text)
+        level = 1
+        slots = asyncio.Semaphore(self.workers)
+
+        async def summarize_part(level: int, part: str) -> str:
+            async with slots:
+                return await self._asummarize_part(level, part)
+
+        while True:
+            parts = await asyncio.gather(*(summarize_part(level, part) for part in parts))
+            combined = "\n\n".join(parts)
+            if len(combined) <= self.chunk_chars or len(parts) == 1:
+                return combined
+            parts = self._group(parts)
+            level += 1
+
+    @staticmethod
+    def _final_prompt(text: str, reduced: str, label: str) -> str:
+        if reduced is text:
+            return f"{label.capitalize()} content: {text}"
+        return f"Summaries of consecutive parts of the {label}: {reduced}"
+
+    def summarize(self, text: str, instruction: str, label: str = "book", max_tokens: int = 300,
+                  site: str = 'summary', temperature: float = 0.3) -> str:
+        """Answer instruction over text of any length (summary, theme analysis, ...).
+
+        label names what the text is ("chapter", "book") in the final prompt.
+        """
+        prompt = self._final_prompt(text, self.reduce(text), label)
+        return self._call(instruction, prompt, max_tokens, site, temperature)
+
+    async def asummarize(self, text: str, instruction: str, label: str = "book", max_tokens: int = 300,
+                         site: str = 'summary', temperature: float = 0.3) -> str:
+        """Async variant of summarize"""
+        prompt = self._final_prompt(text, await self.areduce(text), label)
+        return await self._acall(instruction, prompt, max_tokens, site, temperature)
@@ -0,0 +1,98 @@
+import re
+from typing import Iterable, Iterator
+
+# Arabic-Indic digits (common in OCR output) to ASCII
+_DIGITS = {0x0660 + value: str(value) for value in range(10)}
+
+# Arabic code points used in place of the Persian letters
+_ARABIC_LETTERS = {ord('\u064a'): '\u06cc', ord('\u0643'): '\u06a9', ord('\u0649'): '\u06cc'}
+
+# Whitespace other than space and newline, including no-break spaces (ZWNJ is left alone)
+_SPACES = {ord(char): ' ' for char in '\t\r\f\v\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005'
+                                      '\u2006\u2007\u2008\u2009\u200a\u202f\u205f\u3000'}
+# Byte order marks carry no text
+_DELETE = {ord(char): None for char in '\x00\ufeff'}
+
+# \x00 is deleted by the folding step, so it is free to mark paragraph breaks
+_PARAGRAPH_MARK = '\x00'
+_BLANK_LINES = re.compile(r' *\n[ \n]*\n *')
+_SPACE_RUNS = re.compile(r' {2,}')
+# What the importers used to keep when stripping punctuation
+_NOT_WORD = re.compile(r'[^\w\s\u0600-\u06FF\uFB8A\u067E\u0686\u06AF]')
+
+
+class TextNormalizer:
+    """Cleans imported text in a few linear passes with precompiled patterns.
+
+    - fold_digits: Arabic-Indic digits become ASCII digits
+    - fold_letters: Arabic yeh/kaf become their Persian forms
+    - keep_punctuation: keep punctuation (sentence ends, quotes, ZWNJ); when False,
+      everything but word characters and Persian letters is removed as before
+    - keep_paragraphs: blank lines stay as paragraph breaks ("\\n\\n") and single line
+      breaks become spaces; when False all whitespace collapses to single spaces
+
+    normalize() cleans a whole text; iter_normalize() cleans a stream of pieces (read
+    blocks or PDF pages) and gives the same result joined.
+    """
+
+    def __init__(self, fold_digits: bool = True, fold_letters: bool = True,
+                 keep_punctuation: bool = True, keep_paragraphs: bool = True):
+        self.keep_punctuation = keep_punctuation
+        self.keep_paragraphs = keep_paragraphs
+        table = dict(_SPACES)
+        table.update(_DELETE)
+        if fold_digits:
+            table.update(_DIGITS)
+        if fold_letters:
+            table.update(_ARABIC_LETTERS)
+        if not keep_paragraphs:
+            table[ord('\n')] = ' '
+        # Applied with str.replace, skipping characters the text does not contain: on
+        # non-ASCII text that is several times faster than str.translate, which looks
+        # up every character
+        self._folds = [(chr(code), replacement or '') for code, replacement in table.items()]
+
+    def _fold(self, text: str) -> str:
+        for char, replacement in self._folds:
+            if char in text:
+                text = text.replace(char, replacement)
+        return text
+
+    def _clean(self, text: str) -> str:
+        """Fold characters and drop punctuation; both work character by character"""
+        text = self._fold(text)
+        if not self.keep_punctuation:
+            text = _NOT_WORD.sub('', text)
+        return text
+
+    def _collapse(self, text: str) -> str:
+        """Collapse whitespace runs of cleaned text without trimming the ends"""
+        if self.keep_paragraphs:
+            text = _BLANK_LINES.sub(_PARAGRAPH_MARK, text).replace('\n', ' ')
+            text = _SPACE_RUNS.sub(' ', text).replace(' ' + _PARAGRAPH_MARK, _PARAGRAPH_MARK)
+            return text.replace(_PARAGRAPH_MARK + ' ', _PARAGRAPH_MARK).replace(_PARAGRAPH_MARK, '\n\n')
+        return _SPACE_RUNS.sub(' ', text)
+
+    def normalize(self, text: str) -> str:
+        """Clean a whole text (or one page)"""
+        return self._collapse(self._clean(text)).strip()
+
+    def iter_normalize(self, pieces: Iterable[str]) -> Iterator[str]:
+        """Clean text arriving in pieces; whitespace at a piece boundary is carried over
+        so runs of it are collapsed as if the text were whole.
+
+        The boundary is found after cleaning: a piece ending in punctuation that is
+        removed, or in a byte order mark, may still end in whitespace.
+        """
+        carry = ''
+        started = False
+        for piece in pieces:
+            text = carry + self._clean(piece)
+            head = text.rstrip()
+            carry = text[len(head):]
+            if not head:
+                continue
+            if not started:
+                head = head.lstrip()
+                started = True
+            yield self._collapse(head)
@@ -1,8 +1,19 @@
 import os
-from typing import List, Dict, Optional
-import openai
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Union
+from openai import OpenAI
 from dotenv import load_dotenv
 import json
+from .llm_cache import get_llm_cache
+from .pagination import find_break
+from .tokenizer import MAX_CHARS_PER_TOKEN, fit_tokens, input_token_budget
+
+# Characters pulled from a file or database cursor at a time while chunking
+READ_BLOCK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'\s')
+
+TextSource = Union[str, TextIO, Iterable[str]]
 
 load_dotenv()
 
@@ -10,30 +21,87 @@ class TextProcessor:
     def __init__(self):
         self.chunk_size = 1000  # characters per chunk
         self.overlap = 100  # overlap between chunks
-        openai.api_key = os.getenv("OPENAI_API_KEY")
+        self.model = "gpt-3.5-turbo"
+        # Source tokens per translation request, leaving room for the (longer) Persian reply
+        self.max_tokens = input_token_budget(self.model, 4096, expansion=2.2)
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.llm_cache = get_llm_cache()
 
-    def chunk_text(self, text: str) -> List[Dict[str, str]]:
-        """Split text into overlapping chunks."""
-        try:
-            chunks = []
-            start = 0
-            text_length = len(text)
+    def _iter_pieces(self, source: TextSource, block_size: int) -> Iterator[str]:
+        """Text of a source in pieces: a string, a text file, or any iterable of strings (e.g. a DB cursor)"""
+        if isinstance(source, str):
+            yield source
+        elif hasattr(source, 'read'):
+            while True:
+                block = source.read(block_size)
+                if not block:
+                    return
+                yield block
+        else:
+            for piece in source:
+                yield piece if isinstance(piece, str) else piece[0]
+
+    def iter_chunks(self, source: TextSource, chunk_size: Optional[int] = None,
+                    overlap: Optional[int] = None, block_size: int = READ_BLOCK_SIZE,
+                    max_tokens: Optional[int] = None, model: Optional[str] = None) -> Iterator[Dict]:
+        """Lazily split text into overlapping chunks that end on sentence boundaries.
+
+        Only about one chunk plus one read block is held in memory, whatever the size of
+        the source. Each chunk is a dict with its text and its start/end offsets in the
+        whole text; consecutive chunks share about ``overlap`` characters, starting on a
+        word boundary.
 
-            while start < text_length:
-                end = start + self.chunk_size
-                if end > text_length:
-                    end = text_length
+        With ``max_tokens``, chunks are packed up to that many tokens for ``model``
+        instead of a fixed number of characters, so dense Persian text and sparse
+        English text both fill a request.
+        """
+        if max_tokens:
+            chunk_size = max_tokens * MAX_CHARS_PER_TOKEN
+        chunk_size = chunk_size or self.chunk_size
+        overlap = self.overlap if overlap is None else overlap
 
-                chunk = text[start:end]
-                chunks.append({
-                    "text": chunk,
-                    "start": start,
-                    "end": end
-                })
+        pieces = self._iter_pieces(source, block_size)
+        buffer = ""
+        buffer_start = 0  # offset of buffer[0] in the whole text
+        exhausted = False
 
-                start = end - self.overlap
+        while True:
+            while not exhausted and len(buffer) <= chunk_size:
+                piece = next(pieces, None)
+                if piece is None:
+                    exhausted = True
+                else:
+                    buffer += piece
+            if not buffer:
+                return
 
-            return chunks
+            limit = max(1, fit_tokens(buffer[:chunk_size], max_tokens, model)) if max_tokens else chunk_size
+            if exhausted and len(buffer) <= limit:
+                end = len(buffer)
+            else:
+                end = find_break(buffer, limit - max(1, limit // 4), limit)
+
+            yield {
+                "text": buffer[:end],
+                "start": buffer_start,
+                "end": buffer_start + end
+            }
+
+            if exhausted and end == len(buffer):
+                return
+
+            next_start = end
+            if overlap:
+                next_start = end - min(overlap, limit // 2)
+                match = _WHITESPACE.search(buffer, next_start, end)
+                next_start = match.end() if match else end
+            buffer = buffer[next_start:]
+            buffer_start += next_start
+
+    def chunk_text(self, text: str) -> List[Dict[str, str]]:
+        """Split text into overlapping chunks."""
+        try:
+            return list(self.iter_chunks(text))
         except Exception as e:
             print(f"Error in chunk_text: {str(e)}")
             raise
@@ -41,35 +109,39 @@ class TextProcessor:
     def translate_to_farsi(self, text: str) -> str:
         """Translate text to Farsi using OpenAI API."""
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
+            translated_text = self.llm_cache.complete(
+                self.client.chat.completions.create,
+                site='translation',
+                model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a professional translator. Translate the following text to Farsi. Maintain the original meaning and tone."},
                     {"role": "user", "content": text}
                 ],
                 temperature=0.3
             )
-            return response.choices[0].message.content.strip()
+            return translated_text.strip()
         except Exception as e:
             print(f"Translation error: {str(e)}")
             return text  # Return original text if translation fails
 
+    def iter_process_book(self, source: TextSource) -> Iterator[Dict[str, str]]:
+        """Translate a book chunk by chunk; only the current chunk and its translation are in memory.
+
+        Chunks are sized by tokens rather than characters, so each request is as large as
+        the model's reply allows.
+        """
+        for chunk in self.iter_chunks(source, max_tokens=self.max_tokens, model=self.model):
+            yield {
+                "original_text": chunk["text"],
+                "translated_text": self.translate_to_farsi(chunk["text"]),
+                "start": chunk["start"],
+                "end": chunk["end"]
+            }
+
     def process_book(self, text: str) -> List[Dict[str, str]]:
         """Process book text into chunks and translate to Farsi."""
         try:
-            chunks = self.chunk_text(text)
-            processed_chunks = []
-
-            for chunk in chunks:
-                translated_text = self.translate_to_farsi(chunk["text"])
-                processed_chunks.append({
-                    "original_text": chunk["text"],
-                    "translated_text": translated_text,
-                    "start": chunk["start"],
-                    "end": chunk["end"]
-                })
-
-            return processed_chunks
+            return list(self.iter_process_book(text))
         except Exception as e:
             print(f"Error in process_book: {str(e)}")
             raise
@@ -0,0 +1,80 @@
+import re
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional, token counts are then estimated from characters
+    tiktoken = None
+
+# Character-based estimate used without tiktoken. Persian/Arabic script costs far more
+# tokens per character than Latin text with the OpenAI BPE vocabularies.
+LATIN_CHARS_PER_TOKEN = 4.0
+ARABIC_CHARS_PER_TOKEN = 1.7
+_ARABIC_SCRIPT = re.compile('[؀-ۿݐ-ݿﭐ-﷿ﹰ-﻿]')
+
+# Upper bound on characters per token, used to size read-ahead buffers
+MAX_CHARS_PER_TOKEN = 6
+
+DEFAULT_ENCODING = 'cl100k_base'
+
+# Context window per model, in tokens (prompt and completion together)
+MODEL_CONTEXT_TOKENS = {
+    'gpt-3.5-turbo': 16385,
+    'gpt-4': 8192,
+    'gpt-4-turbo': 128000,
+    'gpt-4o': 128000,
+    'gpt-4o-mini': 128000,
+}
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: Optional[str]):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(DEFAULT_ENCODING)
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count estimated from the script mix, for when no tokenizer is available"""
+    arabic = len(_ARABIC_SCRIPT.findall(text))
+    return int(arabic / ARABIC_CHARS_PER_TOKEN + (len(text) - arabic) / LATIN_CHARS_PER_TOKEN) + 1
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens text takes for model, exact with tiktoken and estimated otherwise"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def fit_tokens(text: str, budget: int, model: Optional[str] = None, precision: int = 32) -> int:
+    """Largest prefix length of text (within precision characters) that fits in budget tokens"""
+    if count_tokens(text, model) <= budget:
+        return len(text)
+    low, high = 0, min(len(text), budget * MAX_CHARS_PER_TOKEN)
+    while high - low > precision:
+        middle = (low + high) // 2
+        if count_tokens(text[:middle], model) <= budget:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def input_token_budget(model: str, max_output_tokens: int, expansion: float = 1.0,
+                       prompt_tokens: int = 200) -> int:
+    """Input tokens per request so that the reply fits in max_output_tokens.
+
+    expansion is the expected ratio of output to input tokens (e.g. translating
+    English into Persian roughly doubles the token count).
+    """
+    budget = int(max_output_tokens / expansion)
+    context = MODEL_CONTEXT_TOKENS.get(model)
+    if context:
+        budget = min(budget, context - max_output_tokens - prompt_tokens)
+    return max(budget, 1)
@@ -1,52 +1,238 @@
 import os
-from openai import OpenAI
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional
+from openai import OpenAI, AsyncOpenAI
+
+from .llm_cache import get_llm_cache
+from .single_flight import SingleFlight
+from .tokenizer import count_tokens, input_token_budget
+
+MAX_TRANSLATION_TOKENS = 2000
+# Persian output takes about twice the tokens of the English it translates
+TRANSLATION_EXPANSION = 2.2
+
+PAGE_MARKER = "[[PAGE {}]]"
+_PAGE_MARKER = re.compile(r'\[\[PAGE (\d+)\]\]')
 
 class TranslationService:
     def __init__(self):
         self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self._async_client = None
         self.model = "gpt-4-turbo"  # Using GPT-4 for better translation quality
+        self.cache_size = 256  # Translated texts kept in memory
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._flights = SingleFlight()  # concurrent misses for the same text share one API call
+        self.llm_cache = get_llm_cache()  # translations survive restarts and are shared with other services
+        self.max_tokens = MAX_TRANSLATION_TOKENS
+        # Source tokens per request, so the translation is not cut off at max_tokens
+        self.batch_tokens = input_token_budget(self.model, self.max_tokens, TRANSLATION_EXPANSION)
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Async client, created on first use by the ASGI app"""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        return self._async_client
+
+    def cache_key(self, text: str, book_title: str = None) -> str:
+        """Key identifying a translation of text in the context of a book"""
+        payload = json.dumps([self.model, text, book_title], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _get_cached(self, key: str):
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _store_cached(self, key: str, translated_text: str):
+        with self._cache_lock:
+            self._cache[key] = translated_text
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def is_cached(self, text: str, book_title: str = None) -> bool:
+        """Whether translate_cached would answer text without calling the model"""
+        return self._get_cached(self.cache_key(text, book_title)) is not None
+
+    def translate_cached(self, text: str, book_title: str = None) -> str:
+        """Translate text, reusing an earlier translation of the same text if we have one"""
+        key = self.cache_key(text, book_title)
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
+
+        def translate():
+            cached = self._get_cached(key)
+            if cached is not None:
+                return cached
+            translated_text = self.translate_to_farsi(text, book_title=book_title)
+            self._store_cached(key, translated_text)
+            return translated_text
+
+        return self._flights.do(key, translate)
+
+    async def atranslate_cached(self, text: str, book_title: str = None) -> str:
+        """Async variant of translate_cached, sharing the same cache"""
+        key = self.cache_key(text, book_title)
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
+
+        async def translate():
+            cached = self._get_cached(key)
+            if cached is not None:
+                return cached
+            translated_text = await self.atranslate_to_farsi(text, book_title=book_title)
+            self._store_cached(key, translated_text)
+            return translated_text
+
+        return await self._flights.ado(key, translate)
+
+    def cache_stats(self) -> dict:
+        with self._cache_lock:
+            entries = len(self._cache)
+        return {
+            'entries': entries,
+            'max_entries': self.cache_size,
+            'coalescing': self._flights.metrics()
+        }
+
+    def _build_request(self, text: str, book_title: str = None, marked: bool = False) -> dict:
+        """Chat completion parameters for translating text"""
+        # Create system message with book context if available
+        system_message = "You are a professional translator. Translate the following text to Farsi. Maintain the original meaning and tone. Do not include any prompts or instructions in the output. Keep names, places, dates, times, numbers, measurements, and prices in English format."
+
+        if book_title:
+            system_message += f"\nThis text is from the book '{book_title}'. Please maintain consistency with the book's style and terminology."
+
+        if marked:
+            system_message += "\nThe text is made of several pages, each starting with a marker such as [[PAGE 1]]. Copy every marker unchanged on its own line, in the same order, followed by the translation of that page."
+
+        return {
+            'model': self.model,
+            'messages': [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": text}
+            ],
+            'temperature': 0.3,  # Lower temperature for more consistent translations
+            'max_tokens': self.max_tokens
+        }
+
+    def _clean_translation(self, translated_text: str) -> str:
+        """Strip prompt echoes the model sometimes prepends"""
+        translated_text = translated_text.strip()
+
+        # Clean up any remaining prompts
+        prompt_indicators = [
+            "لطفا متن را به فارسی ترجمه کنید:",
+            "لطفا متن را به فارسی ترجمه کن:",
+            "ترجمه به فارسی:",
+            "Translation to Farsi:"
+        ]
+
+        for prompt in prompt_indicators:
+            if translated_text.startswith(prompt):
+                translated_text = translated_text[len(prompt):].strip()
+
+        return translated_text
 
     def translate_to_farsi(self, text: str, book_title: str = None) -> str:
         """
         Translate the given text to Farsi using OpenAI's API
-        
+
         Args:
             text (str): The text to translate
             book_title (str, optional): The title of the book for context
         """
         try:
-            # Create system message with book context if available
-            system_message = "You are a professional translator. Translate the following text to Farsi. Maintain the original meaning and tone. Do not include any prompts or instructions in the output. Keep names, places, dates, times, numbers, measurements, and prices in English format."
-            
-            if book_title:
-                system_message += f"\nThis text is from the book '{book_title}'. Please maintain consistency with the book's style and terminology."
-
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": text}
-                ],
-                temperature=0.3,  # Lower temperature for more consistent translations
-                max_tokens=2000
+            translated_text = self.llm_cache.complete(
+                self.client.chat.completions.create, site='translation', **self._build_request(text, book_title)
             )
-            
-            translated_text = response.choices[0].message.content.strip()
-            
-            # Clean up any remaining prompts
-            prompt_indicators = [
-                "لطفا متن را به فارسی ترجمه کنید:",
-                "لطفا متن را به فارسی ترجمه کن:",
-                "ترجمه به فارسی:",
-                "Translation to Farsi:"
-            ]
-            
-            for prompt in prompt_indicators:
-                if translated_text.startswith(prompt):
-                    translated_text = translated_text[len(prompt):].strip()
-            
-            return translated_text
-            
+            return self._clean_translation(translated_text)
+
+        except Exception as e:
+            print(f"Translation error: {str(e)}")
+            raise Exception("Failed to translate text")
+
+    async def atranslate_to_farsi(self, text: str, book_title: str = None) -> str:
+        """Async variant of translate_to_farsi for the ASGI app"""
+        try:
+            translated_text = await self.llm_cache.acomplete(
+                self.async_client.chat.completions.create, site='translation', **self._build_request(text, book_title)
+            )
+            return self._clean_translation(translated_text)
+
         except Exception as e:
             print(f"Translation error: {str(e)}")
-            raise Exception("Failed to translate text") 
\ No newline at end of file
+            raise Exception("Failed to translate text")
+
+    def batch_pages(self, pages: Iterable[Dict], budget: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Group consecutive pages (dicts with 'content') into batches of at most budget tokens.
+
+        A page that alone exceeds the budget is sent on its own.
+        """
+        budget = budget or self.batch_tokens
+        batch, used = [], 0
+        for page in pages:
+            tokens = count_tokens(page['content'], self.model)
+            if batch and used + tokens > budget:
+                yield batch
+                batch, used = [], 0
+            batch.append(page)
+            used += tokens
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _join_pages(texts: List[str]) -> str:
+        return "\n\n".join(f"{PAGE_MARKER.format(n)}\n{text}" for n, text in enumerate(texts, 1))
+
+    @staticmethod
+    def _split_pages(translated_text: str, count: int) -> Optional[List[str]]:
+        """Per-page translations from a marked reply, or None if the markers did not survive"""
+        parts = _PAGE_MARKER.split(translated_text)
+        numbers = [int(n) for n in parts[1::2]]
+        if numbers != list(range(1, count + 1)):
+            return None
+        return [part.strip() for part in parts[2::2]]
+
+    def translate_pages(self, texts: List[str], book_title: str = None) -> List[str]:
+        """Translate several pages in one request, falling back to one request per page"""
+        if len(texts) == 1:
+            return [self.translate_to_farsi(texts[0], book_title=book_title)]
+        try:
+            translated_text = self.llm_cache.complete(
+                self.client.chat.completions.create, site='translation',
+                **self._build_request(self._join_pages(texts), book_title, marked=True)
+            )
+            translations = self._split_pages(translated_text, len(texts))
+        except Exception as e:
+            print(f"Batch translation error: {str(e)}")
+            translations = None
+        if translations is None:
+            return [self.translate_to_farsi(text, book_title=book_title) for text in texts]
+        return [self._clean_translation(text) for text in translations]
+
+    async def atranslate_pages(self, texts: List[str], book_title: str = None) -> List[str]:
+        """Async variant of translate_pages"""
+        if len(texts) == 1:
+            return [await self.atranslate_to_farsi(texts[0], book_title=book_title)]
+        try:
+            translated_text = await self.llm_cache.acomplete(
+                self.async_client.chat.completions.create, site='translation',
+                **self._build_request(self._join_pages(texts), book_title, marked=True)
+            )
+            translations = self._split_pages(translated_text, len(texts))
+        except Exception as e:
+            print(f"Batch translation error: {str(e)}")
+            translations = None
+        if translations is None:
+            return [await self.atranslate_to_farsi(text, book_title=book_title) for text in texts]
+        return [self._clean_translation(text) for text in translations]
@@ -1,6 +1,7 @@
 import os
-from typing import Optional
+from typing import AsyncIterator, Iterator, Optional
 import openai
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,6 +11,15 @@ class TTSService:
         openai.api_key = os.getenv("OPENAI_API_KEY")
         self.voice = "nova"  # Default voice
         self.model = "gpt-4o-mini-tts"  # Default model
+        self.speed = 1.0  # Default speaking speed
+        self._async_client = None
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Async client, created on first use by the ASGI app"""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._async_client
 
     def text_to_speech(self, text: str, voice: Optional[str] = None) -> bytes:
         """Convert text to speech using OpenAI's TTS API."""
@@ -17,13 +27,61 @@ class TTSService:
             response = openai.audio.speech.create(
                 model=self.model,
                 voice=voice or self.voice,
-                input=text
+                input=text,
+                speed=self.speed
+            )
+            return response.content
+        except Exception as e:
+            print(f"TTS error: {str(e)}")
+            raise
+
+    def stream_speech(self, text: str, voice: Optional[str] = None, chunk_size: int = 4096) -> Iterator[bytes]:
+        """Yield mp3 audio chunks as the TTS API produces them."""
+        try:
+            with openai.audio.speech.with_streaming_response.create(
+                model=self.model,
+                voice=voice or self.voice,
+                input=text,
+                speed=self.speed,
+                response_format="mp3"
+            ) as response:
+                for chunk in response.iter_bytes(chunk_size):
+                    yield chunk
+        except Exception as e:
+            print(f"TTS streaming error: {str(e)}")
+            raise
+
+    async def atext_to_speech(self, text: str, voice: Optional[str] = None) -> bytes:
+        """Async variant of text_to_speech for the ASGI app."""
+        try:
+            response = await self.async_client.audio.speech.create(
+                model=self.model,
+                voice=voice or self.voice,
+                input=text,
+                speed=self.speed
             )
             return response.content
         except Exception as e:
             print(f"TTS error: {str(e)}")
             raise
 
+    async def astream_speech(self, text: str, voice: Optional[str] = None,
+                             chunk_size: int = 4096) -> AsyncIterator[bytes]:
+        """Async variant of stream_speech for the ASGI app."""
+        try:
+            async with self.async_client.audio.speech.with_streaming_response.create(
+                model=self.model,
+                voice=voice or self.voice,
+                input=text,
+                speed=self.speed,
+                response_format="mp3"
+            ) as response:
+                async for chunk in response.iter_bytes(chunk_size):
+                    yield chunk
+        except Exception as e:
+            print(f"TTS streaming error: {str(e)}")
+            raise
+
     def save_audio(self, audio_data: bytes, filename: str) -> str:
         """Save audio data to a file."""
         try:
@@ -1,167 +1,330 @@
+import codecs
+import io
+import mmap
 import os
-from typing import Dict, Optional, List
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Union
 from ..database.book_db import BookDatabase
-import re
-import tempfile
+from .chapters import ChapterDetector, detect_chapters
+from .pagination import iter_text_pages
+from .text_normalizer import TextNormalizer
+
+# Encodings tried on the sniffed prefix, in order (files with a BOM are recognized by it)
+TXT_ENCODINGS = ['utf-8', 'cp1256', 'iso-8859-6']
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Bytes read to detect the encoding and to build the metadata preview
+SNIFF_SIZE = 64 * 1024
+# Bytes decoded at a time while importing
+READ_BLOCK_SIZE = 256 * 1024
+PREVIEW_LINES = 5
+PREVIEW_CHARS = 2000
+# From this size on, files are stored page by page instead of as one text_content string
+TXT_STREAM_MIN_BYTES = int(os.getenv('TXT_STREAM_MIN_BYTES', str(16 * 1024 * 1024)))
+
+# Anything supporting the buffer protocol: bytes, bytearray, memoryview, mmap
+TXTBuffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+def detect_encoding(sample: bytes) -> Optional[str]:
+    """Encoding of a text file judged from a prefix of it, or None if none fits.
+
+    A multi-byte character cut off at the end of the sample is not an error.
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    for encoding in TXT_ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def iter_decode(stream: BinaryIO, encoding: str, block_size: int = READ_BLOCK_SIZE) -> Iterator[str]:
+    """Decode a binary stream block by block; bytes the encoding cannot map become U+FFFD"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    while True:
+        block = stream.read(block_size)
+        text = decoder.decode(block, final=not block)
+        if text:
+            yield text
+        if not block:
+            return
+
+
+def iter_decode_buffer(buffer: TXTBuffer, encoding: str, block_size: int = READ_BLOCK_SIZE) -> Iterator[str]:
+    """Decode a buffer block by block through memoryview slices, without copying it whole"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    with memoryview(buffer) as view:
+        for start in range(0, len(view), block_size):
+            text = decoder.decode(view[start:start + block_size])
+            if text:
+                yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+@contextmanager
+def mapped_file(path: str) -> Iterator[TXTBuffer]:
+    """A file's contents as a read-only memory map (empty files, which cannot be mapped, as b'')"""
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+class TextStats:
+    """Word count and preview gathered from text seen one block at a time"""
+
+    def __init__(self):
+        self.word_count = 0
+        self._head = ''
+        self._in_word = False  # the previous block ended inside a word
+
+    def add(self, text: str):
+        words = len(text.split())
+        if words and self._in_word and not text[0].isspace():
+            words -= 1
+        self.word_count += words
+        self._in_word = not text[-1].isspace()
+        if len(self._head) < PREVIEW_CHARS:
+            self._head += text[:PREVIEW_CHARS - len(self._head)]
+
+    @property
+    def preview_lines(self):
+        return self._head.split('\n')[:PREVIEW_LINES]
+
+    def counted(self, blocks: Iterable[str]) -> Iterator[str]:
+        """Pass blocks through, counting them on the way"""
+        for block in blocks:
+            self.add(block)
+            yield block
+
 
 class TXTImporter:
-    def __init__(self, db: BookDatabase):
+    def __init__(self, db: BookDatabase, normalizer: Optional[TextNormalizer] = None,
+                 stream_min_bytes: int = TXT_STREAM_MIN_BYTES):
         """Initialize the TXT importer service"""
         self.db = db
-    
-    def import_txt(self, txt_path: str, title: Optional[str] = None, 
-                   author: Optional[str] = None, isbn: Optional[str] = None) -> Dict:
-        """Import a TXT file into the database"""
+        self.normalizer = normalizer or TextNormalizer()
+        self.stream_min_bytes = stream_min_bytes
+
+    def import_txt(self, txt_path: str, title: Optional[str] = None,
+                   author: Optional[str] = None, isbn: Optional[str] = None,
+                   stream: Optional[bool] = None) -> Dict:
+        """Import a TXT file into the database.
+
+        The file is memory-mapped and decoded block by block, so it is never read into
+        memory as a whole.
+        """
         try:
-            # Read the text file
-            with open(txt_path, 'r', encoding='utf-8') as file:
-                full_text = file.read()
-            
-            # Clean up the text
-            full_text = self._clean_text(full_text)
-            
-            # Add to database
-            book_id = self.db.add_book(
-                title=title or os.path.splitext(os.path.basename(txt_path))[0],
-                author=author or 'Unknown Author',
-                isbn=isbn,
-                text_content=full_text
-            )
-            
+            title = title or os.path.splitext(os.path.basename(txt_path))[0]
+            with mapped_file(txt_path) as buffer:
+                return self.import_buffer(buffer, title, author, isbn, stream)
+
+        except Exception as e:
             return {
-                'book_id': book_id,
-                'title': title,
-                'author': author,
-                'status': 'success'
+                'status': 'error',
+                'error': str(e)
             }
-            
+
+    def import_txt_stream(self, stream: BinaryIO, title: str,
+                          author: Optional[str] = None, isbn: Optional[str] = None) -> Dict:
+        """Import a TXT from a binary stream (e.g. a spooled upload), decoding it block by block"""
+        try:
+            stream.seek(0)
+            encoding = detect_encoding(stream.read(SNIFF_SIZE))
+            size = stream.seek(0, io.SEEK_END)
+            stream.seek(0)
+            return self._import_blocks(iter_decode(stream, encoding) if encoding else None,
+                                       size, encoding, title, author, isbn)
+
         except Exception as e:
             return {
                 'status': 'error',
                 'error': str(e)
             }
-    
-    def import_txt_from_bytes(self, txt_bytes: bytes, title: str, 
+
+    def import_txt_from_bytes(self, txt_bytes: bytes, title: str,
                             author: str, isbn: Optional[str] = None) -> Dict:
         """Import a TXT from bytes (useful for uploaded files)"""
+        return self.import_buffer(txt_bytes, title, author, isbn)
+
+    def import_buffer(self, buffer: TXTBuffer, title: str, author: Optional[str] = None,
+                      isbn: Optional[str] = None, stream: Optional[bool] = None) -> Dict:
+        """Import a TXT held in a buffer (bytes or an mmap) without copying it.
+
+        With ``stream`` (the default from stream_min_bytes on) the cleaned text is cut
+        into pages and written to book_pages as it is decoded, so memory use does not
+        depend on the size of the file.
+        """
         try:
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as temp_file:
-                temp_file.write(txt_bytes)
-                temp_path = temp_file.name
-            
-            # Import the temporary file
-            result = self.import_txt(temp_path, title, author, isbn)
-            
-            # Clean up
-            os.unlink(temp_path)
-            
-            return result
-            
+            encoding = detect_encoding(bytes(buffer[:SNIFF_SIZE]))
+            return self._import_blocks(iter_decode_buffer(buffer, encoding) if encoding else None,
+                                       len(buffer), encoding, title, author, isbn, stream)
+
         except Exception as e:
             return {
                 'status': 'error',
                 'error': str(e)
             }
-    
-    def _clean_text(self, text: str) -> str:
-        """Clean up text content"""
-        # Remove multiple spaces
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove special characters but keep Persian characters
-        text = re.sub(r'[^\w\s\u0600-\u06FF\uFB8A\u067E\u0686\u06AF]', '', text)
-        
-        # Fix common text issues
-        text = text.replace('٠', '0')
-        text = text.replace('١', '1')
-        text = text.replace('٢', '2')
-        text = text.replace('٣', '3')
-        text = text.replace('٤', '4')
-        text = text.replace('٥', '5')
-        text = text.replace('٦', '6')
-        text = text.replace('٧', '7')
-        text = text.replace('٨', '8')
-        text = text.replace('٩', '9')
-        
-        return text.strip()
-    
-    def _split_into_chapters(self, text: str) -> List[str]:
-        """Split text into chapters based on common patterns"""
-        # Common chapter patterns in Persian and English
-        chapter_patterns = [
-            r'فصل\s+\d+',
-            r'Chapter\s+\d+',
-            r'بخش\s+\d+',
-            r'باب\s+\d+',
-            r'قسمت\s+\d+',
-            r'^\d+\.',  # Numbered sections
-            r'^\d+\)',  # Numbered sections with parenthesis
-            r'^[IVX]+\.',  # Roman numerals
-            r'^[A-Z]\.'  # Letter sections
-        ]
-        
-        # Combine patterns
-        pattern = '|'.join(chapter_patterns)
-        
-        # Split text into chapters
-        chapters = re.split(f'({pattern})', text)
-        
-        # Clean up chapters
-        cleaned_chapters = []
-        current_chapter = []
-        
-        for part in chapters:
-            if re.match(pattern, part):
-                if current_chapter:
-                    cleaned_chapters.append('\n'.join(current_chapter))
-                current_chapter = [part]
+
+    def extract_book(self, txt_path: str) -> Dict:
+        """Decode and clean a TXT file without storing it.
+
+        Returns title, author, text_content, chapters, encoding and word_count, as taken
+        by BookDatabase.add_books; bulk imports run this in worker processes.
+        """
+        with mapped_file(txt_path) as buffer:
+            encoding = detect_encoding(bytes(buffer[:SNIFF_SIZE]))
+            if encoding is None:
+                raise ValueError('Could not read file with any supported encoding')
+            stats = TextStats()
+            blocks = iter_decode_buffer(buffer, encoding)
+            try:
+                full_text = ''.join(self.normalizer.iter_normalize(stats.counted(blocks)))
+            finally:
+                blocks.close()
+
+        return {
+            'title': os.path.splitext(os.path.basename(txt_path))[0],
+            'author': 'Unknown Author',
+            'text_content': full_text,
+            'chapters': detect_chapters(full_text),
+            'encoding': encoding,
+            'word_count': stats.word_count
+        }
+
+    def _import_blocks(self, blocks: Optional[Iterator[str]], size: int, encoding: Optional[str],
+                       title: str, author: Optional[str], isbn: Optional[str],
+                       stream: Optional[bool] = None) -> Dict:
+        """Count, clean and store decoded blocks in a single pass"""
+        if blocks is None:
+            raise ValueError('Could not read file with any supported encoding')
+        if stream is None:
+            stream = size >= self.stream_min_bytes
+
+        stats = TextStats()
+        try:
+            cleaned = self.normalizer.iter_normalize(stats.counted(blocks))
+            if stream:
+                result = self._store_pages(cleaned, title, author, isbn)
             else:
-                current_chapter.append(part)
-        
-        if current_chapter:
-            cleaned_chapters.append('\n'.join(current_chapter))
-        
-        return cleaned_chapters
-    
+                result = self._store_text(''.join(cleaned), title, author, isbn)
+        finally:
+            # Releases the view of a memory-mapped file even if storing failed
+            blocks.close()
+
+        result['encoding'] = encoding
+        result['word_count'] = stats.word_count
+        return result
+
+    def _store_text(self, full_text: str, title: str, author: Optional[str],
+                    isbn: Optional[str]) -> Dict:
+        """Store cleaned text as a new book"""
+        # Add to database
+        book_id = self.db.add_book(
+            title=title,
+            author=author or 'Unknown Author',
+            isbn=isbn,
+            text_content=full_text
+        )
+
+        # Chapters are stored as offsets into the text; their pages are set by /process
+        self.db.save_chapters(book_id, detect_chapters(full_text))
+
+        return {
+            'book_id': book_id,
+            'title': title,
+            'author': author,
+            'status': 'success'
+        }
+
+    def _store_pages(self, cleaned: Iterable[str], title: str, author: Optional[str],
+                     isbn: Optional[str]) -> Dict:
+        """Cut cleaned text into pages and write them to book_pages in batches"""
+        book_id = self.db.add_book(title=title, author=author or 'Unknown Author', isbn=isbn)
+        # Chapter headings are found page by page as the pages go to the database
+        detector = ChapterDetector()
+
+        try:
+            page_count = self.db.add_book_pages(book_id, detector.feed_pages(iter_text_pages(cleaned)))
+            self.db.save_chapters(book_id, detector.page_chapters())
+            # Pages are served from book_pages, so the book is readable without /process
+            self.db.update_book(book_id, {'total_pages': page_count})
+        except Exception:
+            self.db.delete_book(book_id)
+            raise
+
+        return {
+            'book_id': book_id,
+            'title': title,
+            'author': author,
+            'page_count': page_count,
+            'status': 'success'
+        }
+
     def extract_metadata(self, txt_path: str) -> Dict:
         """Extract metadata from TXT file"""
         try:
-            # Try different encodings
-            encodings = ['utf-8', 'utf-8-sig', 'cp1256', 'iso-8859-6', 'windows-1256']
-            content = None
-            
-            for encoding in encodings:
-                try:
-                    with open(txt_path, 'r', encoding=encoding) as file:
-                        content = file.read()
-                        break
-                except UnicodeDecodeError:
-                    continue
-            
-            if content is None:
+            with open(txt_path, 'rb') as file:
+                return self.extract_metadata_from_stream(file)
+        except Exception as e:
+            return {
+                'error': str(e)
+            }
+
+    def extract_metadata_from_stream(self, stream: BinaryIO) -> Dict:
+        """Extract metadata from a binary stream holding TXT content.
+
+        Only the first SNIFF_SIZE bytes are read. For longer files the word count is
+        extrapolated from that prefix (word_count_estimated is then true).
+        """
+        try:
+            stream.seek(0)
+            sample = stream.read(SNIFF_SIZE)
+            size = stream.seek(0, io.SEEK_END)
+
+            encoding = detect_encoding(sample)
+            if encoding is None:
                 return {
                     'error': 'Could not read file with any supported encoding'
                 }
-            
+
+            complete = len(sample) >= size
+            content = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample, final=complete)
+            stats = TextStats()
+            if content:
+                stats.add(content)
+
+            word_count = stats.word_count
+            if not complete:
+                word_count = round(word_count * size / len(sample))
+
             # Get first few lines for preview
-            preview_lines = content.split('\n')[:5]
-            preview_text = '\n'.join(preview_lines)
-            
-            # Count words
-            word_count = len(content.split())
-            
-            # Try to extract title from first line
-            title = preview_lines[0].strip() if preview_lines else ''
-            
+            preview_lines = stats.preview_lines
+
             return {
-                'title': title,
+                # Try to extract title from first line
+                'title': preview_lines[0].strip() if preview_lines else '',
                 'author': '',
                 'word_count': word_count,
-                'preview': preview_text
+                'word_count_estimated': not complete,
+                'encoding': encoding,
+                'preview': '\n'.join(preview_lines)
             }
-            
+
         except Exception as e:
             return {
                 'error': str(e)
-            } 
\ No newline at end of file
+            }
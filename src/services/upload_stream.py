@@ -0,0 +1,141 @@
+import io
+import os
+import tempfile
+from typing import BinaryIO, Optional
+
+# Uploads up to this many bytes are kept in memory, larger ones roll over to a single temp file
+UPLOAD_SPOOL_MAX_MEMORY = int(os.getenv('UPLOAD_SPOOL_MAX_MEMORY', str(8 * 1024 * 1024)))
+
+# Per-type upload size limits in bytes
+UPLOAD_SIZE_LIMITS = {
+    'pdf': int(os.getenv('MAX_PDF_UPLOAD_SIZE', str(512 * 1024 * 1024))),
+    'txt': int(os.getenv('MAX_TXT_UPLOAD_SIZE', str(128 * 1024 * 1024))),
+    'epub': int(os.getenv('MAX_EPUB_UPLOAD_SIZE', str(128 * 1024 * 1024))),
+}
+
+# Largest single file accepted by any import endpoint
+MAX_UPLOAD_SIZE = max(UPLOAD_SIZE_LIMITS.values())
+
+# Hard cap for a whole request body (leaves room for the multipart framing and form fields)
+MAX_REQUEST_SIZE = MAX_UPLOAD_SIZE + 1024 * 1024
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds its configured size limit"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds the maximum size of {limit} bytes")
+        self.limit = limit
+
+
+class SpooledUpload(io.RawIOBase):
+    """Write-once upload buffer: in memory while small, one named temp file once it grows.
+
+    The multipart parser writes the request body straight into this object, so the
+    importers can read it back without a second copy through ``uploads/`` or a
+    ``NamedTemporaryFile``.
+    """
+
+    def __init__(self, max_memory: int = UPLOAD_SPOOL_MAX_MEMORY,
+                 max_size: int = MAX_UPLOAD_SIZE, suffix: str = ''):
+        super().__init__()
+        self.max_memory = max_memory
+        self.max_size = max_size
+        self.suffix = suffix
+        self.size = 0
+        self.path: Optional[str] = None
+        self._file: BinaryIO = io.BytesIO()
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise UploadTooLarge(self.max_size)
+        if self.path is None and self.size > self.max_memory:
+            self._rollover()
+        return self._file.write(data)
+
+    def _rollover(self):
+        """Move the buffered bytes to a temp file on disk"""
+        fd, path = tempfile.mkstemp(suffix=self.suffix, prefix='robobook-upload-')
+        disk_file = os.fdopen(fd, 'w+b')
+        disk_file.write(self._file.getbuffer())
+        self._file.close()
+        self._file = disk_file
+        self.path = path
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def readinto(self, buffer) -> int:
+        return self._file.readinto(buffer)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def getvalue(self) -> bytes:
+        """Return the buffered bytes (only for uploads that stayed in memory)"""
+        if not self.in_memory:
+            raise ValueError("Upload was spooled to disk, use .path instead")
+        return self._file.getvalue()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            super().close()
+        finally:
+            self._file.close()
+            if self.path and os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+def spool_stream(stream: BinaryIO, max_memory: int = UPLOAD_SPOOL_MAX_MEMORY,
+                 max_size: int = MAX_UPLOAD_SIZE, suffix: str = '') -> SpooledUpload:
+    """Copy a readable stream into a SpooledUpload in fixed-size chunks"""
+    upload = SpooledUpload(max_memory=max_memory, max_size=max_size, suffix=suffix)
+    try:
+        while True:
+            chunk = stream.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            upload.write(chunk)
+        upload.seek(0)
+        return upload
+    except Exception:
+        upload.close()
+        raise
+
+
+def open_upload(file) -> SpooledUpload:
+    """Return an uploaded file (a FileStorage) as a SpooledUpload, enforcing its type's size limit"""
+    extension = os.path.splitext(file.filename)[1].lower()
+    limit = UPLOAD_SIZE_LIMITS[extension[1:]]
+    if isinstance(file.stream, SpooledUpload):
+        upload = file.stream
+        if upload.size > limit:
+            raise UploadTooLarge(limit)
+        upload.seek(0)
+        return upload
+    # App is not using UploadRequest, copy the stream once in bounded chunks
+    return spool_stream(file.stream, max_size=limit, suffix=extension)
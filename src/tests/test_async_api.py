@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های رابط برنامه‌نویسی async کتاب‌خوان (Quart)
+"""
+
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import fitz
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.database.book_db import BookDatabase
+from src.services import llm_cache
+from src.services.audio_cache import AudioCache
+from src.services.epub_importer import EPUBImporter
+from src.services.pdf_importer import PDFImporter
+from src.services.prefetch import ReadAheadScheduler
+
+HAS_QUART = importlib.util.find_spec('quart') is not None
+
+AUDIO = b'ID3' + b'\x00' * 1024
+
+TEXT = "Chapter 1\n" + "The quick brown fox jumps over the lazy dog. " * 60
+
+EPUB_CONTAINER = '''<?xml version="1.0"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles><rootfile full-path="content.opf" media-type="application/oebps-package+xml"/></rootfiles>
+</container>'''
+
+EPUB_PACKAGE = '''<?xml version="1.0" encoding="utf-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:title>EPUB Book</dc:title></metadata>
+  <manifest><item id="c1" href="chapter1.xhtml" media-type="application/xhtml+xml"/></manifest>
+  <spine><itemref idref="c1"/></spine>
+</package>'''
+
+EPUB_CHAPTER = '''<?xml version="1.0" encoding="utf-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml"><body><h1>Chapter 1</h1><p>The only chapter.</p></body></html>'''
+
+def pdf_bytes(texts):
+    doc = fitz.open()
+    for text in texts:
+        doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def epub_bytes():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as epub:
+        epub.writestr('mimetype', 'application/epub+zip')
+        epub.writestr('META-INF/container.xml', EPUB_CONTAINER)
+        epub.writestr('content.opf', EPUB_PACKAGE)
+        epub.writestr('chapter1.xhtml', EPUB_CHAPTER)
+    return buffer.getvalue()
+
+@unittest.skipUnless(HAS_QUART, 'quart is not installed')
+class TestAsyncBookReaderAPI(unittest.IsolatedAsyncioTestCase):
+    """تست دود (smoke) برای هر مسیر blueprint async از طریق test client کوارت"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.class_dir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls.class_dir.cleanup)
+        # The blueprint modules build their services on import; keep their files out of the checkout
+        path = cls.class_dir.name
+        db_init, audio_init = BookDatabase.__init__, AudioCache.__init__
+        with mock.patch.dict(os.environ, {'OPENAI_API_KEY': 'test'}), \
+                mock.patch.object(BookDatabase, '__init__',
+                                  lambda self, _: db_init(self, os.path.join(path, 'books.db'))), \
+                mock.patch.object(AudioCache, '__init__',
+                                  lambda self: audio_init(self, os.path.join(path, 'audio'))), \
+                mock.patch.object(llm_cache, 'LLM_CACHE_PATH', os.path.join(path, 'llm_cache.db')), \
+                mock.patch.object(llm_cache, '_shared_cache', None):
+            from quart import Quart
+            from src.api import book_reader_api, book_reader_async_api
+
+        cls.modules = (book_reader_api, book_reader_async_api)
+        cls.api = book_reader_async_api
+        cls.app = Quart(__name__)
+        cls.app.register_blueprint(book_reader_async_api.book_reader_async_bp)
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = BookDatabase(os.path.join(self.temp_dir.name, 'books.db'))
+        self.audio_cache = AudioCache(os.path.join(self.temp_dir.name, 'audio'))
+        self.reader = mock.Mock()
+        self.reader.index_book.return_value = 3
+        self.reader.index_stored_pages.return_value = 3
+        self.reader.aask_question = mock.AsyncMock(return_value='The fox.')
+        self.reader.aanalyze_theme = mock.AsyncMock(return_value={'summary': 'A fox.', 'themes': []})
+        services = {
+            'db': self.db,
+            'audio_cache': self.audio_cache,
+            'reader': self.reader,
+            'read_ahead': ReadAheadScheduler(pages_ahead=0),
+            'pdf_importer': PDFImporter(self.db),
+            'epub_importer': EPUBImporter(self.db),
+        }
+        # The async module shares these with the sync one, which its helpers (read-ahead,
+        # re-import) read from, so both are patched
+        for module in self.modules:
+            for name, service in services.items():
+                self.enterContext(mock.patch.object(module, name, service))
+
+        tts_service, translation_service = self.api.tts_service, self.api.translation_service
+        self.synthesize = self.enterContext(mock.patch.object(
+            tts_service, 'atext_to_speech', mock.AsyncMock(return_value=AUDIO)))
+        self.enterContext(mock.patch.object(tts_service, 'astream_speech', self.stream_speech))
+        self.enterContext(mock.patch.object(
+            translation_service, 'atranslate_cached', mock.AsyncMock(return_value='ترجمه')))
+        self.enterContext(mock.patch.object(
+            translation_service, 'atranslate_pages',
+            mock.AsyncMock(side_effect=lambda texts, book_title=None: ['ترجمه'] * len(texts))))
+
+        self.client = self.app.test_client()
+
+    async def asyncTearDown(self):
+        self.temp_dir.cleanup()
+
+    async def stream_speech(self, text, voice=None):
+        for start in range(0, len(AUDIO), 256):
+            yield AUDIO[start:start + 256]
+
+    async def upload(self, path, data, filename, form=None):
+        from werkzeug.datastructures import FileStorage
+        return await self.client.post(path, form=form or {},
+                                      files={'file': FileStorage(io.BytesIO(data), filename=filename)})
+
+    async def processed_book(self):
+        response = await self.upload('/api/books/import/txt', TEXT.encode('utf-8'), 'fox.txt', {'title': 'Fox'})
+        book_id = (await response.get_json())['book_id']
+        response = await self.client.post(f'/api/books/{book_id}/process')
+        self.assertEqual(response.status_code, 200)
+        return book_id
+
+    async def test_import_pdf(self):
+        """وارد کردن PDF"""
+        response = await self.upload('/api/books/import/pdf', pdf_bytes(["The third book."]), 'three.pdf')
+        self.assertEqual(response.status_code, 200)
+        result = await response.get_json()
+        self.assertEqual((result['title'], result['page_count']), ('three', 1))
+
+    async def test_import_epub(self):
+        """وارد کردن EPUB و رد کردن نوع نادرست"""
+        response = await self.upload('/api/books/import/epub', epub_bytes(), 'book.epub')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await response.get_json())['title'], 'EPUB Book')
+
+        response = await self.upload('/api/books/import/epub', b'text', 'book.txt')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_reimport(self):
+        """وارد کردن دوباره ویرایش جدید یک کتاب"""
+        response = await self.upload('/api/books/import/pdf', pdf_bytes(["Page one.", "Page two."]), 'two.pdf')
+        book_id = (await response.get_json())['book_id']
+
+        response = await self.upload('/api/books/reimport', pdf_bytes(["Page one.", "Page 2."]), 'two.pdf',
+                                     {'book_id': str(book_id)})
+        self.assertEqual(response.status_code, 200)
+        result = await response.get_json()
+        self.assertEqual((result['book_id'], result['page_count']), (book_id, 2))
+
+        response = await self.upload('/api/books/reimport', pdf_bytes(["Page one."]), 'two.pdf')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_import_txt_and_metadata(self):
+        """وارد کردن TXT و استخراج مشخصاتش"""
+        response = await self.upload('/api/books/import/txt', TEXT.encode('utf-8'), 'fox.txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await response.get_json())['title'], 'fox.txt')
+
+        response = await self.upload('/api/books/import/txt/metadata', TEXT.encode('utf-8'), 'fox.txt')
+        self.assertEqual(response.status_code, 200)
+
+        response = await self.upload('/api/books/import/txt', b'', 'fox.md')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_books_and_chapters(self):
+        """فهرست کتاب‌ها با ETag، جزئیات کتاب و فصل‌ها"""
+        book_id = await self.processed_book()
+
+        response = await self.client.get('/api/books')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([book['id'] for book in await response.get_json()], [book_id])
+        etag = response.headers['ETag']
+        response = await self.client.get('/api/books', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        response = await self.client.get(f'/api/books/{book_id}')
+        self.assertEqual((await response.get_json())['title'], 'Fox')
+        response = await self.client.get(f'/api/books/{book_id + 1}')
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.client.get(f'/api/books/{book_id}/chapters')
+        self.assertEqual(len((await response.get_json())['chapters']), 1)
+        response = await self.client.get(f'/api/books/{book_id}/chapters/1')
+        self.assertEqual((await response.get_json())['title'], 'Chapter 1')
+        response = await self.client.get(f'/api/books/{book_id}/chapters/2')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_pages(self):
+        """خواندن یک صفحه و یک بازه از صفحه‌ها"""
+        book_id = await self.processed_book()
+
+        response = await self.client.get(f'/api/books/{book_id}/page/1')
+        self.assertEqual(response.status_code, 200)
+        page = await response.get_json()
+        self.assertTrue(page['content'].startswith('Chapter 1'))
+        self.assertGreater(page['total_pages'], 1)
+
+        response = await self.client.get(f'/api/books/{book_id}/pages?from=1&to=2&translation=fa')
+        self.assertEqual(response.status_code, 200)
+        pages = await response.get_json()
+        self.assertEqual((pages['from'], pages['to'], pages['translation_book_id']), (1, 2, None))
+
+        response = await self.client.get(f'/api/books/{book_id}/pages?from=2&to=1')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_page_audio(self):
+        """صدای صفحه یک بار ساخته و سپس از کش فرستاده می‌شود"""
+        book_id = await self.processed_book()
+
+        for _ in range(2):
+            response = await self.client.get(f'/api/books/{book_id}/tts/1')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(await response.get_data(), AUDIO)
+        self.assertEqual(self.synthesize.await_count, 1)
+        self.assertEqual(response.mimetype, 'audio/mpeg')
+        self.assertIn('page_1.mp3', response.headers['Content-Disposition'])
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+        self.assertNotIn('public', response.headers['Cache-Control'])
+
+        etag = response.headers['ETag']
+        response = await self.client.get(f'/api/books/{book_id}/tts/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        response = await self.client.get(f'/api/books/{book_id}/tts/1', headers={'Range': 'bytes=0-2'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(await response.get_data(), b'ID3')
+
+    async def test_streamed_page_audio(self):
+        """صدای جریانی پس از پایان کامل در کش ذخیره می‌شود"""
+        book_id = await self.processed_book()
+
+        response = await self.client.get(f'/api/books/{book_id}/tts/2?stream=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await response.get_data(), AUDIO)
+        self.assertEqual(self.audio_cache.stats()['entries'], 1)
+        self.synthesize.assert_not_awaited()
+
+    async def test_translate_page(self):
+        """ترجمه یک صفحه"""
+        book_id = await self.processed_book()
+
+        response = await self.client.post(f'/api/books/{book_id}/translate/1')
+        self.assertEqual(await response.get_json(), {'translated_content': 'ترجمه'})
+        response = await self.client.post(f'/api/books/{book_id}/translate/999')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_process_translation(self):
+        """ترجمه بازه‌ای از صفحه‌ها در یک نسخه جدید کتاب"""
+        book_id = await self.processed_book()
+
+        response = await self.client.post(f'/api/books/{book_id}/process-translation',
+                                          json={'start_page': 1, 'pages': 2})
+        self.assertEqual(response.status_code, 200)
+        result = await response.get_json()
+        self.assertEqual((result['start_page'], result['end_page']), (1, 2))
+        translated = self.db.get_translated_pages(result['translated_book_id'], 1, 2)
+        self.assertEqual(translated, {1: 'ترجمه', 2: 'ترجمه'})
+
+        response = await self.client.post(f'/api/books/{book_id}/process-translation', json={'start_page': 0})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_ask_and_analyze(self):
+        """پرسش درباره کتاب و تحلیل کل کتاب"""
+        book_id = await self.processed_book()
+
+        response = await self.client.post(f'/api/books/{book_id}/ask', json={'question': 'Who jumps?'})
+        self.assertEqual(await response.get_json(), {'answer': 'The fox.'})
+        response = await self.client.post(f'/api/books/{book_id}/ask', json={})
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.client.post(f'/api/books/{book_id}/analyze')
+        self.assertEqual((await response.get_json())['summary'], 'A fox.')
+        self.reader.aask_question.assert_awaited_once_with(book_id, 'Who jumps?')
+        self.reader.aanalyze_theme.assert_awaited_once_with(book_id)
+
+    async def test_stats(self):
+        """آمار پیش‌بارگذاری و کش‌ها"""
+        response = await self.client.get('/api/read-ahead/stats')
+        self.assertEqual((await response.get_json())['warmed'], 0)
+
+        response = await self.client.get('/api/cache/stats')
+        self.assertEqual(set(await response.get_json()), {'audio', 'translation', 'llm'})
+        # The services built on import keep their caches in the temporary directory
+        translation_cache = self.api.translation_service.llm_cache
+        self.assertEqual(os.path.dirname(translation_cache.path), self.class_dir.name)
+
+if __name__ == "__main__":
+    unittest.main()
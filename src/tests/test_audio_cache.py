@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های کش صوتی صفحات کتاب
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.audio_cache import AudioCache
+
+class TestAudioCache(unittest.TestCase):
+    """تست کلیدگذاری محتوایی و حذف LRU"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = AudioCache(cache_dir=self.temp_dir.name, max_bytes=10)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key_depends_on_all_parameters(self):
+        """کلید باید با تغییر متن، صدا، مدل یا سرعت تغییر کند"""
+        base = AudioCache.make_key("سلام", "nova", "gpt-4o-mini-tts", 1.0)
+        self.assertEqual(base, AudioCache.make_key("سلام", "nova", "gpt-4o-mini-tts", 1))
+        self.assertNotEqual(base, AudioCache.make_key("سلام!", "nova", "gpt-4o-mini-tts", 1.0))
+        self.assertNotEqual(base, AudioCache.make_key("سلام", "alloy", "gpt-4o-mini-tts", 1.0))
+        self.assertNotEqual(base, AudioCache.make_key("سلام", "nova", "tts-1", 1.0))
+        self.assertNotEqual(base, AudioCache.make_key("سلام", "nova", "gpt-4o-mini-tts", 0.7))
+
+    def test_get_or_create_synthesizes_once(self):
+        """در بار دوم نباید سنتز دوباره انجام شود"""
+        calls = []
+
+        def synthesize():
+            calls.append(1)
+            return b"abc"
+
+        first = self.cache.get_or_create("k", synthesize)
+        second = self.cache.get_or_create("k", synthesize)
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+        with open(first, 'rb') as f:
+            self.assertEqual(f.read(), b"abc")
+
+    def test_lru_eviction(self):
+        """با پر شدن بودجه، کم‌استفاده‌ترین فایل حذف می‌شود"""
+        self.cache.put("a", b"1234")
+        self.cache.put("b", b"1234")
+        self.cache.get("a")
+        self.cache.put("c", b"1234")
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+        self.assertLessEqual(self.cache.stats()['total_bytes'], 10)
+
+    def test_index_survives_restart(self):
+        """فایل‌های موجود روی دیسک پس از راه‌اندازی مجدد شناخته می‌شوند"""
+        self.cache.put("a", b"12")
+        reopened = AudioCache(cache_dir=self.temp_dir.name, max_bytes=10)
+        self.assertIsNotNone(reopened.get("a"))
+
+    def test_open_file_survives_eviction(self):
+        """فایل بازشده برای ارسال حتی اگر هم‌زمان حذف شود قابل خواندن می‌ماند"""
+        self.cache.put("a", b"12345678")
+        with self.cache.open_file("a") as audio_file:
+            self.cache.put("b", b"12345678")
+            self.assertIsNone(self.cache.get("a"))
+            self.assertEqual(audio_file.read(), b"12345678")
+        self.assertIsNone(self.cache.open_file("a"))
+
+    def test_open_or_create_on_miss(self):
+        """در نبود فایل، صدا ساخته و فایل باز برگردانده می‌شود"""
+        with self.cache.open_or_create("k", lambda: b"abc") as audio_file:
+            self.assertEqual(audio_file.read(), b"abc")
+
+    def test_concurrent_misses_are_coalesced(self):
+        """درخواست‌های هم‌زمان برای یک کلید فقط یک بار سنتز می‌شوند"""
+        calls = []
+
+        def synthesize():
+            calls.append(1)
+            time.sleep(0.2)
+            return b"audio"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get_or_create("page", synthesize)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(set(results)), 1)
+        coalescing = self.cache.stats()['coalescing']
+        self.assertEqual(coalescing['executed'], 1)
+        self.assertEqual(coalescing['coalesced'], 7)
+        self.assertEqual(coalescing['in_flight'], 0)
+
+    def test_stream_waits_for_running_stream(self):
+        """استریم دوم منتظر استریم در حال اجرا می‌ماند و فایل کش شده را پخش می‌کند"""
+        upstream = []
+
+        def speech():
+            upstream.append(1)
+            yield b"ab"
+            yield b"cd"
+
+        leader = self.cache.tee("page", speech())
+        self.assertEqual(next(leader), b"ab")
+
+        follower_output = []
+        follower = threading.Thread(target=lambda: follower_output.extend(self.cache.tee("page", speech())))
+        follower.start()
+        time.sleep(0.05)
+        self.assertEqual(b"".join(leader), b"cd")
+        follower.join()
+
+        self.assertEqual(len(upstream), 1)
+        self.assertEqual(b"".join(follower_output), b"abcd")
+
+    def evict_first_commit(self):
+        """Evict the entry right after the first commit, before a waiting stream can open it"""
+        commit = self.cache.commit
+        evicted = []
+
+        def commit_then_evict(key, temp_path):
+            path = commit(key, temp_path)
+            if not evicted:
+                evicted.append(key)
+                self.cache.invalidate(key)
+            return path
+
+        self.cache.commit = commit_then_evict
+        return evicted
+
+    def test_stream_evicted_before_replay(self):
+        """اگر فایل پیش از پخش برای استریم منتظر حذف شود، صدا دوباره ساخته می‌شود"""
+        upstream = []
+
+        def speech():
+            upstream.append(1)
+            yield b"ab"
+            yield b"cd"
+
+        evicted = self.evict_first_commit()
+        leader = self.cache.tee("page", speech())
+        self.assertEqual(next(leader), b"ab")
+
+        follower_output = []
+        follower = threading.Thread(target=lambda: follower_output.extend(self.cache.tee("page", speech())))
+        follower.start()
+        time.sleep(0.05)
+        self.assertEqual(b"".join(leader), b"cd")
+        follower.join()
+
+        self.assertEqual(evicted, ["page"])
+        self.assertEqual(len(upstream), 2)
+        self.assertEqual(b"".join(follower_output), b"abcd")
+        self.assertIsNotNone(self.cache.get("page"))
+
+    def test_async_stream_waits_for_running_stream(self):
+        """نسخه async: استریم منتظر فایل کش شده را پخش می‌کند و اگر حذف شده باشد دوباره می‌سازد"""
+        upstream = []
+
+        async def speech():
+            upstream.append(1)
+            yield b"ab"
+            yield b"cd"
+
+        async def leader_and_follower():
+            leader = self.cache.atee("page", speech())
+            self.assertEqual(await leader.__anext__(), b"ab")
+            follower = asyncio.ensure_future(self.collect(self.cache.atee("page", speech())))
+            await asyncio.sleep(0.01)
+            self.assertEqual(await self.collect(leader), b"cd")
+            return await follower
+
+        self.assertEqual(asyncio.run(leader_and_follower()), b"abcd")
+        self.assertEqual(len(upstream), 1)
+
+        self.cache.invalidate("page")
+        evicted = self.evict_first_commit()
+        self.assertEqual(asyncio.run(leader_and_follower()), b"abcd")
+        self.assertEqual(evicted, ["page"])
+        self.assertEqual(len(upstream), 3)
+        self.assertIsNotNone(self.cache.get("page"))
+
+    @staticmethod
+    async def collect(stream):
+        return b"".join([chunk async for chunk in stream])
+
+    def part_files(self):
+        return [name for name in os.listdir(self.temp_dir.name) if name.endswith('.part')]
+
+    def test_completed_stream_is_committed(self):
+        """استریم کامل‌شده در کش ثبت می‌شود"""
+        self.assertEqual(b"".join(self.cache.tee("page", iter([b"ab", b"cd"]))), b"abcd")
+        with open(self.cache.get("page"), 'rb') as f:
+            self.assertEqual(f.read(), b"abcd")
+        self.assertEqual(self.part_files(), [])
+
+    def test_aborted_stream_is_not_committed(self):
+        """قطع شدن استریم در میانه (بسته شدن اتصال) چیزی در کش ثبت نمی‌کند"""
+        stream = self.cache.tee("page", iter([b"ab", b"cd"]))
+        self.assertEqual(next(stream), b"ab")
+        stream.close()
+
+        self.assertIsNone(self.cache.get("page"))
+        self.assertEqual(self.part_files(), [])
+        self.assertEqual(self.cache.stats()['coalescing']['in_flight'], 0)
+        # The next request streams from upstream again and commits
+        self.assertEqual(b"".join(self.cache.tee("page", iter([b"ab", b"cd"]))), b"abcd")
+        self.assertIsNotNone(self.cache.get("page"))
+
+    def test_failed_upstream_is_not_committed(self):
+        """خطای سرویس TTS در میانه استریم به فراخواننده می‌رسد و فایل ناقص ثبت نمی‌شود"""
+        def speech():
+            yield b"ab"
+            raise RuntimeError("tts down")
+
+        with self.assertRaises(RuntimeError):
+            b"".join(self.cache.tee("page", speech()))
+        self.assertIsNone(self.cache.get("page"))
+        self.assertEqual(self.part_files(), [])
+
+    def test_async_stream_commits_only_when_complete(self):
+        """نسخه async هم فقط استریم کامل را ثبت می‌کند"""
+        async def speech():
+            yield b"ab"
+            yield b"cd"
+
+        async def abort():
+            stream = self.cache.atee("page", speech())
+            self.assertEqual(await stream.__anext__(), b"ab")
+            await stream.aclose()
+
+        async def complete():
+            return b"".join([chunk async for chunk in self.cache.atee("page", speech())])
+
+        asyncio.run(abort())
+        self.assertIsNone(self.cache.get("page"))
+        self.assertEqual(self.part_files(), [])
+
+        self.assertEqual(asyncio.run(complete()), b"abcd")
+        with open(self.cache.get("page"), 'rb') as f:
+            self.assertEqual(f.read(), b"abcd")
+
+if __name__ == "__main__":
+    unittest.main()
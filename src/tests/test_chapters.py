@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های تشخیص فصل‌ها و ذخیره آن‌ها با جایگاه در متن
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.database.book_db import BookDatabase
+from src.services.chapters import detect_chapters
+from src.services.pagination import BoundaryIndex
+
+def make_book():
+    body = "این جمله‌ای از متن کتاب است. " * 40
+    toc = "فهرست: فصل 1 آغاز، فصل 2 راه، فصل 3 پایان. "
+    return toc + "".join(
+        f"فصل {n} عنوان {n}. " + body + ("همان‌طور که در فصل 1 دیدیم. " if n == 3 else "")
+        for n in (1, 2, 3)
+    )
+
+class TestChapterDetection(unittest.TestCase):
+    """تست تشخیص عنوان فصل‌ها در یک گذر"""
+
+    def test_table_of_contents_and_references_are_skipped(self):
+        """فهرست مطالب و ارجاع به فصل‌های دیگر فصل حساب نمی‌شوند"""
+        text = make_book()
+        chapters = detect_chapters(text)
+        self.assertEqual([c['chapter_number'] for c in chapters], [1, 2, 3])
+        self.assertTrue(text[chapters[0]['start_offset']:].startswith("فصل 1 عنوان 1"))
+        self.assertEqual(chapters[0]['end_offset'], chapters[1]['start_offset'])
+        self.assertEqual(chapters[-1]['end_offset'], len(text))
+
+    def test_numbers_on_their_own_line(self):
+        """شماره تنها در یک سطر (عربی یا رومی) عنوان فصل است"""
+        text = "I.\nOne " + "word " * 200 + "\nII.\nTwo " + "word " * 200 + "\n7\nnot a chapter"
+        self.assertEqual([c['title'] for c in detect_chapters(text)], ["I.", "II."])
+
+class TestStoredChapters(unittest.TestCase):
+    """تست ذخیره فصل‌ها و خواندن آن‌ها با جایگاه"""
+
+    def test_chapter_text_and_pages(self):
+        """متن فصل از روی جایگاه خوانده می‌شود و صفحه‌ها پس از پردازش ثبت می‌شوند"""
+        text = make_book()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = BookDatabase(os.path.join(temp_dir, 'books.db'))
+            book_id = db.add_book("کتاب", text_content=text)
+            chapters = detect_chapters(text)
+            db.save_chapters(book_id, chapters)
+
+            chapter = db.get_chapter(book_id, 2)
+            self.assertEqual(chapter['content'], text[chapters[1]['start_offset']:chapters[1]['end_offset']])
+            self.assertIsNone(chapter['start_page'])
+
+            index = BoundaryIndex.build(text)
+            db.save_text_index(book_id, index, page_size=300)
+            listed = db.get_chapters(book_id)
+            for stored in listed:
+                start, end = index.page_bounds(stored['start_page'], 300)
+                self.assertTrue(start <= stored['start_offset'] < end)
+            self.assertEqual(listed[-1]['end_page'], index.total_pages(300))
+
+if __name__ == "__main__":
+    unittest.main()
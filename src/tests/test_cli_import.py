@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های وارد کردن گروهی پوشه کتاب‌ها از خط فرمان
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import fitz
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src import cli
+from src.cli import MANIFEST_NAME, import_directory
+from src.database.book_db import BookDatabase
+
+class TestImportDirectory(unittest.TestCase):
+    """تست حذف فایل‌های تکراری، ثبت پیشرفت و ادامه کار پس از توقف"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.library = os.path.join(self.temp_dir.name, 'library')
+        os.makedirs(os.path.join(self.library, 'persian'))
+        self.write('one.txt', "Chapter 1\nThe first book.\n")
+        self.write('persian/two.txt', "فصل ١\nکتاب دوم.\n")
+        self.write('persian/copy.txt', "Chapter 1\nThe first book.\n")
+        self.write('broken.pdf', "not a pdf")
+        self.write('notes.md', "ignored")
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), "The third book.")
+        doc.save(os.path.join(self.library, 'three.pdf'))
+        doc.close()
+        self.db = BookDatabase(os.path.join(self.temp_dir.name, 'books.db'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.library, name), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def manifest(self):
+        with open(os.path.join(self.library, MANIFEST_NAME), encoding='utf-8') as f:
+            return {entry['path']: entry for entry in map(json.loads, f)}
+
+    def test_import_and_resume(self):
+        """هر محتوا یک بار وارد می‌شود و اجرای دوباره فقط فایل‌های ناموفق را تکرار می‌کند"""
+        counts = import_directory(self.db, self.library, workers=1, batch_size=2, progress=False)
+        self.assertEqual((counts['imported'], counts['duplicate'], counts['failed']), (3, 1, 1))
+
+        manifest = self.manifest()
+        self.assertEqual(manifest['persian/copy.txt']['duplicate_of'], 'one.txt')
+        self.assertEqual(manifest['broken.pdf']['status'], 'failed')
+        books = {self.db.get_book(manifest[path]['book_id'])['title']: manifest[path]['book_id']
+                 for path in ('one.txt', 'persian/two.txt', 'three.pdf')}
+        self.assertEqual(set(books), {'one', 'two', 'three'})
+        self.assertEqual(self.db.get_book(books['two'])['text_content'], "فصل 1 کتاب دوم.")
+        self.assertEqual(self.db.get_chapters(books['one'])[0]['title'], "Chapter 1")
+
+        counts = import_directory(self.db, self.library, workers=1, progress=False)
+        self.assertEqual((counts['skipped'], counts['imported'], counts['failed']), (4, 0, 1))
+
+    def test_process_pool(self):
+        """استخراج در فرایندهای جداگانه همان نتیجه را می‌دهد"""
+        counts = import_directory(self.db, self.library, workers=2, progress=False)
+        self.assertEqual((counts['imported'], counts['duplicate'], counts['failed']), (3, 1, 1))
+
+    def test_duplicates_wait_for_the_original(self):
+        """نسخه تکراری فایلی که وارد نشده تمام‌شده ثبت نمی‌شود و در اجرای بعد تکرار می‌شود"""
+        with open(os.path.join(self.library, 'broken.pdf'), 'rb') as f:
+            broken = f.read()
+        with open(os.path.join(self.library, 'persian', 'broken copy.pdf'), 'wb') as f:
+            f.write(broken)
+
+        counts = import_directory(self.db, self.library, workers=1, progress=False)
+        self.assertEqual((counts['imported'], counts['duplicate'], counts['failed']), (3, 1, 2))
+        manifest = self.manifest()
+        self.assertEqual(manifest['persian/broken copy.pdf']['status'], 'failed')
+        self.assertEqual(manifest['persian/copy.txt']['status'], 'duplicate')
+
+    def test_large_books_are_streamed(self):
+        """کتاب‌های بزرگ صفحه به صفحه در book_pages نوشته می‌شوند و متن کامل از پردازه‌ها برنمی‌گردد"""
+        # two.txt is 27 bytes and one.txt 26
+        with mock.patch.object(cli, 'TXT_STREAM_MIN_BYTES', 27), \
+                mock.patch.object(cli, 'PDF_STREAM_MIN_PAGES', 1), \
+                mock.patch.object(cli, 'extract_file', wraps=cli.extract_file) as extract:
+            counts = import_directory(self.db, self.library, workers=1, progress=False)
+
+        self.assertEqual((counts['imported'], counts['duplicate'], counts['failed']), (3, 1, 1))
+        # Only the small TXT and the unreadable PDF went through whole-text extraction
+        self.assertEqual(sorted(os.path.basename(call.args[0]) for call in extract.call_args_list),
+                         ['broken.pdf', 'one.txt'])
+        manifest = self.manifest()
+        for path in ('persian/two.txt', 'three.pdf'):
+            book_id = manifest[path]['book_id']
+            self.assertIsNone(self.db.get_book(book_id)['text_content'])
+            self.assertEqual(len(list(self.db.iter_pages(book_id))), 1)
+        self.assertEqual(manifest['persian/copy.txt']['duplicate_of'], 'one.txt')
+
+if __name__ == '__main__':
+    unittest.main()
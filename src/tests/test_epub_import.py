@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های وارد کردن فایل EPUB فصل به فصل
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.database.book_db import BookDatabase
+from src.services.epub_importer import EPUBImporter
+from src.services.pagination import PAGE_SEPARATOR
+
+CONTAINER = '''<?xml version="1.0"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>
+</container>'''
+
+PACKAGE = '''<?xml version="1.0" encoding="utf-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:title>کتاب نمونه</dc:title>
+    <dc:creator>نویسنده</dc:creator>
+    <dc:identifier>urn:isbn:9780000000001</dc:identifier>
+  </metadata>
+  <manifest>
+    <item id="cover" href="cover.xhtml" media-type="application/xhtml+xml"/>
+    <item id="c1" href="text/chapter%201.xhtml" media-type="application/xhtml+xml"/>
+    <item id="c2" href="text/chapter2.xhtml" media-type="application/xhtml+xml"/>
+    <item id="notes" href="notes.xhtml" media-type="application/xhtml+xml"/>
+  </manifest>
+  <spine>
+    <itemref idref="cover"/>
+    <itemref idref="c1"/>
+    <itemref idref="c2"/>
+    <itemref idref="notes" linear="no"/>
+  </spine>
+</package>'''
+
+COVER = '''<?xml version="1.0" encoding="utf-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml"><head><title>Cover</title></head>
+<body><img src="cover.jpg"/></body></html>'''
+
+SENTENCE = "روزی روزگاری در شهری دور مردی زندگی می‌کرد. "
+
+CHAPTER_ONE = '''<?xml version="1.0" encoding="utf-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml"><head><title>کتاب نمونه</title><style>p {{ margin: 0 }}</style></head>
+<body><h1>فصل <em>اول</em></h1>
+<p>{}</p>
+<p>{}</p></body></html>'''.format(SENTENCE * 20, SENTENCE * 20)
+
+# HTML entities without the XHTML DTD are not valid XML, so this one goes through the fallback parser
+CHAPTER_TWO = '''<!DOCTYPE html>
+<html><body><h2>Chapter&nbsp;Two</h2><p>The end&hellip;<br>Really.</p></body></html>'''
+
+class TestEPUBImport(unittest.TestCase):
+    """تست استخراج فصل‌ها از ترتیب spine و ذخیره مستقیم صفحه‌ها"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.epub_path = os.path.join(self.temp_dir.name, 'book.epub')
+        with zipfile.ZipFile(self.epub_path, 'w') as epub:
+            epub.writestr('mimetype', 'application/epub+zip')
+            epub.writestr('META-INF/container.xml', CONTAINER)
+            epub.writestr('OEBPS/content.opf', PACKAGE)
+            epub.writestr('OEBPS/cover.xhtml', COVER)
+            epub.writestr('OEBPS/text/chapter 1.xhtml', CHAPTER_ONE)
+            epub.writestr('OEBPS/text/chapter2.xhtml', CHAPTER_TWO)
+            epub.writestr('OEBPS/notes.xhtml', COVER)
+        self.db = BookDatabase(os.path.join(self.temp_dir.name, 'books.db'))
+        self.importer = EPUBImporter(self.db)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_chapters_and_pages(self):
+        """هر سند spine یک فصل است و صفحه‌ها از مرز فصل عبور نمی‌کنند"""
+        result = self.importer.import_epub(self.epub_path)
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual((result['title'], result['author'], result['chapter_count']), ("کتاب نمونه", "نویسنده", 2))
+        book_id = result['book_id']
+        self.assertEqual(self.db.get_book(book_id)['isbn'], '9780000000001')
+
+        pages = list(self.db.iter_pages(book_id))
+        self.assertEqual(len(pages), result['page_count'])
+        self.assertEqual(self.db.get_book_version(book_id)['total_pages'], len(pages))
+        self.assertTrue(pages[0]['content'].startswith("فصل اول\n\n" + SENTENCE.strip()))
+        self.assertEqual(pages[-1]['content'], "Chapter Two\n\nThe end…\n\nReally.")
+
+        chapters = self.db.get_chapters(book_id)
+        self.assertEqual([c['title'] for c in chapters], ["فصل اول", "Chapter Two"])
+        self.assertEqual((chapters[0]['start_page'], chapters[1]['end_page']), (1, len(pages)))
+        self.assertEqual(chapters[1]['start_page'], chapters[0]['end_page'] + 1)
+        text = self.db.get_book_text(book_id)
+        for chapter in chapters:
+            first = pages[chapter['start_page'] - 1]
+            self.assertEqual(chapter['start_offset'], first['start_offset'])
+            self.assertEqual(chapter['end_offset'], pages[chapter['end_page'] - 1]['end_offset'])
+            self.assertTrue(text[chapter['start_offset']:].startswith(first['content']))
+
+    def test_extract_book(self):
+        """استخراج بدون ذخیره همان فصل‌ها را با موقعیتشان در متن برمی‌گرداند"""
+        book = self.importer.extract_book(self.epub_path)
+        text = book['text_content']
+        first, second = book['chapters']
+        self.assertEqual((first['title'], second['title']), ("فصل اول", "Chapter Two"))
+        self.assertEqual(text[first['end_offset']:second['start_offset']], PAGE_SEPARATOR)
+        self.assertEqual(text[second['start_offset']:second['end_offset']], "Chapter Two\n\nThe end…\n\nReally.")
+        self.assertEqual(second['end_offset'], len(text))
+
+    def test_invalid_file(self):
+        """فایلی که EPUB نیست خطا برمی‌گرداند و کتابی ساخته نمی‌شود"""
+        path = os.path.join(self.temp_dir.name, 'broken.epub')
+        with open(path, 'wb') as f:
+            f.write(b'not a zip')
+        result = self.importer.import_epub(path)
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(self.db.search_books(''), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های درخواست‌های شرطی HTTP، فشرده‌سازی پاسخ‌ها و نسخه کتابخانه
+"""
+
+import gzip
+import importlib.util
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.database.book_db import BookDatabase
+
+HAS_FLASK = importlib.util.find_spec('flask') is not None
+
+BODY = 'The quick brown fox. ' * 100
+
+class TestLibraryVersion(unittest.TestCase):
+    """تست شمارنده تغییرات کتابخانه که ETag فهرست کتاب‌ها از آن ساخته می‌شود"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'books.db')
+        self.db = BookDatabase(self.db_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_every_write_changes_the_version(self):
+        """حذف یک کتاب و تغییر کتاب دیگر نسخه را به مقدار قبلی برنمی‌گرداند"""
+        first = self.db.add_book("One", "Author", text_content="one")
+        second = self.db.add_book("Two", "Author", text_content="two")
+        self.db.update_book(first, {'title': "One, revised"})
+        seen = [self.db.get_library_version()['version']]
+
+        # count, max(id) and sum(version) all come back to what they were
+        self.db.delete_book(first)
+        seen.append(self.db.get_library_version()['version'])
+        self.db.update_book(second, {'title': "Two, revised"})
+        seen.append(self.db.get_library_version()['version'])
+
+        self.assertEqual(len(set(seen)), 3)
+        self.assertEqual(seen, sorted(seen))
+        self.assertIsNotNone(self.db.get_library_version()['updated_at'])
+
+    def test_writes_outside_book_database_are_counted(self):
+        """تغییری که مستقیم در جدول books نوشته شود هم شمرده می‌شود"""
+        self.db.add_book("One", "Author")
+        version = self.db.get_library_version()['version']
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE books SET total_pages = 3")
+        conn.commit()
+        conn.close()
+
+        reopened = BookDatabase(self.db_path)
+        self.assertGreater(reopened.get_library_version()['version'], version)
+
+@unittest.skipUnless(HAS_FLASK, 'flask is not installed')
+class TestConditionalResponses(unittest.TestCase):
+    """تست پاسخ 304، If-None-Match و انتخاب فشرده‌سازی در http_cache"""
+
+    def setUp(self):
+        from flask import Flask, jsonify
+        from src.api import http_cache
+
+        self.http_cache = http_cache
+        self.builds = 0
+        self.app = Flask(__name__)
+        self.app.after_request(http_cache.compress_response)
+
+        def build():
+            self.builds += 1
+            return jsonify({'text': BODY})
+
+        @self.app.route('/book')
+        def book():
+            return http_cache.conditional('v1', '2024-05-01 10:00:00', build)
+
+        @self.app.route('/missing')
+        def missing():
+            return http_cache.conditional('v1', None, lambda: (jsonify({'error': 'Book not found'}), 404))
+
+        @self.app.route('/small')
+        def small():
+            return jsonify({'text': 'short'})
+
+        self.client = self.app.test_client()
+
+    def test_etag_and_not_modified(self):
+        """ETag ضعیف و Last-Modified فرستاده می‌شوند و درخواست تکراری 304 می‌گیرد بدون ساختن بدنه"""
+        response = self.client.get('/book')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['ETag'], 'W/"v1"')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(response.last_modified.year, 2024)
+
+        for etag in ('W/"v1"', '"v1"', '"v0", W/"v1"', '*'):
+            response = self.client.get('/book', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304, etag)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], 'W/"v1"')
+        self.assertEqual(self.builds, 1)
+
+        response = self.client.get('/book', headers={'If-None-Match': 'W/"v0"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.builds, 2)
+
+    def test_if_modified_since(self):
+        """If-Modified-Since فقط وقتی If-None-Match نیامده بررسی می‌شود"""
+        response = self.client.get('/book', headers={'If-Modified-Since': 'Wed, 01 May 2024 10:00:00 GMT'})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/book', headers={'If-Modified-Since': 'Wed, 01 May 2024 09:59:59 GMT'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/book', headers={'If-None-Match': '"v0"',
+                                                     'If-Modified-Since': 'Wed, 01 May 2024 10:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_errors_are_not_cacheable(self):
+        """پاسخ خطا بدون ETag برمی‌گردد"""
+        response = self.client.get('/missing')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response.headers)
+
+    def test_encoding_negotiation(self):
+        """brotli در صورت وجود، وگرنه gzip؛ بدون Accept-Encoding فشرده نمی‌شود"""
+        response = self.client.get('/book', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertIn(BODY, gzip.decompress(response.data).decode('utf-8'))
+
+        with mock.patch.object(self.http_cache, 'brotli', None):
+            response = self.client.get('/book', headers={'Accept-Encoding': 'br, gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+
+        if self.http_cache.brotli is not None:
+            response = self.client.get('/book', headers={'Accept-Encoding': 'gzip, br'})
+            self.assertEqual(response.headers['Content-Encoding'], 'br')
+            self.assertIn(BODY, self.http_cache.brotli.decompress(response.data).decode('utf-8'))
+
+        response = self.client.get('/book', headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn(BODY, response.get_data(as_text=True))
+
+    def test_small_and_not_modified_bodies_are_not_compressed(self):
+        """پاسخ‌های کوچک و 304 فشرده نمی‌شوند"""
+        response = self.client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+        response = self.client.get('/book', headers={'Accept-Encoding': 'gzip', 'If-None-Match': 'W/"v1"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('Content-Encoding', response.headers)
+
+if __name__ == "__main__":
+    unittest.main()
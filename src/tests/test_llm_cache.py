@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های کش مشترک پاسخ‌های مدل زبانی
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.llm_cache import LLMCache
+
+class FakeCompletions:
+    """جایگزین chat.completions.create که تعداد فراخوانی‌ها را می‌شمارد"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **params):
+        self.calls += 1
+        reply = f"{params['messages'][-1]['content']} #{self.calls}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+    async def acreate(self, **params):
+        return self.create(**params)
+
+class TestLLMCache(unittest.TestCase):
+    """تست لایه حافظه و دیسک، انقضا و حذف"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'llm_cache.db')
+        self.cache = LLMCache(path=self.path, memory_entries=2, max_rows=3)
+        self.api = FakeCompletions()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def ask(self, cache, text, site='translation', **params):
+        params.setdefault('temperature', 0.3)
+        return cache.complete(self.api.create, site=site, model="gpt-4-turbo",
+                              messages=[{"role": "user", "content": text}], **params)
+
+    def test_identical_calls_are_paid_once(self):
+        """درخواست تکراری از کش پاسخ داده می‌شود، حتی پس از راه‌اندازی مجدد"""
+        first = self.ask(self.cache, "سلام")
+        self.assertEqual(self.ask(self.cache, "سلام"), first)
+        reopened = LLMCache(path=self.path)
+        self.assertEqual(self.ask(reopened, "سلام"), first)
+        self.assertEqual(self.api.calls, 1)
+        self.assertEqual(reopened.stats()['disk_hits'], 1)
+
+    def test_parameters_are_part_of_the_key(self):
+        """تغییر مدل یا پارامترها کلید جدیدی می‌سازد"""
+        self.ask(self.cache, "سلام")
+        self.ask(self.cache, "سلام", max_tokens=10)
+        self.assertEqual(self.api.calls, 2)
+
+    def test_high_temperature_is_not_cached(self):
+        """درخواست با دمای بالا در هیچ محل فراخوانی کش نمی‌شود مگر اینکه صریحاً خواسته شود"""
+        self.ask(self.cache, "پرسش", site='question', temperature=0.9)
+        self.ask(self.cache, "پرسش", site='question', temperature=0.9)
+        self.assertEqual(self.api.calls, 2)
+
+        self.ask(self.cache, "خلاصه", site='summary', temperature=0.9)
+        self.ask(self.cache, "خلاصه", site='summary', temperature=0.9)
+        self.assertEqual(self.api.calls, 4)
+
+        for _ in range(2):
+            self.cache.complete(self.api.create, site='summary', cache=True, model="gpt-4-turbo",
+                                messages=[{"role": "user", "content": "خلاصه"}], temperature=0.9)
+        self.assertEqual(self.api.calls, 5)
+
+    def test_ttl_expires_entries(self):
+        """ورودی منقضی شده دوباره درخواست می‌شود"""
+        self.cache.complete(self.api.create, ttl=0.05, model="m", messages=[{"role": "user", "content": "x"}], temperature=0)
+        time.sleep(0.1)
+        self.cache.complete(self.api.create, ttl=0.05, model="m", messages=[{"role": "user", "content": "x"}], temperature=0)
+        self.assertEqual(self.api.calls, 2)
+
+    def test_disk_tier_is_bounded(self):
+        """تعداد سطرهای دیسک از سقف تعیین شده بیشتر نمی‌شود"""
+        for i in range(6):
+            self.ask(self.cache, f"متن {i}")
+        stats = self.cache.stats()
+        self.assertLessEqual(stats['disk_rows'], 3)
+        self.assertEqual(stats['memory_entries'], 2)
+        # The most recently used rows are the ones kept
+        reopened = LLMCache(path=self.path, memory_entries=0)
+        self.ask(reopened, "متن 5")
+        self.assertEqual(self.api.calls, 6)
+
+    def test_eviction_is_amortized(self):
+        """حذف سطرهای قدیمی در هر نوشتن اجرا نمی‌شود، بلکه وقتی شمارنده از سقف بگذرد"""
+        cache = LLMCache(path=os.path.join(self.temp_dir.name, 'big.db'), max_rows=20)
+        with mock.patch.object(cache, '_evict', wraps=cache._evict) as evict:
+            for i in range(40):
+                self.ask(cache, f"متن {i}")
+        # Each eviction goes a tenth of the budget below it, so once the budget is reached
+        # it runs on every third write (21, 24, ..., 39) instead of on every write
+        self.assertEqual(evict.call_count, 7)
+        self.assertLessEqual(cache.stats()['disk_rows'], 20)
+
+    def test_flight_rechecks_the_cache(self):
+        """پاسخی که بین بررسی اول و شروع درخواست ذخیره شده دوباره از API گرفته نمی‌شود"""
+        params = dict(model="gpt-4-turbo", messages=[{"role": "user", "content": "سلام"}], temperature=0.3)
+        self.cache.put(LLMCache.make_key(params), "stored")
+        get = self.cache.get
+        # The first lookup misses, as if an earlier flight stored the answer just after it
+        misses = [None]
+
+        def racing_get(key):
+            return misses.pop() if misses else get(key)
+
+        with mock.patch.object(self.cache, 'get', side_effect=racing_get):
+            self.assertEqual(self.cache.complete(self.api.create, **params), "stored")
+            misses.append(None)
+            self.assertEqual(asyncio.run(self.cache.acomplete(self.api.acreate, **params)), "stored")
+        self.assertEqual(self.api.calls, 0)
+        self.assertEqual(self.cache.stats()['misses'], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های دریافت دسته‌ای صفحات کتاب
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.database.book_db import BookDatabase
+from src.services.pagination import BoundaryIndex
+
+class TestPageRange(unittest.TestCase):
+    """تست بازه صفحات و جفت کردن آن‌ها با ترجمه"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = BookDatabase(os.path.join(self.temp_dir.name, 'books.db'))
+        text = "این یک جمله فارسی است. And an English sentence follows! " * 200
+        self.book_id = self.db.add_book("کتاب", "نویسنده", None, text)
+        self.db.save_text_index(self.book_id, BoundaryIndex.build(text))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_range_matches_single_pages(self):
+        """هر صفحه از بازه با همان صفحه در درخواست تکی برابر است"""
+        result = self.db.get_page_range(self.book_id, 2, 5)
+        self.assertEqual([page['page_number'] for page in result['pages']], [2, 3, 4, 5])
+        for page in result['pages']:
+            single = self.db.get_page_content(self.book_id, page['page_number'])
+            self.assertEqual(page['content'], single['content'])
+
+    def test_range_is_clipped_to_last_page(self):
+        """بازه بعد از صفحه آخر کوتاه می‌شود و بازه کاملاً بیرونی None است"""
+        total = self.db.get_book_version(self.book_id)['total_pages']
+        result = self.db.get_page_range(self.book_id, total - 1, total + 10)
+        self.assertEqual(result['pages'][-1]['page_number'], total)
+        self.assertIsNone(self.db.get_page_range(self.book_id, total + 1, total + 2))
+
+    def test_translated_pages(self):
+        """فقط صفحات ترجمه‌شده داخل بازه برگردانده می‌شوند"""
+        chunks = [{'page_number': n, 'content': f"ترجمه {n}"} for n in range(1, 6)]
+        translated_id = self.db.create_translated_version(self.book_id, chunks, 'fa', 'gpt-4-turbo')
+        self.assertEqual(self.db.get_latest_translation_id(self.book_id, 'fa'), translated_id)
+        self.assertIsNone(self.db.get_latest_translation_id(self.book_id, 'de'))
+        self.assertEqual(self.db.get_translated_pages(translated_id, 2, 3), {2: "ترجمه 2", 3: "ترجمه 3"})
+
+if __name__ == "__main__":
+    unittest.main()
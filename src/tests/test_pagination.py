@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های صفحه‌بندی مبتنی بر مرز جمله‌ها
+"""
+
+import os
+import sys
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.pagination import BoundaryIndex
+
+class TestBoundaryIndex(unittest.TestCase):
+    """تست ساخت ایندکس مرزها و محاسبه صفحات در زمان خواندن"""
+
+    def setUp(self):
+        self.text = ("این یک جمله فارسی است. And an English sentence follows! آیا سؤال هم داریم؟\n\n" * 40
+                     + "word " * 400)
+        self.index = BoundaryIndex.build(self.text)
+
+    def test_pages_cover_text_without_gaps(self):
+        """صفحات پشت سر هم کل متن را بدون همپوشانی پوشش می‌دهند"""
+        for page_size in (200, 500, 1000, 3000):
+            previous_end = 0
+            for page_number in range(1, self.index.total_pages(page_size) + 1):
+                start, end = self.index.page_bounds(page_number, page_size)
+                self.assertEqual(start, previous_end)
+                self.assertGreater(end, start)
+                previous_end = end
+            self.assertEqual(previous_end, len(self.text))
+
+    def test_pages_break_on_sentences(self):
+        """شکست صفحه‌ها در ناحیه دارای نقطه‌گذاری روی مرز جمله است"""
+        start, end = self.index.page_bounds(2, 500)
+        self.assertIn(self.text[start - 2], '.!؟\n')
+        self.assertTrue(self.text[start - 1].isspace())
+
+    def test_words_are_not_cut(self):
+        """در متن بدون نقطه‌گذاری، صفحه وسط کلمه شکسته نمی‌شود"""
+        total = self.index.total_pages(300)
+        start, end = self.index.page_bounds(total - 1, 300)
+        self.assertTrue(self.text[start - 1].isspace())
+        self.assertTrue(self.text[end - 1].isspace())
+
+    def test_out_of_range(self):
+        """صفحه خارج از محدوده None برمی‌گرداند"""
+        self.assertIsNone(self.index.page_bounds(0))
+        self.assertIsNone(self.index.page_bounds(self.index.total_pages() + 1))
+
+    def test_serialization_round_trip(self):
+        """ایندکس پس از ذخیره و بازیابی همان صفحات را می‌دهد"""
+        row = self.index.to_row()
+        restored = BoundaryIndex.from_row(row['text_length'], row['word_step'],
+                                          row['paragraphs'], row['sentences'], row['words'])
+        for page_number in range(1, self.index.total_pages(700) + 1):
+            self.assertEqual(restored.page_bounds(page_number, 700),
+                             self.index.page_bounds(page_number, 700))
+
+if __name__ == "__main__":
+    unittest.main()
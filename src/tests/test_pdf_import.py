@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های وارد کردن صفحه به صفحه فایل PDF
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+
+import fitz
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.database.book_db import BookDatabase
+from src.services.pagination import PAGE_SEPARATOR
+from src.services import pdf_importer
+from src.services.pdf_importer import PDFImporter
+
+class TestStreamingPDFImport(unittest.TestCase):
+    """تست ذخیره صفحه‌ها در book_pages بدون ساختن متن کامل کتاب"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.temp_dir.name, 'book.pdf')
+        doc = fitz.open()
+        for i in range(1, 8):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Chapter {i}\nThe quick brown fox jumps over the lazy dog {i} times.")
+        doc.save(self.pdf_path)
+        doc.close()
+        self.db = BookDatabase(os.path.join(self.temp_dir.name, 'books.db'))
+        self.importer = PDFImporter(self.db, stream_min_pages=5)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_large_pdf_is_stored_page_by_page(self):
+        """کتاب بزرگ صفحه به صفحه ذخیره می‌شود و بدون پردازش قابل خواندن است"""
+        result = self.importer.import_pdf(self.pdf_path, title="Fox")
+        self.assertEqual(result['status'], 'success')
+        book_id = result['book_id']
+
+        self.assertIsNone(self.db.get_book(book_id)['text_content'])
+        self.assertEqual(self.db.get_book_version(book_id)['total_pages'], 7)
+
+        page = self.db.get_page_content(book_id, 3)
+        self.assertEqual(page['content'], "Chapter 3 The quick brown fox jumps over the lazy dog 3 times.")
+        self.assertEqual(page['total_pages'], 7)
+
+        text = self.db.get_book_text(book_id)
+        pages = list(self.db.iter_pages(book_id))
+        self.assertEqual(text, PAGE_SEPARATOR.join(p['content'] for p in pages))
+        for p in pages:
+            self.assertEqual(text[p['start_offset']:p['end_offset']], p['content'])
+
+        chapters = self.db.get_chapters(book_id)
+        self.assertEqual([(c['start_page'], c['end_page']) for c in chapters], [(n, n) for n in range(1, 8)])
+        self.assertEqual(self.db.get_chapter(book_id, 3)['content'], page['content'])
+
+    def test_small_pdf_keeps_text_content(self):
+        """کتاب کوچک همچنان به صورت یک متن کامل ذخیره می‌شود"""
+        result = self.importer.import_pdf(self.pdf_path, stream=False)
+        book = self.db.get_book(result['book_id'])
+        self.assertIn("lazy dog 7 times", book['text_content'])
+        self.assertIsNone(self.db.get_stored_pages(result['book_id'], 1, 7))
+
+class InlineExecutor:
+    """Runs submitted batches in this process and records their arguments"""
+
+    calls = []
+
+    def __init__(self, max_workers=None, mp_context=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, source, first, last):
+        InlineExecutor.calls.append((source, os.path.exists(source)))
+        future = Future()
+        future.set_result(fn(source, first, last))
+        return future
+
+class TestParallelPDFExtract(unittest.TestCase):
+    """تست استخراج موازی صفحه‌ها و آستانه parallel_min_pages"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.temp_dir.name, 'book.pdf')
+        doc = fitz.open()
+        for i in range(1, 8):
+            doc.new_page().insert_text((72, 72), f"Page {i}")
+        doc.save(self.pdf_path)
+        doc.close()
+        with open(self.pdf_path, 'rb') as f:
+            self.pdf_bytes = f.read()
+        self.db = BookDatabase(os.path.join(self.temp_dir.name, 'books.db'))
+        self.expected = [f"Page {i}\n" for i in range(1, 8)]
+        InlineExecutor.calls = []
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def page_texts(self, importer, source):
+        doc = fitz.open(self.pdf_path)
+        try:
+            return list(importer.iter_page_texts(doc, source))
+        finally:
+            doc.close()
+
+    def test_process_pool_keeps_page_order(self):
+        """استخراج با چند پردازه همان متن‌ها را به ترتیب صفحه برمی‌گرداند"""
+        importer = PDFImporter(self.db, workers=2, parallel_min_pages=5)
+        with mock.patch.object(pdf_importer, 'PDF_EXTRACT_BATCH', 2):
+            self.assertEqual(self.page_texts(importer, self.pdf_path), self.expected)
+
+    def test_below_cutoff_stays_in_process(self):
+        """کتاب‌های کوچک‌تر از آستانه بدون پردازه‌های کمکی خوانده می‌شوند"""
+        importer = PDFImporter(self.db, workers=2, parallel_min_pages=8)
+        with mock.patch.object(pdf_importer, 'ProcessPoolExecutor', InlineExecutor):
+            self.assertEqual(self.page_texts(importer, self.pdf_path), self.expected)
+        self.assertEqual(InlineExecutor.calls, [])
+
+    def test_bytes_are_spooled_to_one_file(self):
+        """بایت‌های PDF یک بار در فایل موقت نوشته می‌شوند و پردازه‌ها مسیر آن را می‌گیرند"""
+        importer = PDFImporter(self.db, workers=2, parallel_min_pages=5)
+        with mock.patch.object(pdf_importer, 'ProcessPoolExecutor', InlineExecutor), \
+                mock.patch.object(pdf_importer, 'PDF_EXTRACT_BATCH', 2):
+            self.assertEqual(self.page_texts(importer, self.pdf_bytes), self.expected)
+
+        sources = {source for source, _ in InlineExecutor.calls}
+        self.assertEqual(len(InlineExecutor.calls), 4)
+        self.assertEqual(len(sources), 1)
+        path = sources.pop()
+        self.assertIsInstance(path, str)
+        self.assertTrue(all(existed for _, existed in InlineExecutor.calls))
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == "__main__":
+    unittest.main()
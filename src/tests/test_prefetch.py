@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های پیش‌بارگذاری صفحه‌های بعدی (read-ahead)
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.prefetch import ReadAheadScheduler
+
+class TestReadAheadScheduler(unittest.TestCase):
+    """تست محدودیت‌ها و معیارهای زمان‌بند پیش‌بارگذاری"""
+
+    def setUp(self):
+        self.scheduler = ReadAheadScheduler(pages_ahead=2, max_workers=1, max_per_user=4)
+        self.warmed = []
+        self.cached = set()
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def warm(self, book_id, page_number):
+        self.warmed.append((book_id, page_number))
+        if (book_id, page_number) in self.cached:
+            return False
+        self.cached.add((book_id, page_number))
+        return True
+
+    def drain(self):
+        # A single worker runs jobs in order, so an empty job queued last finishes last
+        self.scheduler._executor.submit(lambda: None).result(timeout=5)
+
+    def block_worker(self):
+        """Occupy the only worker so that scheduled pages stay queued"""
+        release = threading.Event()
+        started = threading.Event()
+
+        def hold():
+            started.set()
+            release.wait(5)
+
+        self.scheduler._executor.submit(hold)
+        started.wait(5)
+        return release
+
+    def test_hit_rate_counts_only_pages_the_warmer_filled(self):
+        """صفحه‌ای که از قبل در کش بوده در hit_rate شمرده نمی‌شود"""
+        self.cached.add((1, 2))
+        self.scheduler.schedule('reader', 1, 1, None, {'audio': self.warm})
+        self.drain()
+
+        self.assertEqual(self.warmed, [(1, 2), (1, 3)])
+        # Pages found already cached are remembered too, so they are not tried again
+        self.scheduler.schedule('reader', 1, 1, None, {'audio': self.warm})
+        self.drain()
+        self.assertEqual(self.warmed, [(1, 2), (1, 3)])
+
+        self.assertFalse(self.scheduler.record_request('audio', 1, 2))
+        self.assertTrue(self.scheduler.record_request('audio', 1, 3))
+        metrics = self.scheduler.metrics()
+        self.assertEqual((metrics['warmed'], metrics['already_cached'], metrics['used']), (1, 1, 1))
+        self.assertEqual(metrics['hit_rate'], 1.0)
+
+    def test_page_size_is_part_of_the_key(self):
+        """پیش‌بارگذاری با یک اندازه صفحه برای اندازه دیگر hit حساب نمی‌شود"""
+        self.scheduler.schedule('reader', 1, 1, 2, {'audio': self.warm}, page_size=500)
+        self.drain()
+
+        self.assertFalse(self.scheduler.record_request('audio', 1, 2, page_size=1000))
+        self.assertTrue(self.scheduler.record_request('audio', 1, 2, page_size=500))
+
+        self.scheduler.schedule('reader', 1, 1, 2, {'audio': lambda b, p: True}, page_size=1000)
+        self.drain()
+        self.assertEqual(self.scheduler.metrics()['warmed'], 2)
+
+    def test_per_user_cap_and_cancel_on_jump(self):
+        """هر خواننده حداکثر max_per_user صفحه در صف دارد و پرش به صفحه دور صف را خالی می‌کند"""
+        self.scheduler.pages_ahead = 10
+        release = self.block_worker()
+
+        self.scheduler.schedule('reader', 1, 1, None, {'audio': self.warm})
+        self.assertEqual(self.scheduler.metrics()['queued'], 4)
+
+        self.scheduler.schedule('reader', 1, 50, None, {'audio': self.warm})
+        release.set()
+        self.drain()
+
+        metrics = self.scheduler.metrics()
+        self.assertEqual((metrics['scheduled'], metrics['cancelled']), (8, 4))
+        self.assertEqual(self.warmed, [(1, page) for page in range(51, 55)])
+        self.assertEqual(metrics['queued'], 0)
+
+    def test_pages_are_shared_between_readers(self):
+        """صفحه‌ای که برای یک خواننده در صف است برای دیگری دوباره زمان‌بندی نمی‌شود"""
+        release = self.block_worker()
+        self.scheduler.schedule('first', 1, 1, None, {'audio': self.warm})
+        self.scheduler.schedule('second', 1, 1, None, {'audio': self.warm})
+        release.set()
+        self.drain()
+
+        self.assertEqual(self.scheduler.metrics()['scheduled'], 2)
+        self.assertEqual(self.warmed, [(1, 2), (1, 3)])
+
+    def test_failures_are_counted(self):
+        """خطای یک نوع پیش‌بارگذاری شمرده می‌شود و نوع‌های دیگر ادامه می‌یابند"""
+        def broken(book_id, page_number):
+            raise RuntimeError('tts down')
+
+        with self.assertLogs('src.services.prefetch', level='WARNING'):
+            self.scheduler.schedule('reader', 1, 1, 2, {'audio': broken, 'translation': self.warm})
+            self.drain()
+
+        metrics = self.scheduler.metrics()
+        self.assertEqual((metrics['failed'], metrics['warmed'], metrics['completed']), (1, 1, 1))
+        self.assertIn('tts down', metrics['last_error'])
+        self.assertFalse(self.scheduler.record_request('audio', 1, 2))
+        self.assertTrue(self.scheduler.record_request('translation', 1, 2))
+
+    def test_reader_state_is_bounded(self):
+        """صف خالی خواننده حذف می‌شود و فقط موقعیت max_readers خواننده اخیر نگه داشته می‌شود"""
+        self.scheduler.max_readers = 2
+        for reader in ('first', 'second', 'third'):
+            self.scheduler.schedule(reader, 1, 1, None, {'audio': self.warm})
+        self.drain()
+
+        self.assertEqual(self.scheduler._pending, {})
+        self.assertEqual(list(self.scheduler._positions), ['second', 'third'])
+        self.assertEqual(self.scheduler.metrics()['readers'], 2)
+
+        # Nothing left to warm: no queue is created for the reader
+        self.scheduler.schedule('second', 1, 1, None, {'audio': self.warm})
+        self.assertEqual(self.scheduler._pending, {})
+        self.assertEqual(list(self.scheduler._positions), ['third', 'second'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های وارد کردن دوباره ویرایش اصلاح‌شده یک کتاب
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import fitz
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.database.book_db import BookDatabase
+from src.services.pagination import PAGE_SEPARATOR
+from src.services.pdf_importer import PDFImporter
+from src.services.reimport import BookReimporter
+
+def page_text(i):
+    return f"Chapter {i}\nThe quick brown fox jumps over the lazy dog {i} times."
+
+def write_pdf(path, texts):
+    doc = fitz.open()
+    for text in texts:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(path)
+    doc.close()
+
+class TestReimport(unittest.TestCase):
+    """تست بازنویسی فقط صفحه‌های تغییرکرده و حفظ ترجمه صفحه‌های دست‌نخورده"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = BookDatabase(os.path.join(self.temp_dir.name, 'books.db'))
+        self.importer = PDFImporter(self.db)
+        self.reimporter = BookReimporter(self.db, pdf_importer=self.importer)
+
+        first_edition = os.path.join(self.temp_dir.name, 'first.pdf')
+        write_pdf(first_edition, [page_text(i) for i in range(1, 6)])
+        result = self.importer.import_pdf(first_edition, title="Fox", isbn="9780000000002", stream=True)
+        self.book_id = result['book_id']
+        self.old_pages = list(self.db.iter_pages(self.book_id))
+        self.translated_id = self.db.create_translated_version(self.book_id, (
+            {'page_number': page['page_number'], 'content': f"ترجمه {page['page_number']}"}
+            for page in self.old_pages
+        ), 'fa', 'test-model')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_only_changed_pages_are_rewritten(self):
+        """صفحه اصلاح‌شده و صفحه اضافه‌شده تغییر می‌کنند و ترجمه صفحه‌های جابه‌جاشده حفظ می‌شود"""
+        # Page 2 is corrected and a new page goes in after it, so pages 3-5 move to 4-6
+        texts = [page_text(1), "Chapter 2\nThe quick brown fox jumps over the lazy cat 2 times.",
+                 "Chapter 2b\nA page added in the second edition."] + [page_text(i) for i in range(3, 6)]
+        second_edition = os.path.join(self.temp_dir.name, 'second.pdf')
+        write_pdf(second_edition, texts)
+        version = self.db.get_book_version(self.book_id)['version']
+
+        result = self.reimporter.reimport(second_edition, 'second.pdf', isbn="9780000000002")
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['book_id'], self.book_id)
+        self.assertEqual(result['page_count'], 6)
+        self.assertEqual(result['changed_pages'], [2, 3, 4, 5, 6])
+        self.assertEqual(result['removed_pages'], [])
+        self.assertEqual(result['stale_contents'], [self.old_pages[1]['content']])
+        self.assertEqual(result['translations'][self.translated_id], {'kept': 1, 'moved': 3, 'untranslated': 2})
+        self.assertGreater(self.db.get_book_version(self.book_id)['version'], version)
+
+        pages = list(self.db.iter_pages(self.book_id))
+        text = self.db.get_book_text(self.book_id)
+        self.assertEqual(text, PAGE_SEPARATOR.join(p['content'] for p in pages))
+        for page in pages:
+            self.assertEqual(text[page['start_offset']:page['end_offset']], page['content'])
+        self.assertEqual(pages[4]['content'], self.old_pages[3]['content'])
+
+        translated = self.db.get_translated_pages(self.translated_id, 1, 6)
+        self.assertEqual(translated, {1: "ترجمه 1", 4: "ترجمه 3", 5: "ترجمه 4", 6: "ترجمه 5"})
+        self.assertEqual(self.db.get_book_version(self.translated_id)['total_pages'], 6)
+        # The added page has no numbered heading, so it ends chapter 2
+        chapters = self.db.get_chapters(self.book_id)
+        self.assertEqual([c['start_page'] for c in chapters], [1, 2, 4, 5, 6])
+        self.assertEqual(chapters[1]['end_page'], 3)
+
+    def test_shorter_edition_drops_trailing_pages(self):
+        """صفحه‌های انتهایی حذف‌شده از کتاب و ترجمه‌اش پاک می‌شوند"""
+        second_edition = os.path.join(self.temp_dir.name, 'second.pdf')
+        write_pdf(second_edition, [page_text(i) for i in range(1, 4)])
+        with open(second_edition, 'rb') as f:
+            result = self.reimporter.reimport(f.read(), 'second.pdf', book_id=self.book_id)
+
+        self.assertEqual((result['changed_pages'], result['removed_pages']), ([], [4, 5]))
+        self.assertEqual(result['translations'][self.translated_id], {'kept': 3, 'moved': 0, 'untranslated': 0})
+        self.assertEqual(len(list(self.db.iter_pages(self.book_id))), 3)
+        self.assertEqual(sorted(self.db.get_translated_pages(self.translated_id, 1, 5)), [1, 2, 3])
+
+    def test_unknown_book(self):
+        """کتابی که پیدا نشود خطا برمی‌گرداند"""
+        result = self.reimporter.reimport(b'', 'book.pdf', isbn="0000000000")
+        self.assertEqual(result, {'status': 'error', 'error': 'Book not found'})
+
+if __name__ == "__main__":
+    unittest.main()
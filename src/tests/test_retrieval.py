@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های بازیابی متن برای پرسش و پاسخ
+"""
+
+import os
+import sys
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.retrieval import BM25Index, tokenize
+
+class TestBM25Index(unittest.TestCase):
+    """تست رتبه‌بندی BM25 روی صفحات کتاب"""
+
+    def setUp(self):
+        self.passages = [
+            "The old lighthouse keeper lived alone on the rocky island.",
+            "Rostam rode his horse Rakhsh across the desert to fight the white demon.",
+            "کتابخانه شهر در زمستان بسته بود و کتاب‌ها زیر برف ماندند.",
+            "The harbour was busy with fishing boats every morning.",
+        ]
+        self.index = BM25Index.build(self.passages)
+
+    def test_tokenize_folds_arabic_letters(self):
+        """حروف عربی و فارسی یکسان در نظر گرفته می‌شوند و کلمات پرتکرار حذف می‌شوند"""
+        self.assertEqual(tokenize("كتاب"), tokenize("کتاب"))
+        self.assertEqual(tokenize("The book and the Sea"), ["book", "sea"])
+
+    def test_best_passage_ranks_first(self):
+        """صفحه مرتبط در ابتدای نتایج قرار می‌گیرد"""
+        self.assertEqual(self.index.search("Who fought the white demon?")[0][0], 1)
+        self.assertEqual(self.index.search("کتابخانه در زمستان")[0][0], 2)
+        self.assertEqual(self.index.search("unrelated spaceship"), [])
+
+    def test_serialization_round_trip(self):
+        """ایندکس پس از ذخیره و بازیابی همان نتایج را می‌دهد"""
+        restored = BM25Index.from_bytes(self.index.to_bytes())
+        self.assertEqual(restored.search("lighthouse island boats"), self.index.search("lighthouse island boats"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های نگهدارنده سرویس‌های برنامه
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.container import ServiceContainer
+
+class TestServiceContainer(unittest.TestCase):
+    """تست ساخت یک‌باره سرویس‌ها و ساخت دوباره فقط با تغییر تنظیمات"""
+
+    def setUp(self):
+        self.settings = {'db_path': 'books.db'}
+        self.builds = 0
+        self.container = ServiceContainer(lambda: dict(self.settings), self.build)
+
+    def build(self, config):
+        if config['db_path'] is None:
+            raise ValueError('db_path is required')
+        self.builds += 1
+        return {'db': object(), 'db_path': config['db_path']}
+
+    def test_built_once_across_threads(self):
+        """همه درخواست‌ها، حتی هم‌زمان، همان نمونه‌ها را می‌گیرند"""
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.container.get())) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.builds, 1)
+        self.assertTrue(all(services is results[0] for services in results))
+        self.assertEqual(results[0].config, {'db_path': 'books.db'})
+
+    def test_reload_rebuilds_only_on_change(self):
+        """بارگذاری دوباره فقط وقتی تنظیمات تغییر کرده سرویس‌ها را از نو می‌سازد"""
+        first = self.container.get()
+        self.assertFalse(self.container.reload())
+        self.assertIs(self.container.get(), first)
+
+        self.settings['db_path'] = 'other.db'
+        self.assertTrue(self.container.reload())
+        second = self.container.get()
+        self.assertEqual(second.db_path, 'other.db')
+        self.assertIsNot(second.db, first.db)
+        # A snapshot taken before the reload keeps its services
+        self.assertEqual(first.db_path, 'books.db')
+
+    def test_failed_reload_keeps_services(self):
+        """اگر ساخت سرویس‌های جدید خطا دهد، سرویس‌های قبلی باقی می‌مانند"""
+        first = self.container.get()
+        self.settings['db_path'] = None
+        with self.assertRaises(ValueError):
+            self.container.reload()
+        self.assertIs(self.container.get(), first)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های یکی کردن فراخوانی‌های هم‌زمان (single flight)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.single_flight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    """تست فضای کلید مشترک بین فراخوانی‌های thread و asyncio"""
+
+    def setUp(self):
+        self.flights = SingleFlight()
+        self.upstream = []
+
+    def test_async_call_joins_thread_flight(self):
+        """درخواست async به پیش‌بارگذاری در حال اجرا در thread می‌پیوندد"""
+        started = threading.Event()
+
+        def prefetch():
+            self.upstream.append('thread')
+            started.set()
+            time.sleep(0.2)
+            return 'audio'
+
+        warmer_result = []
+        warmer = threading.Thread(target=lambda: warmer_result.append(self.flights.do('page', prefetch)))
+        warmer.start()
+        started.wait()
+
+        async def request():
+            self.upstream.append('async')
+            return 'other'
+
+        result = asyncio.run(self.flights.ado('page', request))
+        warmer.join()
+
+        self.assertEqual((result, warmer_result), ('audio', ['audio']))
+        self.assertEqual(self.upstream, ['thread'])
+        self.assertEqual(self.flights.metrics(), {'calls': 2, 'executed': 1, 'coalesced': 1, 'in_flight': 0})
+
+    def test_thread_call_joins_async_flight(self):
+        """پیش‌بارگذاری در thread منتظر درخواست async در حال اجرا می‌ماند"""
+        warmer_result = []
+
+        async def request():
+            self.upstream.append('async')
+            await asyncio.sleep(0.2)
+            return 'audio'
+
+        def prefetch():
+            self.upstream.append('thread')
+            return 'other'
+
+        async def main():
+            running = asyncio.ensure_future(self.flights.ado('page', request))
+            await asyncio.sleep(0.05)
+            warmer = threading.Thread(target=lambda: warmer_result.append(self.flights.do('page', prefetch)))
+            warmer.start()
+            result = await running
+            await asyncio.get_running_loop().run_in_executor(None, warmer.join)
+            return result
+
+        self.assertEqual(asyncio.run(main()), 'audio')
+        self.assertEqual(warmer_result, ['audio'])
+        self.assertEqual(self.upstream, ['async'])
+
+    def test_errors_reach_followers_of_either_kind(self):
+        """خطای فراخوانی پیشرو به دنبال‌کننده async هم می‌رسد"""
+        started = threading.Event()
+
+        def prefetch():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError('provider down')
+
+        def warm():
+            try:
+                self.flights.do('page', prefetch)
+            except RuntimeError:
+                pass
+
+        warmer = threading.Thread(target=warm)
+        warmer.start()
+        started.wait()
+
+        async def request():
+            return 'unused'
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(self.flights.ado('page', request))
+        warmer.join()
+        self.assertFalse(self.flights.in_flight('page'))
+
+if __name__ == "__main__":
+    unittest.main()
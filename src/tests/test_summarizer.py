@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های خلاصه‌سازی سلسله‌مراتبی (map-reduce)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.database.book_db import BookDatabase
+from src.services.llm_cache import LLMCache
+from src.services.summarizer import HierarchicalSummarizer
+
+class FakeCompletions:
+    """هر درخواست را با یک خلاصه کوتاه پاسخ می‌دهد و درخواست‌ها را ثبت می‌کند"""
+
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def create(self, **params):
+        with self.lock:
+            self.requests.append(params)
+            reply = f"summary {len(self.requests)}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+    async def acreate(self, **params):
+        await asyncio.sleep(0)
+        return self.create(**params)
+
+class TestHierarchicalSummarizer(unittest.TestCase):
+    """تست تقسیم متن، کاهش چندمرحله‌ای و استفاده مجدد از خلاصه‌های میانی"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = BookDatabase(os.path.join(self.temp_dir.name, 'books.db'))
+        self.cache = LLMCache(path=os.path.join(self.temp_dir.name, 'llm_cache.db'))
+        self.api = FakeCompletions()
+        self.summarizer = HierarchicalSummarizer(self.api.create, self.cache, self.db, chunk_chars=200,
+                                                 acreate=self.api.acreate)
+        self.text = "".join(f"This is sentence {i} of the book. " for i in range(60))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_short_text_is_a_single_call(self):
+        """متن کوتاه بدون مرحله map مستقیماً ارسال می‌شود"""
+        self.summarizer.summarize("A short chapter.", "Summarize.", label="chapter")
+        self.assertEqual(len(self.api.requests), 1)
+        self.assertEqual(self.api.requests[0]['messages'][1]['content'], "Chapter content: A short chapter.")
+
+    def test_long_text_is_mapped_then_reduced(self):
+        """هر بخش خلاصه می‌شود و هیچ درخواستی از سقف اندازه بزرگ‌تر نیست"""
+        self.summarizer.summarize(self.text, "Summarize.")
+        chunks = self.summarizer.split(self.text)
+        self.assertEqual("".join(chunks), self.text)
+        self.assertGreater(len(self.api.requests), len(chunks))
+        for request in self.api.requests[:-1]:
+            self.assertLessEqual(len(request['messages'][1]['content']), 200)
+
+    def test_partial_summaries_are_reused(self):
+        """اجرای دوباره، حتی با دستور نهایی متفاوت، خلاصه‌های میانی را دوباره نمی‌سازد"""
+        self.summarizer.summarize(self.text, "Summarize.")
+        first_run = len(self.api.requests)
+        self.summarizer.summarize(self.text, "List the themes.")
+        self.assertEqual(len(self.api.requests), first_run + 1)
+
+    def test_async_matches_sync(self):
+        """نسخه async همان درخواست‌ها را می‌فرستد و خلاصه‌های میانی را با نسخه همگام شریک است"""
+        self.summarizer.workers = 2
+        asyncio.run(self.summarizer.asummarize(self.text, "Summarize."))
+        async_requests = [request['messages'][1]['content'] for request in self.api.requests]
+        self.assertGreater(len(async_requests), len(self.summarizer.split(self.text)))
+
+        self.summarizer.summarize(self.text, "List the themes.")
+        self.assertEqual(len(self.api.requests), len(async_requests) + 1)
+        self.assertEqual(self.api.requests[-1]['messages'][1]['content'], async_requests[-1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های تقسیم تدریجی متن به بخش‌ها
+"""
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.database.book_db import BookDatabase
+from src.services.text_processor import TextProcessor
+from src.services.tokenizer import count_tokens
+
+class TestIterChunks(unittest.TestCase):
+    """تست بخش‌بندی روی مرز جمله‌ها از رشته، فایل و پایگاه داده"""
+
+    def setUp(self):
+        self.processor = TextProcessor()
+        self.text = "".join(f"جمله شماره {i} در این کتاب است. Sentence {i} follows here! " for i in range(300))
+
+    def test_chunks_end_on_sentences_and_overlap(self):
+        """بخش‌ها روی پایان جمله تمام می‌شوند و با بخش بعدی همپوشانی دارند"""
+        chunks = list(self.processor.iter_chunks(self.text))
+        for chunk, following in zip(chunks, chunks[1:]):
+            self.assertEqual(chunk["text"], self.text[chunk["start"]:chunk["end"]])
+            self.assertLessEqual(len(chunk["text"]), self.processor.chunk_size)
+            self.assertIn(chunk["text"].rstrip()[-1], ".!")
+            self.assertLess(following["start"], chunk["end"])
+        self.assertEqual(chunks[-1]["end"], len(self.text))
+
+    def test_sources_give_identical_chunks(self):
+        """رشته، فایل و نشانگر پایگاه داده همان بخش‌ها را می‌دهند"""
+        expected = list(self.processor.iter_chunks(self.text))
+        from_file = list(self.processor.iter_chunks(io.StringIO(self.text), block_size=333))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = BookDatabase(os.path.join(temp_dir, 'books.db'))
+            book_id = db.add_book("کتاب", text_content=self.text)
+            from_db = list(self.processor.iter_chunks(db.iter_text(book_id, block_size=500)))
+
+        self.assertEqual(from_file, expected)
+        self.assertEqual(from_db, expected)
+
+    def test_token_budget_packs_chunks(self):
+        """با بودجه توکن، بخش‌ها در بودجه جا می‌شوند و از بخش‌های ثابت کمترند"""
+        chunks = list(self.processor.iter_chunks(self.text, max_tokens=800))
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk["text"]), 800)
+            self.assertEqual(chunk["text"], self.text[chunk["start"]:chunk["end"]])
+        self.assertEqual(chunks[-1]["end"], len(self.text))
+        self.assertLess(len(chunks), len(list(self.processor.iter_chunks(self.text))))
+
+if __name__ == "__main__":
+    unittest.main()
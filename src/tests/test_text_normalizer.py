@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های یکسان‌سازی متن هنگام وارد کردن کتاب
+"""
+
+import os
+import sys
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.text_normalizer import TextNormalizer
+
+SAMPLE = "  Hello,\tworld!  \r\n\r\n  فصل ١٢: كتاب يك‌بار.\nادامه  خط \n\n\n پایان؟ "
+
+class TestTextNormalizer(unittest.TestCase):
+    """تست حفظ نشانه‌گذاری و بندها و یکسان‌سازی حروف و ارقام"""
+
+    def test_default_keeps_punctuation_and_paragraphs(self):
+        """نشانه‌ها، نیم‌فاصله و بندها حفظ می‌شوند و ارقام و حروف عربی یکسان می‌شوند"""
+        self.assertEqual(
+            TextNormalizer().normalize(SAMPLE),
+            "Hello, world!\n\nفصل 12: کتاب یک‌بار. ادامه خط\n\nپایان؟"
+        )
+
+    def test_legacy_cleaning(self):
+        """بدون حفظ نشانه‌ها و بندها، همان پاک‌سازی قبلی انجام می‌شود"""
+        normalizer = TextNormalizer(fold_letters=False, keep_punctuation=False, keep_paragraphs=False)
+        self.assertEqual(normalizer.normalize(SAMPLE), "Hello world فصل 12 كتاب يكبار ادامه خط پایان؟")
+
+    def test_streaming_matches_whole_text(self):
+        """یکسان‌سازی تکه به تکه همان نتیجه متن کامل را می‌دهد"""
+        normalizers = [TextNormalizer(), TextNormalizer(keep_punctuation=False),
+                       TextNormalizer(keep_punctuation=False, keep_paragraphs=False)]
+        text = SAMPLE * 20
+        for normalizer in normalizers:
+            expected = normalizer.normalize(text)
+            for size in (1, 3, 7, 64):
+                pieces = [text[i:i + size] for i in range(0, len(text), size)]
+                self.assertEqual("".join(normalizer.iter_normalize(pieces)), expected)
+
+        # Pieces whose edges only become whitespace once cleaned: removed punctuation,
+        # byte order marks and NUL next to a line break or space
+        edge_cases = [
+            ['١\n', '.', ' bي'],
+            ['a\n.', '\nb'],
+            ['a \ufeff', ' b'],
+            ['\ufeff', ' a \x00', '\n\nb\x00', ' '],
+            ['a\x00\n', '\x00\n', 'b'],
+        ]
+        for normalizer in normalizers:
+            for pieces in edge_cases:
+                self.assertEqual("".join(normalizer.iter_normalize(pieces)),
+                                 normalizer.normalize("".join(pieces)), pieces)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های شمارش توکن و بسته‌بندی متن بر اساس بودجه توکن
+"""
+
+import os
+import sys
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.tokenizer import count_tokens, estimate_tokens, fit_tokens, input_token_budget
+
+class TestTokenizer(unittest.TestCase):
+    """تست تخمین توکن برای متن فارسی و انگلیسی"""
+
+    def test_persian_costs_more_tokens_per_character(self):
+        """متن فارسی به ازای هر نویسه توکن بیشتری از متن انگلیسی می‌گیرد"""
+        persian = "این یک جمله کوتاه فارسی است. " * 20
+        english = ("This is a short English line. " * 20)[:len(persian)]
+        self.assertGreater(estimate_tokens(persian), estimate_tokens(english))
+
+    def test_fit_tokens_stays_within_budget(self):
+        """پیشوند برگزیده در بودجه جا می‌شود و تقریباً آن را پر می‌کند"""
+        text = "کتاب خوب، دوست خوب است. A good book is a good friend. " * 200
+        end = fit_tokens(text, 300)
+        self.assertLessEqual(count_tokens(text[:end]), 300)
+        self.assertGreater(count_tokens(text[:end + 64]), 300)
+        self.assertEqual(fit_tokens("short", 300), len("short"))
+
+    def test_input_budget_leaves_room_for_reply(self):
+        """بودجه ورودی با نسبت بزرگ‌شدن خروجی و پنجره مدل محدود می‌شود"""
+        self.assertEqual(input_token_budget("gpt-4-turbo", 2000, expansion=2.0), 1000)
+        self.assertEqual(input_token_budget("gpt-4", 4000), 8192 - 4000 - 200)
+
+if __name__ == "__main__":
+    unittest.main()
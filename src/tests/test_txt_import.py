@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های وارد کردن فایل متنی با تشخیص کدگذاری
+"""
+
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+import unittest
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.database.book_db import BookDatabase
+from src.services.pagination import PAGE_SEPARATOR
+from src.services.txt_importer import SNIFF_SIZE, TXTImporter, detect_encoding, iter_decode
+
+PERSIAN = "کتاب زندگی\nنوشته یک نویسنده\n\nروزی روزگاری در شهری دور.\n"
+# cp1256 has no Persian yeh; Windows files use the Arabic one
+CP1256 = PERSIAN.replace('ی', 'ي').encode('cp1256')
+
+class TestTXTImport(unittest.TestCase):
+    """تست تشخیص کدگذاری از ابتدای فایل و رمزگشایی تک‌گذره"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = BookDatabase(os.path.join(self.temp_dir.name, 'books.db'))
+        self.importer = TXTImporter(self.db)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_detect_encoding(self):
+        """کدگذاری از روی BOM یا نمونه ابتدایی تشخیص داده می‌شود، حتی اگر نویسه‌ای نیمه‌کاره بماند"""
+        utf8 = PERSIAN.encode('utf-8')
+        self.assertEqual(detect_encoding(utf8[:5]), 'utf-8')
+        self.assertEqual(detect_encoding(b'\xef\xbb\xbf' + utf8), 'utf-8-sig')
+        self.assertEqual(detect_encoding(CP1256), 'cp1256')
+
+    def test_decode_across_blocks(self):
+        """نویسه‌های چندبایتی بریده‌شده بین بلوک‌ها درست رمزگشایی می‌شوند"""
+        data = PERSIAN.encode('utf-8')
+        self.assertEqual(''.join(iter_decode(io.BytesIO(data), 'utf-8', block_size=3)), PERSIAN)
+
+    def test_import_cp1256(self):
+        """فایل cp1256 وارد می‌شود و تعداد کلمات در همان گذر شمرده می‌شود"""
+        result = self.importer.import_txt_from_bytes(CP1256, "کتاب", "نویسنده")
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['encoding'], 'cp1256')
+        self.assertEqual(result['word_count'], len(PERSIAN.split()))
+        self.assertEqual(
+            self.db.get_book(result['book_id'])['text_content'],
+            "کتاب زندگی نوشته یک نویسنده\n\nروزی روزگاری در شهری دور."
+        )
+
+    def test_metadata_reads_only_prefix(self):
+        """متادیتای فایل بزرگ فقط از ابتدای فایل خوانده و تعداد کلمات تخمین زده می‌شود"""
+        data = PERSIAN.encode('utf-8') * (4 * SNIFF_SIZE // len(PERSIAN.encode('utf-8')))
+        metadata = self.importer.extract_metadata_from_stream(io.BytesIO(data))
+        self.assertEqual(metadata['title'], "کتاب زندگی")
+        self.assertEqual(metadata['encoding'], 'utf-8')
+        self.assertTrue(metadata['word_count_estimated'])
+        expected = len(data.decode('utf-8').split())
+        self.assertLess(abs(metadata['word_count'] - expected), expected * 0.01)
+
+        small = self.importer.extract_metadata_from_stream(io.BytesIO(PERSIAN.encode('utf-8')))
+        self.assertFalse(small['word_count_estimated'])
+        self.assertEqual(small['word_count'], len(PERSIAN.split()))
+        self.assertEqual(small['preview'], PERSIAN)
+
+class TestTXTImportMemory(unittest.TestCase):
+    """تست مصرف حافظه هنگام وارد کردن فایل متنی بزرگ از روی فایل نگاشت‌شده در حافظه"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.txt_path = os.path.join(self.temp_dir.name, 'book.txt')
+        paragraph = "روزی روزگاری در شهری دور مردی زندگی می‌کرد. The quick brown fox. " * 20
+        with open(self.txt_path, 'w', encoding='utf-8') as f:
+            for number in range(1, 121):
+                f.write(f"فصل {number}\n" + (paragraph + "\n\n") * 40)
+        self.size = os.path.getsize(self.txt_path)
+        self.db = BookDatabase(os.path.join(self.temp_dir.name, 'books.db'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_streamed_import_peak_memory(self):
+        """حافظه مصرفی به اندازه فایل بستگی ندارد و صفحه‌ها و فصل‌ها درست ذخیره می‌شوند"""
+        tracemalloc.start()
+        try:
+            result = TXTImporter(self.db).import_txt(self.txt_path, title="Memory", stream=True)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(result['status'], 'success')
+        self.assertGreater(self.size, 8 * 1024 * 1024)
+        # Reading the file into one string alone would take more than its size
+        self.assertLess(peak, self.size / 2)
+
+        book_id = result['book_id']
+        self.assertIsNone(self.db.get_book(book_id)['text_content'])
+        pages = list(self.db.iter_pages(book_id))
+        self.assertEqual(len(pages), result['page_count'])
+        text = self.db.get_book_text(book_id)
+        self.assertEqual(text, PAGE_SEPARATOR.join(p['content'] for p in pages))
+        self.assertEqual(len(text.split()), result['word_count'])
+
+        chapters = self.db.get_chapters(book_id)
+        self.assertEqual([c['chapter_number'] for c in chapters], list(range(1, 121)))
+        for chapter in chapters:
+            self.assertTrue(text[chapter['start_offset']:].startswith(f"فصل {chapter['chapter_number']}"))
+            self.assertIn(f"فصل {chapter['chapter_number']}", pages[chapter['start_page'] - 1]['content'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تست‌های بافر بارگذاری فایل (حافظه و سپس دیسک) و محدودیت اندازه
+"""
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# اضافه کردن مسیر ریشه پروژه به PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services import upload_stream
+from src.services.upload_stream import SpooledUpload, UploadTooLarge, open_upload, spool_stream
+
+class TestSpooledUpload(unittest.TestCase):
+    """تست نگه‌داری در حافظه، انتقال به فایل موقت و حد اندازه"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # Spooled files go here, so leftovers can be checked
+        patcher = mock.patch.object(tempfile, 'tempdir', self.temp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def spooled_files(self):
+        return os.listdir(self.temp_dir.name)
+
+    def test_small_upload_stays_in_memory(self):
+        """بارگذاری کوچک در حافظه می‌ماند"""
+        with SpooledUpload(max_memory=10) as upload:
+            upload.write(b'0123456789')
+            upload.seek(0)
+            self.assertTrue(upload.in_memory)
+            self.assertEqual((upload.read(), upload.getvalue(), upload.size), (b'0123456789', b'0123456789', 10))
+        self.assertEqual(self.spooled_files(), [])
+
+    def test_rollover_to_disk(self):
+        """با گذشتن از max_memory همه داده به یک فایل موقت منتقل و با بستن پاک می‌شود"""
+        upload = SpooledUpload(max_memory=10, suffix='.pdf')
+        upload.write(b'01234')
+        upload.write(b'56789')
+        self.assertTrue(upload.in_memory)
+        upload.write(b'abc')
+
+        self.assertFalse(upload.in_memory)
+        self.assertTrue(upload.path.endswith('.pdf'))
+        self.assertEqual(self.spooled_files(), [os.path.basename(upload.path)])
+        upload.seek(0)
+        self.assertEqual(upload.read(), b'0123456789abc')
+        upload.flush()
+        with open(upload.path, 'rb') as f:
+            self.assertEqual(f.read(), b'0123456789abc')
+        with self.assertRaises(ValueError):
+            upload.getvalue()
+
+        upload.close()
+        upload.close()
+        self.assertEqual(self.spooled_files(), [])
+
+    def test_size_limit(self):
+        """نوشتن بیش از max_size خطای UploadTooLarge می‌دهد"""
+        with SpooledUpload(max_memory=4, max_size=8) as upload:
+            upload.write(b'01234567')
+            with self.assertRaises(UploadTooLarge) as raised:
+                upload.write(b'8')
+        self.assertEqual(raised.exception.limit, 8)
+        self.assertEqual(self.spooled_files(), [])
+
+    def test_spool_stream(self):
+        """کپی تکه‌تکه یک جریان، با بازگشت به ابتدای آن"""
+        data = bytes(range(256)) * 4
+        with mock.patch.object(upload_stream, 'COPY_CHUNK_SIZE', 100):
+            with spool_stream(io.BytesIO(data), max_memory=512, suffix='.txt') as upload:
+                self.assertFalse(upload.in_memory)
+                self.assertEqual(upload.tell(), 0)
+                self.assertEqual(upload.read(), data)
+
+            with self.assertRaises(UploadTooLarge):
+                spool_stream(io.BytesIO(data), max_memory=512, max_size=1000)
+        # The partial copy is removed when the limit is hit
+        self.assertEqual(self.spooled_files(), [])
+
+class TestOpenUpload(unittest.TestCase):
+    """تست حد اندازه هر نوع فایل در open_upload"""
+
+    def setUp(self):
+        patcher = mock.patch.dict(upload_stream.UPLOAD_SIZE_LIMITS, {'pdf': 100, 'txt': 10, 'epub': 10})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_limit_depends_on_type(self):
+        """همان اندازه برای PDF پذیرفته و برای TXT رد می‌شود"""
+        with open_upload(SimpleNamespace(filename='book.PDF', stream=io.BytesIO(b'x' * 50))) as upload:
+            self.assertEqual(upload.read(), b'x' * 50)
+            self.assertEqual(upload.suffix, '.pdf')
+
+        with self.assertRaises(UploadTooLarge) as raised:
+            open_upload(SimpleNamespace(filename='book.txt', stream=io.BytesIO(b'x' * 50)))
+        self.assertEqual(raised.exception.limit, 10)
+
+    def test_already_spooled_upload(self):
+        """فایلی که UploadRequest از قبل در SpooledUpload نوشته دوباره کپی نمی‌شود"""
+        spooled = SpooledUpload()
+        spooled.write(b'x' * 50)
+        self.assertIs(open_upload(SimpleNamespace(filename='book.pdf', stream=spooled)), spooled)
+        self.assertEqual(spooled.tell(), 0)
+
+        with self.assertRaises(UploadTooLarge):
+            open_upload(SimpleNamespace(filename='book.epub', stream=spooled))
+        spooled.close()
+
+if __name__ == "__main__":
+    unittest.main()